@@ -0,0 +1,52 @@
+"""
+Shared setup for the micro-benchmarks.
+
+    cd backend && python -m pytest benchmarks/ --benchmark-autosave
+    python -m pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Each benchmark also records the peak traced allocation of one extra call in
+`extra_info["peak_alloc_kib"]`, which is saved alongside the timings.
+"""
+
+import asyncio, os, sys, tracemalloc
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_bench")
+
+
+@pytest.fixture(scope="session")
+def db():
+    """Points every module's `db` at an in-memory database for the session."""
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365.resources import resources
+
+    resources.database = AsyncMongoMockClient()["wa365_bench"]
+    return resources.database
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def measure(benchmark):
+    """benchmark(fn, *args) that also records the peak memory allocated by one call."""
+
+    def run(fn, *args):
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_alloc_kib"] = round(peak / 1024, 1)
+        return benchmark(fn, *args)
+
+    return run
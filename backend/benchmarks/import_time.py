@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark: how long `import server` takes and which modules it spends it on.
+
+Each run imports the backend in a fresh interpreter with `-X importtime`, so
+nothing is cached in sys.modules. Reported per module is the cumulative import
+time (including everything it pulls in) of each third-party module that server.py
+or a wa365 module imports, plus the wa365 modules' own time, as the median over
+runs. The lazy modules of the loaded features (app.state.lazy_modules) are then
+timed separately, as the cost a first request (or the background warm-up)
+pays instead.
+
+    python benchmarks/import_time.py --runs 5
+    APP_FEATURES=webhook python benchmarks/import_time.py
+    python benchmarks/import_time.py --out bench_results/import.json --compare bench_results/import-base.json
+"""
+
+import argparse, json, os, statistics, subprocess, sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ENV = {**os.environ, "MONGO_URL": os.environ.get("MONGO_URL", "mongodb://localhost:27017"), "DB_NAME": os.environ.get("DB_NAME", "wa365_bench"), "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def first_party(name):
+    return name == "server" or name == "wa365" or name.startswith("wa365.")
+
+
+def importtime(code):
+    """Run `code` under -X importtime; returns {module: (self_us, cumulative_us, depth)} in import order."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules, proc.stdout
+
+
+def measure_server(runs):
+    totals, per_module = [], {}
+    for _ in range(runs):
+        modules, _ = importtime("import server")
+        totals.append(modules["server"][1])
+        # -X importtime lists a module's imports just before the module itself, one level deeper,
+        # so walking backwards from "server" meets each parent before its children
+        entries = list(modules.items())
+        end = next(i for i, (name, _) in enumerate(entries) if name == "server")
+        parents = ["server"]
+        own_us = 0
+        for name, (self_us, cumulative, depth) in reversed(entries[:end]):
+            if depth == 0:
+                break
+            del parents[depth:]
+            parent = parents[-1]
+            parents.append(name)
+            if first_party(name):
+                own_us += self_us
+            elif first_party(parent):
+                per_module.setdefault(name, []).append(cumulative)
+        per_module.setdefault("wa365 (own code)", []).append(own_us + modules["server"][0])
+    return {
+        "total_ms": round(statistics.median(totals) / 1000, 1),
+        "modules_ms": dict(sorted(((n, round(statistics.median(v) / 1000, 1)) for n, v in per_module.items()), key=lambda kv: -kv[1])),
+    }
+
+
+def measure_lazy(runs):
+    code = "import server, importlib, time, json\nout = {}\nfor name in server.app.state.lazy_modules:\n    t = time.perf_counter(); importlib.import_module(name); out[name] = (time.perf_counter() - t) * 1000\nprint(json.dumps(out))"
+    samples = {}
+    for _ in range(runs):
+        _, stdout = importtime(code)
+        for name, ms in json.loads(stdout.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(ms)
+    return {name: round(statistics.median(v), 1) for name, v in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="modules to print")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    result = {"runs": args.runs, "python": sys.version.split()[0], **measure_server(args.runs), "lazy_ms": measure_lazy(args.runs)}
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else {}
+
+    def delta(new, old):
+        return f"  ({new - old:+.1f} ms)" if old is not None else ""
+
+    print(f"import server: {result['total_ms']} ms (median of {args.runs}){delta(result['total_ms'], baseline.get('total_ms'))}\n")
+    print(f"{'module':<40}{'cumulative ms':>14}")
+    for name, ms in list(result["modules_ms"].items())[:args.top]:
+        print(f"{name:<40}{ms:>14}{delta(ms, baseline.get('modules_ms', {}).get(name))}")
+    print(f"\n{'deferred to first use':<40}{'ms':>14}")
+    for name, ms in result["lazy_ms"].items():
+        print(f"{name:<40}{ms:>14}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"\nresults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
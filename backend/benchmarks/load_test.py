@@ -0,0 +1,217 @@
+"""
+Offline load test for POST /api/wa/message.
+
+Runs the FastAPI app in-process (httpx ASGI transport, no network) against
+mongomock or a local MongoDB, with every tenant on the stub LLM provider, and
+drives the endpoint at a fixed concurrency across many tenants and JIDs.
+Reports throughput, p50/p95/p99 latency and the per-stage breakdown recorded
+by the pipeline's Trace spans, and writes the results as JSON.
+
+    python benchmarks/load_test.py --requests 2000 --concurrency 50 --llm-latency-ms 200
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --out bench_results/base.json
+    python benchmarks/load_test.py --compare bench_results/base.json
+    python benchmarks/load_test.py --features webhook   # only the routers an ingestion worker loads
+
+Startup hooks are not run, so background loops (takeover sync, outbound queue,
+exports) do not add noise to the numbers. Stage spans are wall-clock time, so
+once the event loop saturates (mongomock runs its queries synchronously) the
+wait for the loop shows up in whichever stage was awaiting; compare runs on
+the same backend, or use --mongo-url for numbers closer to production.
+"""
+
+import argparse, asyncio, json, os, random, statistics, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_load_test")  # --db-name picks the database actually used
+
+QUESTIONS = [
+    "What are your opening hours?",
+    "How much does a standard service cost?",
+    "Do you cover the north of the city?",
+    "Can I change the time of my appointment?",
+    "Is there parking near your office?",
+    "What payment methods do you accept?",
+]
+BOOKINGS = [
+    "My car has broken down on the motorway",
+    "Can you arrange a pickup tomorrow morning?",
+    "Please deliver the parts to my address",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples_ms):
+    return {
+        "count": len(samples_ms),
+        "mean": round(statistics.fmean(samples_ms), 3) if samples_ms else None,
+        "p50": round(percentile(samples_ms, 50), 3) if samples_ms else None,
+        "p95": round(percentile(samples_ms, 95), 3) if samples_ms else None,
+        "p99": round(percentile(samples_ms, 99), 3) if samples_ms else None,
+        "max": round(max(samples_ms), 3) if samples_ms else None,
+    }
+
+
+def make_database(mongo_url, db_name):
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongo_url)[db_name]
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; pip install mongomock-motor or pass --mongo-url")
+    return AsyncMongoMockClient()[db_name]
+
+
+async def seed(db, args):
+    await db.bot_config.delete_many({"user_id": {"$regex": "^load-"}})
+    await db.bot_config.insert_many([
+        {
+            "user_id": f"load-{t}", "model_provider": "stub", "model_name": "stub",
+            "fallback_provider": "stub", "fallback_model_name": "stub",
+            "response_cache_enabled": args.response_cache,
+            # No greeting, so a contact's first message goes through the LLM stage like the rest
+            "greeting_message": "",
+            "faq_text": "Q: Opening hours?\nA: 8am to 6pm, Monday to Saturday.\n" * 20,
+        }
+        for t in range(args.tenants)
+    ])
+
+
+def build_workload(args):
+    rng = random.Random(args.seed)
+    work = []
+    for i in range(args.requests):
+        tenant = rng.randrange(args.tenants)
+        jid = f"44{7000000000 + rng.randrange(args.jids)}@s.whatsapp.net"
+        text = rng.choice(BOOKINGS) if rng.random() < args.booking_ratio else f"{rng.choice(QUESTIONS)} ({i})"
+        work.append({"from": jid, "pushName": f"Load {jid[:6]}", "text": text, "timestamp": i, "user_id": f"load-{tenant}"})
+    return work
+
+
+async def run(args):
+    import httpx
+    from wa365 import llm
+    from wa365.application import create_app
+    from wa365.metrics import Trace
+    from wa365.resources import resources
+
+    resources.database = make_database(args.mongo_url, args.db_name)
+    llm.LLM_STUB_LATENCY_MS = args.llm_latency_ms
+    await seed(resources.database, args)
+    app = create_app(args.features)
+
+    stages = {}
+    outcomes = {}
+    finish = Trace.finish
+
+    def record(trace, outcome):
+        for stage, seconds in trace.stages.items():
+            stages.setdefault(stage, []).append(seconds * 1000)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        finish(trace, outcome)
+
+    Trace.finish = record
+
+    work = build_workload(args)
+    queue = asyncio.Queue()
+    for item in work:
+        queue.put_nowait(item)
+    latencies = []
+    errors = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as c:
+        async def worker():
+            while not queue.empty():
+                item = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    resp = await c.post("/api/wa/message", json=item)
+                    resp.raise_for_status()
+                except Exception as e:
+                    errors.append(str(e)[:200])
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    Trace.finish = finish
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "backend": "mongodb" if args.mongo_url else "mongomock",
+        "requests": len(work),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize(latencies),
+        "outcomes": outcomes,
+        "stages_ms": {stage: summarize(samples) for stage, samples in sorted(stages.items())},
+    }
+
+
+def print_report(result, baseline=None):
+    def delta(new, old):
+        if baseline is None or old is None or new is None or not old:
+            return ""
+        return f"  ({(new - old) / old * 100:+.1f}%)"
+
+    base_lat = (baseline or {}).get("latency_ms", {})
+    print(f"{result['requests']} requests, {result['errors']} errors, {result['duration_s']} s on {result['backend']}")
+    print(f"throughput  {result['throughput_rps']} req/s{delta(result['throughput_rps'], (baseline or {}).get('throughput_rps'))}")
+    for key in ("p50", "p95", "p99", "max"):
+        print(f"latency {key:<4}{result['latency_ms'][key]} ms{delta(result['latency_ms'][key], base_lat.get(key))}")
+    print("\nstage           count     p50 ms     p95 ms     p99 ms")
+    base_stages = (baseline or {}).get("stages_ms", {})
+    for stage, s in result["stages_ms"].items():
+        print(f"{stage:<14}{s['count']:>7}{s['p50']:>11}{s['p95']:>11}{s['p99']:>11}{delta(s['p95'], base_stages.get(stage, {}).get('p95'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--jids", type=int, default=200, help="distinct contacts shared across tenants")
+    parser.add_argument("--llm-latency-ms", type=int, default=100, help="simulated stub LLM latency")
+    parser.add_argument("--booking-ratio", type=float, default=0.1, help="share of messages that trigger a booking")
+    parser.add_argument("--response-cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--mongo-url", default=None, help="use this MongoDB instead of mongomock")
+    parser.add_argument("--db-name", default="wa365_load_test", help="database the test writes to; it is not cleaned up")
+    parser.add_argument("--features", default="all", help="app features to load, e.g. webhook (see wa365.routers)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("wa365").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    result = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(result, baseline)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"\nresults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks for the CPU-bound helpers on the message and upload paths,
+run against fixtures sized like real tenants: large keyword lists, a 50 KB FAQ,
+multi-page PDFs and a 10k-line log.
+"""
+
+import io, random, uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from wa365.helpers import detect_booking
+from wa365.knowledge import extract_text_from_docx, extract_text_from_pdf, extract_text_from_txt
+from wa365.models import BookingType, BotConfig
+from wa365.prompt import build_enriched_prompt, estimate_tokens
+from wa365.routers.stats import merge_logs
+
+WORDS = ("engine service repair quote invoice tyre battery garage booking delivery collection parts "
+         "warranty payment address schedule vehicle motorway customer account refund driver").split()
+
+
+def sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_pdf(pages, lines_per_page=45):
+    """A minimal text PDF (Helvetica, one content stream per page) that pdfplumber can read."""
+    rng = random.Random(7)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        text = "".join(f"({sentence(rng)}) Tj 0 -14 Td " for _ in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 40 800 Td {text}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def make_docx(paragraphs):
+    import docx
+
+    rng = random.Random(11)
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(" ".join(sentence(rng) for _ in range(3)) if i % 10 else "")
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+# ─── BOOKING DETECTION ────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def booking_types():
+    rng = random.Random(3)
+    return [
+        BookingType(
+            id=f"type_{i}", name=f"Type {i}", enabled=True,
+            keywords=[f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}-{k}" for k in range(40)],
+            confirmation_message="Logged.",
+        )
+        for i in range(50)
+    ]
+
+
+def test_detect_booking_no_match(booking_types, measure):
+    text = " ".join(sentence(random.Random(5)) for _ in range(20))
+    assert measure(detect_booking, text, booking_types) is None
+
+
+def test_detect_booking_last_keyword(booking_types, measure):
+    text = " ".join(sentence(random.Random(5)) for _ in range(20)) + " " + booking_types[-1].keywords[-1]
+    assert measure(detect_booking, text, booking_types).id == "type_49"
+
+
+# ─── PROMPT ASSEMBLY ──────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def prompt_tenant(db, loop):
+    rng = random.Random(9)
+    user_id = "bench-prompt"
+    faq = ""
+    while len(faq) < 50_000:
+        faq += f"Q: {sentence(rng, 8)}\nA: {sentence(rng, 30)}\n\n"
+    nodes = [{"id": "start", "type": "start", "title": "Welcome", "content": "Greet the customer", "branches": []}]
+    nodes += [{"id": f"q{i}", "type": "question", "title": f"Step {i}", "content": sentence(rng), "branches": [{"label": w, "next_id": "end"} for w in WORDS[:4]]} for i in range(20)]
+    nodes.append({"id": "end", "type": "end", "title": "Done", "content": "", "branches": []})
+    now = datetime.now(timezone.utc).isoformat()
+    docs = [
+        {"id": str(uuid.uuid4()), "user_id": user_id, "filename": f"manual-{i}.pdf", "enabled": True, "uploaded_at": now,
+         "content": " ".join(sentence(rng) for _ in range(150))}
+        for i in range(10)
+    ]
+
+    async def setup():
+        await db.workflows.insert_one({"user_id": user_id, "nodes": nodes, "active": True, "execution": "prompt", "updated_at": now})
+        await db.knowledge_docs.insert_many(docs)
+
+    loop.run_until_complete(setup())
+    config = BotConfig(faq_text=faq, business_context=" ".join(sentence(rng) for _ in range(40)))
+    return user_id, config
+
+
+def test_build_enriched_prompt_within_budget(loop, prompt_tenant, measure):
+    user_id, config = prompt_tenant
+    config = config.model_copy(update={"prompt_token_budget": 100_000})
+    prompt = measure(lambda: loop.run_until_complete(build_enriched_prompt(config, user_id)))
+    assert "FAQ:" in prompt
+
+
+def test_build_enriched_prompt_trimmed(loop, prompt_tenant, measure):
+    user_id, config = prompt_tenant
+    prompt = measure(lambda: loop.run_until_complete(build_enriched_prompt(config, user_id)))
+    assert estimate_tokens(prompt) <= config.prompt_token_budget
+
+
+# ─── KNOWLEDGE BASE EXTRACTION ────────────────────────────
+
+def test_extract_text_from_pdf(measure):
+    data = make_pdf(pages=8)
+    text = measure(extract_text_from_pdf, data)
+    assert text.count("\n\n") == 7
+
+
+def test_extract_text_from_docx(measure):
+    data = make_docx(paragraphs=2000)
+    assert measure(extract_text_from_docx, data)
+
+
+def test_extract_text_from_txt_utf8(measure):
+    data = ("Prix € — " + sentence(random.Random(1), 40) + "\n").encode("utf-8") * 4000
+    assert measure(extract_text_from_txt, data)
+
+
+def test_extract_text_from_txt_latin1(measure):
+    data = ("Café crème — " + sentence(random.Random(1), 40) + "\n").encode("cp1252") * 4000
+    assert measure(extract_text_from_txt, data)
+
+
+# ─── LOG MERGE ────────────────────────────────────────────
+
+def test_merge_logs(measure):
+    rng = random.Random(13)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    backend = [{"user_id": "u", "level": "info", "message": sentence(rng), "timestamp": (start + timedelta(seconds=10_000 - i)).isoformat()} for i in range(10_000)]
+    baileys = [{"level": "info", "message": sentence(rng), "timestamp": (start + timedelta(seconds=rng.randrange(10_000))).isoformat().replace("+00:00", "Z")} for _ in range(100)]
+    merged = measure(merge_logs, backend, baileys, 10_000)
+    assert len(merged) == 10_000
@@ -0,0 +1,28 @@
+"""ASGI entry point for a webhook-only ingestion service: `uvicorn ingest:app`.
+
+Serves just what the Baileys sidecar calls (/api/wa/message, /api/wa/event and the
+/api/wa/channel socket) plus /metrics, so none of the dashboard routers or their imports are
+loaded. Every tenant's bot config and compiled workflow are loaded at startup, and the message
+path then reuses them for BOT_CONFIG_CACHE_TTL_SECONDS / WORKFLOW_CACHE_TTL_SECONDS.
+
+Run it as its own deployment and point the sidecar's BACKEND_URL at it. The sidecar's channel
+(/api/wa/channel) is a single WebSocket held by one worker, so everything it carries is handled
+by that worker alone. To spread ingestion over several workers, start the sidecar with
+BACKEND_CHANNEL=off so every message arrives as its own HTTP request:
+
+    APP_MODULE=ingest WEB_CONCURRENCY=4 BOT_CONFIG_CACHE_TTL_SECONDS=30 docker run ... backend
+    BACKEND_URL=http://ingest:8000 BACKEND_CHANNEL=off node index.js
+
+With one ingest worker the channel can stay on. Either way, connection status events land in the
+ingest workers, so dashboard workers refresh the WhatsApp status from the sidecar every
+WA_STATUS_TTL_SECONDS instead of receiving pushes.
+"""
+
+import logging
+
+from wa365.application import create_app
+from wa365.pipeline import warm_caches
+
+logging.basicConfig(level=logging.INFO)
+
+app = create_app("webhook", startup=(warm_caches,))
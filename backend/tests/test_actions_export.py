@@ -0,0 +1,153 @@
+"""
+Unit tests for the bot actions export to Sheets (no server needed):
+- flush_actions_export: incremental appends and the high-water mark
+- changes stamped before the mark but committed after it are still exported, once
+- marks from before the margin, and a failed append
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import actions_export
+from wa365.actions_export import EXPORT_EPOCH, flush_actions_export
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class FakeSheets:
+    """Stands in for the Sheets service: records appended rows, or fails when told to."""
+
+    def __init__(self):
+        self.rows = []
+        self.fail = False
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def append(self, body, **kwargs):
+        return body["values"]
+
+    async def execute(self, values):
+        if self.fail:
+            raise RuntimeError("Sheets unavailable")
+        self.rows += values
+        return {}
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    fake = FakeSheets()
+
+    async def google_service(user_id, name, version):
+        return fake
+
+    monkeypatch.setattr(actions_export, "google_service", google_service)
+    monkeypatch.setattr(actions_export, "google_execute", fake.execute)
+    return fake
+
+
+@pytest.fixture
+def db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365 import timestamps
+    from wa365.resources import resources
+
+    # A fresh database holds no ISO strings to migrate
+    monkeypatch.setattr(timestamps, "_pending", set())
+    resources.database = AsyncMongoMockClient()["wa365_test"]
+    yield resources.database
+    resources.database = None
+
+
+def action(action_id, updated_at, status="pending"):
+    return {"action_id": action_id, "user_id": "u", "jid": "44700@s.whatsapp.net", "status": status, "created_at": updated_at, "updated_at": updated_at}
+
+
+async def flush(db, hwm):
+    await db.user_sheets.update_one({"user_id": "u", "spreadsheet_id": "s"}, {"$set": {"export_hwm": hwm}}, upsert=True)
+    binding = await db.user_sheets.find_one({"user_id": "u", "spreadsheet_id": "s"})
+    return await flush_actions_export(binding)
+
+
+async def stored_hwm(db):
+    return (await db.user_sheets.find_one({"user_id": "u", "spreadsheet_id": "s"}))["export_hwm"]
+
+
+def references(rows):
+    return [row[1] for row in rows]
+
+
+# ─── HIGH-WATER MARK ──────────────────────────────────────
+
+class TestFlush:
+
+    def test_backfill_then_only_changes(self, db, sheets):
+        async def scenario():
+            await db.bot_actions.insert_many([action(f"a{i}", NOW - timedelta(minutes=5 - i)) for i in range(3)])
+            first = await flush(db, {"updated_at": EXPORT_EPOCH, "action_id": ""})
+            again = await flush_actions_export(await db.user_sheets.find_one({"user_id": "u"}))
+            await db.bot_actions.update_one({"action_id": "a0"}, {"$set": {"status": "approved", "updated_at": NOW}})
+            changed = await flush_actions_export(await db.user_sheets.find_one({"user_id": "u"}))
+            return first, again, changed
+
+        assert asyncio.run(scenario()) == (3, 0, 1)
+        assert references(sheets.rows) == ["A0", "A1", "A2", "A0"]
+        assert sheets.rows[-1][3] == "approved"
+
+    def test_late_commit_behind_the_mark_is_exported_once(self, db, sheets):
+        async def scenario():
+            await db.bot_actions.insert_one(action("a1", NOW))
+            await flush(db, {"updated_at": EXPORT_EPOCH, "action_id": ""})
+            # Stamped before the exporter advanced the mark, committed after it
+            await db.bot_actions.insert_one(action("a0", NOW - timedelta(seconds=10)))
+            late = await flush_actions_export(await db.user_sheets.find_one({"user_id": "u"}))
+            again = await flush_actions_export(await db.user_sheets.find_one({"user_id": "u"}))
+            return late, again, await stored_hwm(db)
+
+        late, again, hwm = asyncio.run(scenario())
+        assert (late, again) == (1, 0)
+        assert references(sheets.rows) == ["A1", "A0"]
+        assert sorted(k.split("@")[0] for k in hwm["seen"]) == ["a0", "a1"]
+
+    def test_seen_is_pruned_to_the_margin(self, db, sheets):
+        async def scenario():
+            await db.bot_actions.insert_many([action("old", NOW - timedelta(minutes=10)), action("new", NOW)])
+            await flush(db, {"updated_at": EXPORT_EPOCH, "action_id": ""})
+            return await stored_hwm(db)
+
+        hwm = asyncio.run(scenario())
+        assert [k.split("@")[0] for k in hwm["seen"]] == ["new"]
+
+    def test_mark_without_seen_is_not_re_exported(self, db, sheets):
+        async def scenario():
+            await db.bot_actions.insert_many([action("a0", NOW - timedelta(seconds=20)), action("a1", NOW - timedelta(seconds=10)), action("a2", NOW)])
+            return await flush(db, {"updated_at": (NOW - timedelta(seconds=10)).isoformat(), "action_id": "a1"})
+
+        assert asyncio.run(scenario()) == 1
+        assert references(sheets.rows) == ["A2"]
+
+    def test_failed_append_keeps_the_mark(self, db, sheets):
+        async def scenario():
+            await db.bot_actions.insert_one(action("a0", NOW))
+            sheets.fail = True
+            with pytest.raises(RuntimeError):
+                await flush(db, {"updated_at": EXPORT_EPOCH, "action_id": ""})
+            unchanged = await stored_hwm(db)
+            sheets.fail = False
+            return unchanged, await flush_actions_export(await db.user_sheets.find_one({"user_id": "u"}))
+
+        unchanged, retried = asyncio.run(scenario())
+        assert unchanged["action_id"] == "" and "seen" not in unchanged
+        assert retried == 1
+        assert references(sheets.rows) == ["A0"]
@@ -0,0 +1,95 @@
+"""
+Unit tests for burst coalescing (no server needed):
+- coalesce_join: only the last message of a window answers, for every buffered text
+- coalesce_done: answered texts dropped, later ones kept
+- process_incoming_message: a turn that fails releases its buffered texts
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import pipeline
+from wa365.coalesce import _coalesce_buffers, coalesce_done, coalesce_join, coalesce_pending
+from wa365.helpers import forget_bot_config
+from wa365.metrics import Trace
+from wa365.models import IncomingMessage
+
+WINDOW_MS = 20
+
+
+@pytest.fixture(autouse=True)
+def buffers():
+    _coalesce_buffers.clear()
+    yield _coalesce_buffers
+    _coalesce_buffers.clear()
+
+
+@pytest.fixture
+def db():
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365.resources import resources
+
+    resources.database = AsyncMongoMockClient()["wa365_test"]
+    forget_bot_config("u")
+    yield resources.database
+    resources.database = None
+    forget_bot_config("u")
+
+
+def incoming(text):
+    return IncomingMessage(**{"from": "j", "pushName": "Sam", "text": text, "timestamp": 0, "user_id": "u"})
+
+
+# ─── WINDOW ───────────────────────────────────────────────
+
+class TestCoalesceJoin:
+
+    def test_last_message_answers_the_burst(self):
+        async def scenario():
+            first = asyncio.ensure_future(coalesce_join("u", "j", "hello", WINDOW_MS))
+            await asyncio.sleep(0)
+            second = await coalesce_join("u", "j", "are you open?", WINDOW_MS)
+            return await first, second, coalesce_pending("u", "j")
+
+        first, second, pending = asyncio.run(scenario())
+        assert first is None
+        assert second == 2
+        assert pending == ["hello", "are you open?"]
+
+    def test_done_keeps_texts_that_arrived_since(self, buffers):
+        async def scenario():
+            await coalesce_join("u", "j", "one", 0)
+            answered = len(coalesce_pending("u", "j"))
+            await coalesce_join("u", "j", "two", 0)
+            coalesce_done("u", "j", answered)
+            kept = coalesce_pending("u", "j")
+            coalesce_done("u", "j", len(kept))
+            return kept
+
+        assert asyncio.run(scenario()) == ["two"]
+        assert ("u", "j") not in buffers
+
+
+# ─── CLEANUP ──────────────────────────────────────────────
+
+class TestPipelineCleanup:
+
+    def test_failed_turn_releases_its_texts(self, db, buffers, monkeypatch):
+        async def broken_prompt(config, user_id):
+            raise RuntimeError("prompt build failed")
+
+        async def scenario():
+            await db.bot_config.insert_one({"user_id": "u", "greeting_message": "", "coalesce_enabled": True, "coalesce_window_ms": WINDOW_MS})
+            monkeypatch.setattr(pipeline, "build_enriched_prompt", broken_prompt)
+            with pytest.raises(RuntimeError):
+                await pipeline.process_incoming_message(incoming("hello"), Trace("u"))
+
+        asyncio.run(scenario())
+        assert ("u", "j") not in buffers
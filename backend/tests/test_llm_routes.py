@@ -0,0 +1,118 @@
+"""
+Unit tests for the LLM route chain (no server needed):
+- llm_routes: primary then fallback, unconfigured providers skipped, latency routing
+- llm_generate: fallback on failure, hedging, LLMError when every route fails
+- cooldown: a route that failed repeatedly sits out LLM_FAILURE_COOLDOWN_SECONDS
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import llm
+from wa365.llm import LLM_FAILURE_COOLDOWN_SECONDS, LLMError, LLMProvider, llm_generate, llm_route_stats, llm_routes
+from wa365.models import BotConfig
+
+
+class FakeProvider(LLMProvider):
+    """Answers with its name after `delay` seconds, or raises while `failing`."""
+
+    def __init__(self, name, delay=0.0, failing=False):
+        self.name, self.delay, self.failing, self.calls = name, delay, failing, 0
+
+    async def generate(self, prompt, model, params, user_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}:{model}"
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    fakes = {"primary": FakeProvider("primary"), "backup": FakeProvider("backup")}
+    for name, provider in fakes.items():
+        monkeypatch.setitem(llm.LLM_PROVIDERS, name, provider)
+    monkeypatch.setattr(llm, "LLM_PROVIDER_OVERRIDE", "")
+    llm._llm_routes.clear()
+    yield fakes
+    llm._llm_routes.clear()
+
+
+def config(**overrides):
+    return BotConfig(**{"model_provider": "primary", "model_name": "m1", "fallback_provider": "backup", "fallback_model_name": "m2", **overrides})
+
+
+# ─── ROUTES ───────────────────────────────────────────────
+
+class TestRoutes:
+
+    def test_primary_then_fallback(self, providers):
+        assert llm_routes(config()) == [("primary", "m1"), ("backup", "m2")]
+
+    def test_unconfigured_or_unknown_provider_is_skipped(self, providers, monkeypatch):
+        monkeypatch.setattr(llm, "OPENAI_API_KEY", "")
+        assert llm_routes(config(model_provider="openai")) == [("backup", "m2")]
+        assert llm_routes(config(model_provider="nonexistent")) == [("backup", "m2")]
+
+    def test_latency_routing_prefers_a_much_faster_fallback(self, providers):
+        llm._llm_routes["primary:m1"] = {"ewma_ms": 900.0, "calls": 5, "failures": 0, "last_failure": 0.0}
+        llm._llm_routes["backup:m2"] = {"ewma_ms": 100.0, "calls": 5, "failures": 0, "last_failure": 0.0}
+        assert llm_routes(config())[0] == ("primary", "m1")
+        assert llm_routes(config(latency_routing=True))[0] == ("backup", "m2")
+
+
+# ─── GENERATION ───────────────────────────────────────────
+
+class TestGenerate:
+
+    def test_falls_back_when_primary_fails(self, providers):
+        providers["primary"].failing = True
+        assert asyncio.run(llm_generate("hi", "u", config())) == "backup:m2"
+        stats = llm_route_stats([("primary", "m1"), ("backup", "m2")])
+        assert stats["primary:m1"]["failures"] == 1
+        assert stats["backup:m2"]["calls"] == 1
+
+    def test_every_route_failing_raises(self, providers):
+        providers["primary"].failing = providers["backup"].failing = True
+        with pytest.raises(LLMError, match="primary:m1.*backup:m2"):
+            asyncio.run(llm_generate("hi", "u", config()))
+
+    def test_hedge_starts_the_fallback_when_primary_is_slow(self, providers):
+        providers["primary"].delay = 1.0
+        assert asyncio.run(llm_generate("hi", "u", config(hedge_after_ms=20))) == "backup:m2"
+        assert providers["primary"].calls == providers["backup"].calls == 1
+
+    def test_no_hedge_waits_for_primary(self, providers):
+        providers["primary"].delay = 0.05
+        assert asyncio.run(llm_generate("hi", "u", config())) == "primary:m1"
+        assert providers["backup"].calls == 0
+
+
+# ─── COOLDOWN ─────────────────────────────────────────────
+
+class TestCooldown:
+
+    def test_repeated_failures_cool_the_route_down(self, providers):
+        providers["primary"].failing = True
+        for _ in range(3):
+            asyncio.run(llm_generate("hi", "u", config()))
+        assert llm_routes(config()) == [("backup", "m2")]
+        asyncio.run(llm_generate("hi", "u", config()))
+        assert providers["primary"].calls == 3
+
+    def test_route_returns_after_the_cooldown_and_recovers(self, providers):
+        providers["primary"].failing = True
+        for _ in range(3):
+            asyncio.run(llm_generate("hi", "u", config()))
+        llm._llm_routes["primary:m1"]["last_failure"] -= LLM_FAILURE_COOLDOWN_SECONDS + 1
+        providers["primary"].failing = False
+        assert llm_routes(config())[0] == ("primary", "m1")
+        assert asyncio.run(llm_generate("hi", "u", config())) == "primary:m1"
+        assert llm._llm_routes["primary:m1"]["failures"] == 0
@@ -0,0 +1,114 @@
+"""
+Unit tests for message archival (no server needed):
+- archive_messages: round-trip through the archive files and the counts
+- a run that fails before deleting its batch leaves history complete and without duplicates
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import message_store
+from wa365.message_store import archive_messages, archived_counts, has_history, message_history, store_message
+
+OLD = datetime.now(timezone.utc) - timedelta(days=90)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365.resources import resources
+
+    monkeypatch.setattr(message_store, "MESSAGE_ARCHIVE_DIR", tmp_path)
+    monkeypatch.setattr(message_store, "_legacy", False)
+    resources.database = AsyncMongoMockClient()["wa365_test"]
+    yield resources.database
+    resources.database = None
+
+
+async def seed(old=6, recent=2):
+    for i in range(old):
+        await store_message("u", "j", "user" if i % 2 == 0 else "assistant", f"old {i}", OLD + timedelta(minutes=i))
+    for i in range(recent):
+        await store_message("u", "j", "user", f"new {i}", datetime.now(timezone.utc) - timedelta(minutes=recent - i))
+
+
+def texts(history):
+    return [m["text"] for m in history]
+
+
+EXPECTED = [f"old {i}" for i in range(6)] + ["new 0", "new 1"]
+
+
+# ─── ARCHIVAL ─────────────────────────────────────────────
+
+class TestArchiveMessages:
+
+    def test_round_trip(self, db):
+        async def scenario():
+            await seed()
+            archived = await archive_messages(30)
+            return archived, await db.messages.count_documents({}), await message_history("u", "j", 100), await archived_counts("u")
+
+        archived, hot, history, counts = asyncio.run(scenario())
+        assert archived == 6 and hot == 2
+        assert texts(history) == EXPECTED
+        assert history[0]["role"] == "user" and history[1]["role"] == "assistant"
+        assert counts == {"total": 6, "user": 3, "assistant": 3}
+
+    def test_limit_spans_archive_and_mongo(self, db):
+        async def scenario():
+            await seed()
+            await archive_messages(30)
+            return await message_history("u", "j", 4), await message_history("u", "j", 7)
+
+        first, more = asyncio.run(scenario())
+        assert texts(first) == EXPECTED[:4]
+        assert texts(more) == EXPECTED[:7]
+
+    def test_failed_index_step_keeps_history(self, db, monkeypatch):
+        collection = type(db.message_archives)
+        update_one = collection.update_one
+
+        async def failing(self, *args, **kwargs):
+            if self.name == "message_archives":
+                raise RuntimeError("index write failed")
+            return await update_one(self, *args, **kwargs)
+
+        async def scenario():
+            await seed()
+            monkeypatch.setattr(collection, "update_one", failing)
+            with pytest.raises(RuntimeError):
+                await archive_messages(30)
+            assert await has_history("u", "j")
+            return await message_history("u", "j", 100)
+
+        assert texts(asyncio.run(scenario())) == EXPECTED
+
+    def test_interrupted_before_delete_leaves_no_duplicates(self, db, monkeypatch):
+        collection = type(db.messages)
+
+        async def crash(self, *args, **kwargs):
+            raise RuntimeError("worker died")
+
+        async def scenario():
+            await seed()
+            with monkeypatch.context() as m:
+                m.setattr(collection, "delete_many", crash)
+                with pytest.raises(RuntimeError):
+                    await archive_messages(30)
+            during = await message_history("u", "j", 100)
+            await archive_messages(30)
+            return during, await message_history("u", "j", 100), await archived_counts("u")
+
+        during, after, counts = asyncio.run(scenario())
+        assert texts(during) == EXPECTED
+        assert texts(after) == EXPECTED
+        assert counts["total"] == 6
@@ -0,0 +1,135 @@
+"""
+Unit tests for the outbound queue (no server needed):
+- _claim_outbound: one claim per delivery, expired leases reclaimed
+- recover_outbound: startup recovery and the periodic reclaim of stalled deliveries
+- _finish_outbound: retry scheduling and giving up after OUTBOUND_MAX_ATTEMPTS
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import outbound
+from wa365.outbound import OUTBOUND_LEASE_SECONDS, OUTBOUND_MAX_ATTEMPTS, _claim_outbound, _finish_outbound, recover_outbound
+from wa365.timestamps import as_utc
+
+
+@pytest.fixture
+def db():
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365.resources import resources
+
+    resources.database = AsyncMongoMockClient()["wa365_test"]
+    yield resources.database
+    resources.database = None
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(outbound, "schedule_outbound", lambda user_id, delivery_id, delay=0: calls.append((delivery_id, delay)))
+    return calls
+
+
+def delivery(id, status="queued", due=0, lease=None, attempts=0):
+    now = datetime.now(timezone.utc)
+    doc = {"id": id, "user_id": "u", "jid": "j", "message": "hi", "idempotency_key": id, "status": status, "attempts": attempts, "next_attempt_at": now + timedelta(seconds=due)}
+    if lease is not None:
+        doc["lease_until"] = now + timedelta(seconds=lease)
+    return doc
+
+
+# ─── LEASES ───────────────────────────────────────────────
+
+class TestClaim:
+
+    def test_claimed_once(self, db):
+        async def scenario():
+            await db.outbound_messages.insert_one(delivery("a"))
+            return await _claim_outbound("a"), await _claim_outbound("a"), await db.outbound_messages.find_one({"id": "a"})
+
+        first, second, stored = asyncio.run(scenario())
+        assert first["attempts"] == 1
+        assert second is None
+        assert stored["status"] == "sending"
+        assert as_utc(stored["lease_until"]) > datetime.now(timezone.utc)
+
+    def test_expired_lease_is_reclaimed(self, db):
+        async def scenario():
+            await db.outbound_messages.insert_many([delivery("dead", "sending", lease=-1, attempts=1), delivery("live", "sending", lease=30, attempts=1)])
+            return await _claim_outbound("dead"), await _claim_outbound("live")
+
+        dead, live = asyncio.run(scenario())
+        assert dead["attempts"] == 2
+        assert live is None
+
+
+class TestRecover:
+
+    def test_startup_schedules_each_at_its_due_time(self, db, scheduled):
+        async def scenario():
+            await db.outbound_messages.insert_many([
+                delivery("now"), delivery("later", due=30), delivery("dead", "sending", lease=-1),
+                delivery("live", "sending", lease=30), delivery("sent", "sent"),
+            ])
+            return await recover_outbound()
+
+        assert asyncio.run(scenario()) == 3
+        delays = dict(scheduled)
+        assert set(delays) == {"now", "later", "dead"}
+        assert delays["now"] == delays["dead"] == 0
+        assert 25 < delays["later"] <= 30
+
+    def test_periodic_reclaim_takes_only_stalled_deliveries(self, db, scheduled):
+        async def scenario():
+            await db.outbound_messages.insert_many([
+                delivery("lost-retry", due=-2 * OUTBOUND_LEASE_SECONDS), delivery("backlog", due=-1),
+                delivery("later", due=30), delivery("dead", "sending", lease=-1), delivery("live", "sending", lease=30),
+            ])
+            return await recover_outbound(overdue=True)
+
+        assert asyncio.run(scenario()) == 2
+        assert sorted(d for d, _ in scheduled) == ["dead", "lost-retry"]
+
+
+# ─── RESULTS ──────────────────────────────────────────────
+
+class TestFinish:
+
+    def test_failure_is_retried_with_backoff(self, db, scheduled):
+        async def scenario():
+            await db.outbound_messages.insert_one(delivery("a"))
+            doc = await _claim_outbound("a")
+            await _finish_outbound("u", doc, {"success": False, "error": "offline"})
+            return await db.outbound_messages.find_one({"id": "a"})
+
+        stored = asyncio.run(scenario())
+        assert stored["status"] == "queued" and stored["last_error"] == "offline"
+        assert as_utc(stored["next_attempt_at"]) > datetime.now(timezone.utc)
+        assert scheduled and scheduled[0][1] > 0
+
+    def test_gives_up_after_max_attempts(self, db, scheduled):
+        async def scenario():
+            await db.outbound_messages.insert_one(delivery("a", attempts=OUTBOUND_MAX_ATTEMPTS - 1))
+            doc = await _claim_outbound("a")
+            await _finish_outbound("u", doc, {"success": False, "error": "offline"})
+            return await db.outbound_messages.find_one({"id": "a"})
+
+        assert asyncio.run(scenario())["status"] == "failed"
+        assert scheduled == []
+
+    def test_success(self, db, scheduled):
+        async def scenario():
+            await db.outbound_messages.insert_one(delivery("a"))
+            await _finish_outbound("u", await _claim_outbound("a"), {"success": True})
+            return await db.outbound_messages.find_one({"id": "a"})
+
+        stored = asyncio.run(scenario())
+        assert stored["status"] == "sent" and stored["sent_at"]
@@ -0,0 +1,105 @@
+"""
+Unit tests for the LLM reply cache (no server needed):
+- exact tier: hits within a prompt version, misses across versions and after expiry
+- fuzzy tier: reworded questions hit; near misses that differ in a day, date or number miss
+- invalidation and eviction keep the fuzzy index in step with the cache
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import response_cache
+from wa365.models import BotConfig
+from wa365.response_cache import invalidate_response_cache, response_cache_get, response_cache_put, response_cache_stats
+
+PROMPT = "You are the assistant for Example Garage."
+FUZZY = BotConfig(response_cache_fuzzy=True)
+
+
+@pytest.fixture(autouse=True)
+def cache():
+    response_cache._response_cache.clear()
+    response_cache._response_index.clear()
+    response_cache._response_cache_stats.clear()
+    yield
+    response_cache._response_cache.clear()
+    response_cache._response_index.clear()
+    response_cache._response_cache_stats.clear()
+
+
+# ─── EXACT ────────────────────────────────────────────────
+
+class TestExact:
+
+    def test_hit_after_normalization(self):
+        response_cache_put("u", PROMPT, "What are your opening hours?", "9 to 5", BotConfig())
+        assert response_cache_get("u", PROMPT, "what are your opening hours", BotConfig()) == "9 to 5"
+
+    def test_prompt_change_and_other_tenants_miss(self):
+        response_cache_put("u", PROMPT, "hello", "Hi!", BotConfig())
+        assert response_cache_get("u", PROMPT + " Be brief.", "hello", BotConfig()) is None
+        assert response_cache_get("other", PROMPT, "hello", BotConfig()) is None
+
+    def test_expired_entry_is_dropped(self):
+        response_cache_put("u", PROMPT, "hello", "Hi!", BotConfig(response_cache_ttl_seconds=1))
+        for key, (reply, expires_at) in list(response_cache._response_cache.items()):
+            response_cache._response_cache[key] = (reply, expires_at - 2)
+        assert response_cache_get("u", PROMPT, "hello", FUZZY) is None
+        assert response_cache_stats("u")["entries"] == 0
+
+
+# ─── FUZZY ────────────────────────────────────────────────
+
+class TestFuzzy:
+
+    def test_reworded_question_hits(self):
+        response_cache_put("u", PROMPT, "can i book a service for my car on saturday morning", "Yes, from 8am.", FUZZY)
+        assert response_cache_get("u", PROMPT, "can i book a service for my car on saturday morning please", FUZZY) == "Yes, from 8am."
+        assert response_cache_stats("u")["fuzzy_hits"] == 1
+
+    def test_off_by_default(self):
+        response_cache_put("u", PROMPT, "can i book a service for my car on saturday morning", "Yes, from 8am.", BotConfig())
+        assert response_cache_get("u", PROMPT, "can i book a service for my car on saturday morning please", BotConfig()) is None
+
+    @pytest.mark.parametrize("cached, asked", [
+        ("can i book a service for my car on saturday morning", "can i book a service for my car on sunday morning"),
+        ("can i book a service for my car on saturday morning", "can i book a service for my car tomorrow morning"),
+        ("is there a slot for my car service at 10 on the 3rd of may", "is there a slot for my car service at 11 on the 3rd of may"),
+        ("is there a slot for my car service at 10 on the 3rd of may", "is there a slot for my car service at 10 on the 3rd of june"),
+        ("do you have 2 tyres in stock for my car today", "do you have 4 tyres in stock for my car today"),
+        ("can i book a service for my car on saturday morning", "can i book a service for my car on saturday morning at 9"),
+    ])
+    def test_near_miss_with_different_day_date_or_number(self, cached, asked):
+        response_cache_put("u", PROMPT, cached, "cached reply", FUZZY)
+        assert response_cache_get("u", PROMPT, asked, FUZZY) is None
+
+    def test_best_match_wins(self):
+        response_cache_put("u", PROMPT, "how much is a full service for a small car", "£150", FUZZY)
+        response_cache_put("u", PROMPT, "how much is a full service for a large car", "£190", FUZZY)
+        assert response_cache_get("u", PROMPT, "how much is a full service for a small car please", FUZZY) == "£150"
+
+
+# ─── INDEX ────────────────────────────────────────────────
+
+class TestIndex:
+
+    def test_invalidate_clears_fuzzy_candidates(self):
+        response_cache_put("u", PROMPT, "can i book a service for my car on saturday morning", "Yes, from 8am.", FUZZY)
+        response_cache_put("other", PROMPT, "hello", "Hi!", FUZZY)
+        invalidate_response_cache("u")
+        assert response_cache_get("u", PROMPT, "can i book a service for my car on saturday morning please", FUZZY) is None
+        assert response_cache_stats("u")["entries"] == 0
+        assert response_cache_stats("other")["entries"] == 1
+
+    def test_eviction_drops_index_entries(self, monkeypatch):
+        monkeypatch.setattr(response_cache, "RESPONSE_CACHE_MAX_ENTRIES", 2)
+        for i, word in enumerate(["alpha", "beta", "gamma"]):
+            response_cache_put("u", PROMPT, f"question {word}", f"reply {i}", FUZZY)
+        assert response_cache_stats("u")["entries"] == 2
+        assert "question alpha" not in response_cache._response_index[("u", response_cache.prompt_version(PROMPT))]
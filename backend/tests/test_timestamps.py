@@ -0,0 +1,125 @@
+"""
+Unit tests for the datetime helpers and the ISO string migration (no server needed):
+- as_utc / iso: stored datetimes, naive values and legacy strings
+- since / before: both forms matched while a field is pending
+- migrate_field: strings converted, unparseable values cleared, field marked done
+- get_current_user: sessions without a usable expiry are rejected
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365 import timestamps
+from wa365.timestamps import as_utc, before, iso, migrate_field, migrating, since
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    from mongomock_motor import AsyncMongoMockClient
+    from wa365.resources import resources
+
+    resources.database = AsyncMongoMockClient()["wa365_test"]
+    pending = set(timestamps._pending)
+    yield resources.database
+    resources.database = None
+    timestamps._pending.clear()
+    timestamps._pending.update(pending)
+
+
+# ─── HELPERS ──────────────────────────────────────────────
+
+class TestConversions:
+
+    @pytest.mark.parametrize("value", [NOW, NOW.replace(tzinfo=None), NOW.isoformat(), "2026-03-01T13:00:00+01:00"])
+    def test_as_utc(self, value):
+        assert as_utc(value) == NOW
+        assert as_utc(value).tzinfo == timezone.utc
+
+    @pytest.mark.parametrize("value", [None, ""])
+    def test_empty(self, value):
+        assert as_utc(value) is None
+        assert iso(value) == ""
+
+    def test_iso(self):
+        assert iso(NOW.replace(tzinfo=None)) == "2026-03-01T12:00:00+00:00"
+
+
+class TestRangeFilters:
+
+    def test_pending_field_matches_both_forms(self, db):
+        timestamps._pending.add(("logs", "timestamp"))
+        assert since("logs", "timestamp", NOW) == {"$or": [{"timestamp": {"$gte": NOW}}, {"timestamp": {"$gte": NOW.isoformat()}}]}
+        assert before("logs", "timestamp", NOW) == {"$or": [{"timestamp": {"$lt": NOW}}, {"timestamp": {"$lt": NOW.isoformat()}}]}
+
+    def test_migrated_field_matches_datetimes(self, db):
+        timestamps._pending.discard(("logs", "timestamp"))
+        assert since("logs", "timestamp", NOW) == {"timestamp": {"$gte": NOW}}
+        assert before("logs", "timestamp", NOW) == {"timestamp": {"$lt": NOW}}
+
+
+# ─── MIGRATION ────────────────────────────────────────────
+
+class TestMigrateField:
+
+    def test_converts_strings(self, db):
+        async def scenario():
+            await db.outbound_messages.insert_many([
+                {"id": "a", "lease_until": NOW.isoformat()},
+                {"id": "b", "lease_until": NOW},
+                {"id": "c", "lease_until": "not a date"},
+                {"id": "d"},
+            ])
+            timestamps._pending.add(("outbound_messages", "lease_until"))
+            migrated = await migrate_field("outbound_messages", "lease_until")
+            docs = {d["id"]: d async for d in db.outbound_messages.find({})}
+            return migrated, docs
+
+        migrated, docs = asyncio.run(scenario())
+        assert migrated == 2
+        assert as_utc(docs["a"]["lease_until"]) == NOW
+        assert as_utc(docs["b"]["lease_until"]) == NOW
+        assert docs["c"]["lease_until"] is None
+        assert "lease_until" not in docs["d"]
+        assert not migrating("outbound_messages", "lease_until")
+
+    def test_in_batches(self, db, monkeypatch):
+        monkeypatch.setattr(timestamps, "DATETIME_MIGRATE_BATCH", 3)
+
+        async def scenario():
+            await db.bot_actions.insert_many([{"action_id": str(i), "updated_at": (NOW + timedelta(minutes=i)).isoformat()} for i in range(10)])
+            migrated = await migrate_field("bot_actions", "updated_at")
+            return migrated, await db.bot_actions.count_documents({"updated_at": {"$gte": NOW}})
+
+        assert asyncio.run(scenario()) == (10, 10)
+
+
+# ─── SESSIONS ─────────────────────────────────────────────
+
+class TestSessionExpiry:
+
+    @pytest.mark.parametrize("expires_at", [None, NOW - timedelta(days=1)])
+    def test_expired_or_unusable(self, db, expires_at):
+        from starlette.requests import Request
+        from wa365.auth import get_current_user
+
+        async def scenario():
+            await db.user_sessions.insert_one({"user_id": "u", "session_token": "s", "expires_at": expires_at})
+            request = Request({"type": "http", "headers": [(b"cookie", b"session_token=s")]})
+            with pytest.raises(HTTPException) as exc:
+                await get_current_user(request)
+            return exc.value
+
+        error = asyncio.run(scenario())
+        assert error.status_code == 401
+        assert error.detail == "Session expired"
@@ -0,0 +1,175 @@
+"""
+Unit tests for the workflow compiler and engine (no server needed):
+- compile_workflow: indexing, validation report, execution default
+- match_branch: option numbers, whole-word labels, free text
+- run_workflow: start, branching, collect, option-less questions, escalation
+- workflow_turn: state persistence and the idle reset
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wa365_test")
+
+from wa365.workflow import WORKFLOW_DONE, compile_workflow, match_branch, run_workflow, workflow_turn
+
+YES_NO = [{"label": "Yes", "next_id": None}, {"label": "No", "next_id": None}]
+
+
+def node(id, type, content="", title="", branches=None, position=0):
+    return {"id": id, "type": type, "title": title or id, "content": content, "branches": branches or [], "position": position}
+
+
+def flow(*nodes):
+    return [{**n, "position": i} for i, n in enumerate(nodes)]
+
+
+@pytest.fixture
+def booking_graph():
+    return compile_workflow(flow(
+        node("start", "start", "Welcome!"),
+        node("kind", "question", "What do you need?", branches=[{"label": "Repair", "next_id": "details"}, {"label": "Quote", "next_id": "agent"}]),
+        node("details", "collect", "Collect: registration and postcode"),
+        node("done", "end", "Thanks, we'll be in touch."),
+        node("agent", "escalate", "Passing you to a colleague."),
+    ), execution="engine", version="v1")
+
+
+# ─── COMPILER ─────────────────────────────────────────────
+
+class TestCompileWorkflow:
+
+    def test_indexes_nodes_and_successors(self, booking_graph):
+        assert booking_graph["start"] == "start"
+        assert booking_graph["order"] == ["start", "kind", "details", "done", "agent"]
+        assert booking_graph["next"]["details"] == "done"
+        assert booking_graph["edges"]["kind"] == ["details", "agent"]
+        assert booking_graph["report"]["errors"] == []
+
+    def test_execution_defaults_to_prompt(self):
+        assert compile_workflow(flow(node("s", "start", "Hi")))["execution"] == "prompt"
+
+    def test_reports_errors(self):
+        graph = compile_workflow(flow(
+            node("a", "start"),
+            node("a", "message"),
+            node("b", "bogus"),
+            node("q", "question", branches=[{"label": "Go", "next_id": "missing"}]),
+        ))
+        errors = graph["report"]["errors"]
+        assert "Duplicate step id a" in errors
+        assert any("unknown type bogus" in e for e in errors)
+        assert graph["report"]["dangling"] == [{"node": "q", "branch": "Go", "next_id": "missing"}]
+
+    def test_reports_warnings(self):
+        graph = compile_workflow(flow(
+            node("m", "message", "Hello"),
+            node("q", "question", branches=[{"label": "Again", "next_id": "m"}, {"label": "Stop", "next_id": "q"}]),
+            node("orphan", "message"),
+        ))
+        warnings = graph["report"]["warnings"]
+        assert "No Start step; the flow begins at the first step" in warnings
+        assert any(w.startswith("No End or Escalate step") for w in warnings)
+        assert graph["report"]["unreachable"] == ["orphan"]
+        assert graph["report"]["cycles"]
+
+
+# ─── BRANCH MATCHING ──────────────────────────────────────
+
+class TestMatchBranch:
+
+    @pytest.mark.parametrize("text,label", [("1", "Yes"), ("2", "No"), ("Yes!", "Yes"), ("no thanks", "No"), ("yes please", "Yes")])
+    def test_matches(self, text, label):
+        assert match_branch(text, YES_NO)["label"] == label
+
+    @pytest.mark.parametrize("text", ["I'm not sure", "I know", "nothing", "now please", "3", "", "yesterday"])
+    def test_free_text_does_not_match(self, text):
+        assert match_branch(text, YES_NO) is None
+
+    def test_partial_and_distinctive_words(self):
+        branches = [{"label": "Tyre replacement", "next_id": None}, {"label": "Engine service", "next_id": None}]
+        assert match_branch("tyre", branches)["label"] == "Tyre replacement"
+        assert match_branch("my engine is making noises", branches)["label"] == "Engine service"
+
+
+# ─── ENGINE ───────────────────────────────────────────────
+
+class TestRunWorkflow:
+
+    def test_first_message_runs_to_first_question(self, booking_graph):
+        result = run_workflow(booking_graph, {}, "hello")
+        assert result["reply"] == "Welcome!\n\nWhat do you need?\n1. Repair\n2. Quote"
+        assert result["state"]["node"] == "kind"
+
+    def test_branch_then_collect_then_end(self, booking_graph):
+        state = run_workflow(booking_graph, {}, "hello")["state"]
+        result = run_workflow(booking_graph, state, "repair")
+        assert result["state"]["node"] == "details"
+        assert result["reply"] == "Please send me the following details: registration and postcode"
+        result = run_workflow(booking_graph, result["state"], "AB12 CDE, SW1")
+        assert result["state"] == {"node": WORKFLOW_DONE, "fields": {"kind": "Repair", "details": "AB12 CDE, SW1"}}
+        assert result["reply"] == "Thanks, we'll be in touch."
+
+    def test_unmatched_reply_leaves_state_and_hints(self, booking_graph):
+        state = run_workflow(booking_graph, {}, "hello")["state"]
+        result = run_workflow(booking_graph, state, "I'm not sure")
+        assert result["reply"] is None
+        assert result["state"] is state
+        assert "did not match an option (Repair | Quote)" in result["hint"]
+
+    def test_escalate(self, booking_graph):
+        state = run_workflow(booking_graph, {}, "hello")["state"]
+        result = run_workflow(booking_graph, state, "2")
+        assert result["escalate"] is True
+        assert result["state"]["node"] == WORKFLOW_DONE
+
+    def test_question_without_options_takes_the_reply(self):
+        graph = compile_workflow(flow(node("s", "start", "Hi"), node("name", "question", "Your name?"), node("e", "end", "Bye")), execution="engine")
+        state = run_workflow(graph, {}, "hello")["state"]
+        assert state["node"] == "name"
+        result = run_workflow(graph, state, "Sam")
+        assert result["state"] == {"node": WORKFLOW_DONE, "fields": {"name": "Sam"}}
+        assert result["reply"] == "Bye"
+
+    def test_done_is_final(self, booking_graph):
+        result = run_workflow(booking_graph, {"node": WORKFLOW_DONE, "fields": {}}, "hello again")
+        assert result["reply"] is None and result["hint"] is None
+
+
+# ─── TURNS ────────────────────────────────────────────────
+
+class TestWorkflowTurn:
+
+    @pytest.fixture
+    def db(self):
+        from mongomock_motor import AsyncMongoMockClient
+        from wa365.resources import resources
+
+        resources.database = AsyncMongoMockClient()["wa365_test"]
+        yield resources.database
+        resources.database = None
+
+    def test_inactive_or_prompt_workflows_are_skipped(self, db, booking_graph):
+        assert asyncio.run(workflow_turn("u", "j", "hi", None)) is None
+        assert asyncio.run(workflow_turn("u", "j", "hi", {**booking_graph, "execution": "prompt"})) is None
+
+    def test_state_is_persisted_and_reset_when_idle(self, db, booking_graph):
+        async def scenario():
+            await workflow_turn("u", "j", "hello", booking_graph)
+            await workflow_turn("u", "j", "2", booking_graph)
+            conv = await db.conversations.find_one({"user_id": "u", "jid": "j"})
+            assert conv["workflow_state"]["node"] == WORKFLOW_DONE
+            assert (await workflow_turn("u", "j", "hello", booking_graph))["reply"] is None
+            stale = datetime.now(timezone.utc) - timedelta(days=2)
+            await db.conversations.update_one({"user_id": "u", "jid": "j"}, {"$set": {"workflow_state.updated_at": stale}})
+            return await workflow_turn("u", "j", "hello", booking_graph)
+
+        result = asyncio.run(scenario())
+        assert result["state"]["node"] == "kind"
+        assert result["reply"].startswith("Welcome!")
@@ -0,0 +1,8 @@
+"""WhatsApp 365 backend: shared services live in this package, HTTP routes in wa365.routers,
+and wa365.application assembles them into an app."""
+
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
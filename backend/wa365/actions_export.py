@@ -0,0 +1,131 @@
+"""Incremental export of bot actions to a tenant's bound spreadsheet."""
+
+import asyncio, logging, os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from fastapi import HTTPException
+
+from wa365.google_api import google_execute, google_service
+from wa365.helpers import add_log
+from wa365.resources import db, resources
+from wa365.timestamps import as_utc, before, iso, migrating
+
+logger = logging.getLogger(__name__)
+
+ACTIONS_EXPORT_INTERVAL_SECONDS = float(os.environ.get('ACTIONS_EXPORT_INTERVAL_SECONDS', '60'))
+ACTIONS_EXPORT_BATCH = 500
+# Each flush re-reads this far behind the mark, for changes stamped before it but committed after
+ACTIONS_EXPORT_MARGIN_SECONDS = 30
+ACTIONS_EXPORT_SHEET = "Bot actions"
+EXPORT_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ACTIONS_EXPORT_HEADER = ["Changed at", "Reference", "Type", "Status", "Contact", "Phone", "Message", "Admin note", "Created at"]
+
+def action_export_row(action: Dict) -> List[str]:
+    return [
+        iso(action.get("updated_at")), action["action_id"][:8].upper(), action.get("action_label") or action.get("action_type") or "",
+        action.get("status") or "", action.get("push_name") or "", action.get("jid", "").split("@")[0],
+        action.get("trigger_message") or "", action.get("admin_note") or "", iso(action.get("created_at")),
+    ]
+
+def _export_key(action: Dict) -> str:
+    return f"{action['action_id']}@{iso(action['updated_at'])}"
+
+async def prepare_actions_export_sheet(user_id: str, spreadsheet_id: str):
+    """Add the export tab with its header row unless the spreadsheet already has it."""
+    service = await google_service(user_id, "sheets", "v4")
+    meta = await google_execute(service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields="sheets.properties.title"))
+    if any(s["properties"]["title"] == ACTIONS_EXPORT_SHEET for s in meta.get("sheets", [])):
+        return
+    await google_execute(service.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={"requests": [{"addSheet": {"properties": {"title": ACTIONS_EXPORT_SHEET}}}]},
+    ))
+    await google_execute(service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id, range=f"'{ACTIONS_EXPORT_SHEET}'!A1",
+        valueInputOption="RAW", body={"values": [ACTIONS_EXPORT_HEADER]},
+    ))
+
+async def flush_actions_export(binding: Dict) -> int:
+    """Append every action changed since the binding's high-water mark, one values.append per batch.
+
+    The mark is the newest exported updated_at and only advances after Sheets accepted the batch, so
+    a crash re-sends at most one batch. updated_at is stamped by the writer before its commit, so each
+    flush reads from ACTIONS_EXPORT_MARGIN_SECONDS behind the mark; the mark keeps the changes it
+    exported within that margin ("seen") so re-read rows are not appended twice.
+    """
+    if migrating("bot_actions", "updated_at"):
+        # Rows still holding ISO strings would sort apart from the datetimes and slip behind the mark
+        return 0
+    user_id, spreadsheet_id = binding["user_id"], binding["spreadsheet_id"]
+    hwm = binding.get("export_hwm") or {}
+    margin = timedelta(seconds=ACTIONS_EXPORT_MARGIN_SECONDS)
+    # Marks written before the datetime migration hold ISO strings; "" means export everything
+    mark = as_utc(hwm.get("updated_at")) or EXPORT_EPOCH
+    seen = set(hwm.get("seen") or [])
+    # A mark without "seen" (a new binding, or one from before the margin) covers everything up to its (updated_at, action_id)
+    exported_upto = None if "seen" in hwm else (mark, hwm.get("action_id") or "")
+    cursor = (mark - margin, "")
+    exported = 0
+    while True:
+        query = {"user_id": user_id, "$or": [
+            {"updated_at": {"$gt": cursor[0]}},
+            {"updated_at": cursor[0], "action_id": {"$gt": cursor[1]}},
+        ]}
+        actions = await db.bot_actions.find(query, {"_id": 0}).sort([("updated_at", 1), ("action_id", 1)]).limit(ACTIONS_EXPORT_BATCH).to_list(ACTIONS_EXPORT_BATCH)
+        if not actions:
+            return exported
+        cursor = (actions[-1]["updated_at"], actions[-1]["action_id"])
+        fresh = [
+            a for a in actions
+            if _export_key(a) not in seen and not (exported_upto and (as_utc(a["updated_at"]), a["action_id"]) <= exported_upto)
+        ]
+        if fresh:
+            service = await google_service(user_id, "sheets", "v4")
+            await google_execute(service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id, range=f"'{ACTIONS_EXPORT_SHEET}'!A1",
+                valueInputOption="RAW", insertDataOption="INSERT_ROWS",
+                body={"values": [action_export_row(a) for a in fresh]},
+            ))
+            mark = max(mark, as_utc(fresh[-1]["updated_at"]))
+            seen = {k for k in seen | {_export_key(a) for a in fresh} if as_utc(k.split("@", 1)[1]) >= mark - margin}
+            hwm = {"updated_at": mark, "action_id": fresh[-1]["action_id"], "seen": sorted(seen)}
+            exported += len(fresh)
+            await db.user_sheets.update_one(
+                {"user_id": user_id, "spreadsheet_id": spreadsheet_id},
+                {"$set": {"export_hwm": hwm, "export_last_run": datetime.now(timezone.utc), "export_error": None}, "$inc": {"export_rows": len(fresh)}},
+            )
+        if len(actions) < ACTIONS_EXPORT_BATCH:
+            return exported
+
+async def run_actions_export():
+    """Flush every export binding whose lease is free; the lease keeps workers from appending the same rows."""
+    now = datetime.now(timezone.utc)
+    while True:
+        binding = await db.user_sheets.find_one_and_update(
+            {"export_actions": True, "$or": [{"export_lease_until": None}, before("user_sheets", "export_lease_until", now)]},
+            {"$set": {"export_lease_until": now + timedelta(seconds=ACTIONS_EXPORT_INTERVAL_SECONDS)}},
+            projection={"_id": 0},
+        )
+        if not binding:
+            return
+        try:
+            rows = await flush_actions_export(binding)
+            if rows:
+                await add_log(binding["user_id"], "info", f"Exported {rows} action changes to {binding.get('title', 'Sheets')}")
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            await db.user_sheets.update_one({"user_id": binding["user_id"], "spreadsheet_id": binding["spreadsheet_id"]}, {"$set": {"export_error": str(detail)[:300]}})
+            await add_log(binding["user_id"], "warn", f"Actions export to {binding.get('title', 'Sheets')} failed: {detail}")
+
+async def _actions_export_loop():
+    while True:
+        await asyncio.sleep(ACTIONS_EXPORT_INTERVAL_SECONDS)
+        try:
+            await run_actions_export()
+        except Exception as e:
+            logger.warning(f"Actions export failed: {e}")
+
+async def start():
+    await db.bot_actions.create_index([("user_id", 1), ("updated_at", 1), ("action_id", 1)])
+    resources.spawn("actions-export", _actions_export_loop())
@@ -0,0 +1,78 @@
+"""Assembles the FastAPI app from a selection of feature routers."""
+
+import asyncio, importlib, logging, time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, Tuple, Union
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response
+from starlette.middleware.cors import CORSMiddleware
+
+from wa365 import profiling, timestamps, watchdog
+from wa365.metrics import METRICS_TOKEN, render_metrics
+from wa365.profiling import SlowRequestRecorder
+from wa365.resources import resources
+from wa365.routers import resolve_features
+from wa365.settings import CORS_ORIGINS, WARM_LAZY_IMPORTS
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_lazy_imports(modules: Tuple[str, ...]):
+    started = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Lazy import {name} failed: {e}")
+    logger.info(f"Lazy imports warmed in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def create_app(features: Optional[Union[str, Iterable[str]]] = None, startup: Sequence[Callable[[], Awaitable]] = ()) -> FastAPI:
+    """Build an app serving `features` (see wa365.routers; default APP_FEATURES).
+
+    Only the selected router modules are imported and only their startup hooks run, followed by
+    any extra `startup` hooks; everything they open through `resources` is closed when the
+    lifespan ends."""
+    names = resolve_features(features)
+    modules = [importlib.import_module(f"wa365.routers.{name}") for name in names]
+    hooks = list(dict.fromkeys([profiling.start, watchdog.start, timestamps.start] + [hook for m in modules for hook in getattr(m, "STARTUP", ())] + list(startup)))
+    lazy_modules = tuple(dict.fromkeys(name for m in modules for name in getattr(m, "LAZY_MODULES", ())))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        try:
+            # Off the loop and after startup, so the worker is serving while the first Gemini or upload call's imports load
+            if WARM_LAZY_IMPORTS and lazy_modules:
+                asyncio.get_running_loop().run_in_executor(None, _warm_lazy_imports, lazy_modules)
+            for hook in hooks:
+                await hook()
+            yield
+        finally:
+            await resources.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.features = names
+    app.state.lazy_modules = lazy_modules
+
+    api_router = APIRouter(prefix="/api")
+
+    @api_router.get("/")
+    async def root():
+        return {"message": "WhatsApp 365 Bot API", "features": list(names)}
+
+    for module in modules:
+        api_router.include_router(module.router)
+    app.include_router(api_router)
+
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        """Prometheus scrape endpoint; set METRICS_TOKEN to require `Authorization: Bearer <token>`."""
+        if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+        return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    app.add_middleware(SlowRequestRecorder)
+    # Allow all origins in development, otherwise the comma-separated CORS_ORIGINS
+    origins = ["*"] if CORS_ORIGINS == '*' else [o.strip() for o in CORS_ORIGINS.split(',') if o.strip()]
+    app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=origins, allow_methods=["*"], allow_headers=["*"])
+    return app
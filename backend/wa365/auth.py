@@ -0,0 +1,34 @@
+"""Session authentication dependencies for the dashboard routes."""
+
+from datetime import datetime, timezone
+
+from fastapi import Depends, HTTPException, Request
+
+from wa365.models import User
+from wa365.resources import db
+from wa365.timestamps import as_utc
+
+async def get_current_user(request: Request) -> User:
+    token = request.cookies.get("session_token")
+    if not token:
+        auth = request.headers.get("Authorization", "")
+        token = auth.replace("Bearer ", "") if auth.startswith("Bearer ") else None
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    expires_at = as_utc(session.get("expires_at"))
+    # A value the datetime migration could not parse is stored as None and counts as expired
+    if expires_at is None or expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=401, detail="Session expired")
+    user = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return User(**user)
+
+async def require_admin(user: User = Depends(get_current_user)) -> User:
+    """Operator-only routes: the account created by the ADMIN_USERNAME password login."""
+    if user.user_id != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
@@ -0,0 +1,152 @@
+"""Talking to the Baileys sidecar: the multiplexed WebSocket channel, REST fallbacks and cached connection status."""
+
+import asyncio, os, time, uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import WebSocket
+
+from wa365.resources import resources
+from wa365.settings import BAILEYS_URL
+
+# ─── BAILEYS CHANNEL ──────────────────────────────────────
+
+# Shared secret the sidecar presents on /api/wa/channel; the channel is refused while it is unset
+BAILEYS_CHANNEL_TOKEN = os.environ.get('BAILEYS_CHANNEL_TOKEN', '')
+BAILEYS_ACK_TIMEOUT_SECONDS = 30
+
+def baileys_http() -> httpx.AsyncClient:
+    return resources.http("baileys", timeout=10.0)
+
+class BaileysChannel:
+    """WebSocket opened by the Baileys sidecar that multiplexes events, inbound messages, send commands and acks.
+
+    Only the worker holding the socket can use it; everything else falls back to Baileys' REST routes.
+    """
+
+    def __init__(self):
+        self.ws: Optional[WebSocket] = None
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.tasks: set = set()
+        self.send_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None
+
+    def attach(self, ws: WebSocket) -> bool:
+        """Take `ws` as the channel unless another socket is still live; a reconnect waits until it is detached."""
+        if self.ws is not None:
+            return False
+        self.ws = ws
+        return True
+
+    def detach(self, ws: WebSocket):
+        if self.ws is not ws:
+            return
+        self.ws = None
+        for fut in self.pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("Baileys channel closed"))
+        self.pending.clear()
+
+    async def send(self, frame: Dict):
+        async with self.send_lock:
+            await self.ws.send_json(frame)
+
+    async def request(self, frame: Dict, timeout: float = BAILEYS_ACK_TIMEOUT_SECONDS) -> Dict:
+        frame_id = str(uuid.uuid4())
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[frame_id] = fut
+        try:
+            await self.send({**frame, "id": frame_id})
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self.pending.pop(frame_id, None)
+
+    def resolve(self, frame: Dict):
+        fut = self.pending.get(frame.get("id"))
+        if fut and not fut.done():
+            fut.set_result(frame)
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+baileys_channel = BaileysChannel()
+
+async def baileys_send_batch(user_id: str, messages: List[Dict]) -> List[Dict]:
+    """Send [{to, message, idempotency_key}] in one round trip; returns one {success, id | error} per message."""
+    if baileys_channel.connected:
+        try:
+            ack = await baileys_channel.request({"type": "send", "user_id": user_id, "messages": messages})
+            return ack["results"]
+        except ConnectionError:
+            pass
+    resp = await baileys_http().post(f"{BAILEYS_URL}/send-batch", json={"user_id": user_id, "messages": messages})
+    if resp.is_error:
+        raise RuntimeError(f"Baileys /send-batch returned {resp.status_code}: {resp.text[:200]}")
+    return resp.json()["results"]
+
+async def baileys_send(user_id: str, jid: str, message: str, idempotency_key: Optional[str] = None) -> Dict:
+    [result] = await baileys_send_batch(user_id, [{"to": jid, "message": message, "idempotency_key": idempotency_key}])
+    if not result.get("success"):
+        raise RuntimeError(result.get("error") or "Send failed")
+    return result
+
+async def baileys_statuses(user_ids: List[str]) -> Dict[str, Dict]:
+    """Connection status for several tenants in one REST call."""
+    resp = await baileys_http().get(f"{BAILEYS_URL}/status", params={"user_ids": ",".join(user_ids)}, timeout=5.0)
+    return resp.json()["statuses"]
+
+# ─── CONNECTION STATUS ────────────────────────────────────
+
+WA_STATUS_TTL_SECONDS = float(os.environ.get('WA_STATUS_TTL_SECONDS', '60'))
+WA_STATUS_HEARTBEAT_SECONDS = 15
+WA_STATUS_FIELDS = ("status", "connected", "jid", "qr")
+
+# user_id -> {"status", "connected", "jid", "qr", "at": monotonic time of the last update}
+_wa_status: Dict[str, Dict[str, Any]] = resources.cache("wa_status", dict)
+_wa_status_subscribers: Dict[str, set] = {}
+
+def set_wa_status(user_id: str, update: Dict):
+    """Merge a pushed status change into the cache and wake the tenant's SSE streams if it changed."""
+    current = _wa_status.get(user_id) or {"status": "disconnected", "connected": False, "jid": None, "qr": None}
+    merged = {k: update.get(k, current.get(k)) for k in WA_STATUS_FIELDS}
+    if merged["status"] != "qr_ready":
+        merged["qr"] = None
+    changed = any(merged[k] != current.get(k) for k in WA_STATUS_FIELDS)
+    _wa_status[user_id] = {**merged, "at": time.monotonic()}
+    if changed:
+        for queue in _wa_status_subscribers.get(user_id, ()):
+            queue.put_nowait(merged)
+
+def subscribe_wa_status(user_id: str) -> asyncio.Queue:
+    """A queue receiving the tenant's status changes until it is passed to unsubscribe_wa_status()."""
+    queue: asyncio.Queue = asyncio.Queue()
+    _wa_status_subscribers.setdefault(user_id, set()).add(queue)
+    return queue
+
+def unsubscribe_wa_status(user_id: str, queue: asyncio.Queue):
+    subscribers = _wa_status_subscribers.get(user_id)
+    if subscribers is not None:
+        subscribers.discard(queue)
+        if not subscribers:
+            del _wa_status_subscribers[user_id]
+
+async def wa_status(user_id: str) -> Dict[str, Any]:
+    """Serve a tenant's connection status from memory, asking Baileys only when nothing fresh was pushed.
+
+    With the channel attached every change is pushed here, so the cache never expires; otherwise
+    events may land on another worker and entries are refreshed after WA_STATUS_TTL_SECONDS.
+    """
+    entry = _wa_status.get(user_id)
+    if not entry or (not baileys_channel.connected and time.monotonic() - entry["at"] > WA_STATUS_TTL_SECONDS):
+        try:
+            set_wa_status(user_id, (await baileys_statuses([user_id]))[user_id])
+        except Exception:
+            if not entry:
+                return {"status": "disconnected", "connected": False, "jid": None, "qr": None}
+        entry = _wa_status[user_id]
+    return {k: entry[k] for k in WA_STATUS_FIELDS}
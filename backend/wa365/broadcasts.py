@@ -0,0 +1,172 @@
+"""Broadcast jobs that feed many recipients into the outbound queue."""
+
+import asyncio, logging, os, re, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from wa365.helpers import TEST_JID, add_log
+from wa365.models import BroadcastFilter, BroadcastRequest
+from wa365.outbound import enqueue_outbound
+from wa365.resources import db, resources
+from wa365.timestamps import iso, since
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_MAX_RECIPIENTS = int(os.environ.get('BROADCAST_MAX_RECIPIENTS', '5000'))
+BROADCAST_POLL_SECONDS = 1.0
+BROADCAST_CHECKPOINT_EVERY = 20
+BROADCAST_PROGRESS_SECONDS = 5.0
+BROADCAST_LEASE_SECONDS = 60
+BROADCAST_DATETIME_FIELDS = ("created_at", "finished_at")
+
+_broadcast_tasks: Dict[str, asyncio.Task] = {}
+
+def render_template(template: str, contact: Dict[str, str]) -> str:
+    """Fill {push_name}-style placeholders; unknown placeholders are left untouched."""
+    return re.sub(r"\{(\w+)\}", lambda m: contact.get(m.group(1), m.group(0)), template)
+
+def broadcast_contact(jid: str, push_name: Optional[str]) -> Dict[str, str]:
+    phone = jid.split("@")[0]
+    name = push_name or phone
+    return {"jid": jid, "push_name": name, "first_name": name.split()[0], "phone": phone}
+
+async def resolve_broadcast_recipients(user_id: str, req: "BroadcastRequest") -> List[Dict[str, str]]:
+    if req.jids:
+        jids = list(dict.fromkeys(req.jids))
+        names = {c["jid"]: c.get("push_name") async for c in db.conversations.find({"user_id": user_id, "jid": {"$in": jids}}, {"_id": 0, "jid": 1, "push_name": 1})}
+        return [broadcast_contact(jid, names.get(jid)) for jid in jids]
+    f = req.filter or BroadcastFilter()
+    query: Dict[str, Any] = {"user_id": user_id, "jid": {"$ne": TEST_JID}}
+    if f.active_since_days:
+        query.update(since("conversations", "last_timestamp", datetime.now(timezone.utc) - timedelta(days=f.active_since_days)))
+    if f.min_messages:
+        query["message_count"] = {"$gte": f.min_messages}
+    if not f.include_taken_over:
+        query["taken_over"] = {"$ne": True}
+    convs = await db.conversations.find(query, {"_id": 0, "jid": 1, "push_name": 1}).to_list(BROADCAST_MAX_RECIPIENTS + 1)
+    return [broadcast_contact(c["jid"], c.get("push_name")) for c in convs]
+
+def broadcast_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored job as the API returns it, timestamps as ISO strings."""
+    return {**job, **{f: iso(job[f]) or None for f in BROADCAST_DATETIME_FIELDS if f in job}}
+
+async def broadcast_progress(job_id: str) -> Dict[str, int]:
+    counts = {"queued": 0, "sending": 0, "sent": 0, "failed": 0, "cancelled": 0}
+    async for row in db.outbound_messages.aggregate([{"$match": {"job_id": job_id}}, {"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["n"]
+    return counts
+
+async def broadcast_in_flight(job_id: str) -> int:
+    # Served from the (job_id, status) index and bounded by the job's concurrency, unlike the full progress
+    return await db.outbound_messages.count_documents({"job_id": job_id, "status": {"$in": ["queued", "sending"]}})
+
+async def _claim_broadcast(job_id: str, held: Optional[datetime] = None) -> Optional[datetime]:
+    """Take a running job's free lease, or extend the one held; None once it is cancelled or held elsewhere."""
+    now = datetime.now(timezone.utc)
+    lease = now + timedelta(seconds=BROADCAST_LEASE_SECONDS)
+    # The expiry doubles as the holder's token in the next renewal, so keep it at Mongo's millisecond precision
+    lease = lease.replace(microsecond=lease.microsecond // 1000 * 1000)
+    query: Dict[str, Any] = {"id": job_id, "status": "running"}
+    query.update({"lease_until": held} if held else {"$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]})
+    result = await db.broadcast_jobs.update_one(query, {"$set": {"lease_until": lease}})
+    return lease if result.modified_count else None
+
+async def _keep_broadcast(job_id: str, lease: datetime) -> Optional[datetime]:
+    """Check before each enqueue that the job is still ours to run, renewing the lease as it ages."""
+    if lease - datetime.now(timezone.utc) < timedelta(seconds=BROADCAST_LEASE_SECONDS * 2 / 3):
+        return await _claim_broadcast(job_id, lease)
+    current = await db.broadcast_jobs.find_one({"id": job_id}, {"_id": 0, "status": 1})
+    return lease if current and current["status"] == "running" else None
+
+async def run_broadcast(job_id: str):
+    """Feed a broadcast's recipients into the outbound queue, at most `concurrency` in flight.
+
+    The job runs under a lease so only one worker feeds it; a cancel from any worker is
+    seen before the next recipient is queued."""
+    lease = await _claim_broadcast(job_id)
+    if not lease:
+        return
+    job = await db.broadcast_jobs.find_one({"id": job_id}, {"_id": 0})
+    user_id = job["user_id"]
+    reported = time.monotonic()
+    try:
+        for i in range(job.get("cursor", 0), len(job["recipients"])):
+            while True:
+                lease = await _keep_broadcast(job_id, lease)
+                if not lease:
+                    return
+                if await broadcast_in_flight(job_id) < job["concurrency"]:
+                    break
+                await asyncio.sleep(BROADCAST_POLL_SECONDS)
+            contact = job["recipients"][i]
+            await enqueue_outbound(user_id, contact["jid"], render_template(job["template"], contact), "broadcast", f"broadcast:{job_id}:{contact['jid']}", job_id=job_id)
+            if (i + 1) % BROADCAST_CHECKPOINT_EVERY == 0:
+                update: Dict[str, Any] = {"cursor": i + 1}
+                if time.monotonic() - reported >= BROADCAST_PROGRESS_SECONDS:
+                    update["progress"], reported = await broadcast_progress(job_id), time.monotonic()
+                await db.broadcast_jobs.update_one({"id": job_id}, {"$set": update})
+            if job["interval_ms"]:
+                await asyncio.sleep(job["interval_ms"] / 1000)
+        await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"cursor": len(job["recipients"])}})
+        while await broadcast_in_flight(job_id):
+            lease = await _keep_broadcast(job_id, lease)
+            if not lease:
+                return
+            if time.monotonic() - reported >= BROADCAST_PROGRESS_SECONDS:
+                await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"progress": await broadcast_progress(job_id)}})
+                reported = time.monotonic()
+            await asyncio.sleep(BROADCAST_POLL_SECONDS)
+        progress = await broadcast_progress(job_id)
+        now = datetime.now(timezone.utc)
+        await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"status": "completed", "progress": progress, "finished_at": now, "lease_until": None}})
+        await add_log(user_id, "info", f"Broadcast {job_id[:8]} finished: {progress['sent']} sent, {progress['failed']} failed")
+    except asyncio.CancelledError:
+        # Shutdown drops the task from the registry first; the lease then lapses and the job resumes elsewhere
+        if job_id in _broadcast_tasks:
+            now = datetime.now(timezone.utc)
+            await db.outbound_messages.update_many({"job_id": job_id, "status": "queued"}, {"$set": {"status": "cancelled", "updated_at": now}})
+            await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"status": "cancelled", "progress": await broadcast_progress(job_id), "finished_at": now, "lease_until": None}})
+            await add_log(user_id, "info", f"Broadcast {job_id[:8]} cancelled")
+        raise
+    except Exception as e:
+        await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"status": "failed", "error": str(e)[:300], "finished_at": datetime.now(timezone.utc), "lease_until": None}})
+        await add_log(user_id, "error", f"Broadcast {job_id[:8]} failed: {e}")
+    finally:
+        _broadcast_tasks.pop(job_id, None)
+
+def start_broadcast(job_id: str):
+    _broadcast_tasks[job_id] = resources.spawn(f"broadcast:{job_id}", run_broadcast(job_id))
+
+def cancel_local_broadcast(job_id: str) -> bool:
+    """Cancel the job if this worker is feeding it; False when it runs elsewhere or not at all."""
+    task = _broadcast_tasks.get(job_id)
+    if not task:
+        return False
+    task.cancel()
+    return True
+
+async def resume_broadcasts():
+    """Pick up running broadcasts whose lease lapsed, left by a previous process or a worker that died.
+
+    Idempotency keys skip recipients that were already queued."""
+    now = datetime.now(timezone.utc)
+    async for job in db.broadcast_jobs.find({"status": "running", "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]}, {"_id": 0, "id": 1}):
+        if job["id"] not in _broadcast_tasks:
+            start_broadcast(job["id"])
+
+async def _broadcast_resume_loop():
+    while True:
+        await asyncio.sleep(BROADCAST_LEASE_SECONDS)
+        try:
+            await resume_broadcasts()
+        except Exception as e:
+            logger.warning(f"Broadcast resume failed: {e}")
+
+async def start():
+    await db.outbound_messages.create_index([("job_id", 1), ("status", 1)], sparse=True)
+    await db.broadcast_jobs.create_index("id")
+    await db.broadcast_jobs.create_index([("status", 1), ("lease_until", 1)])
+    await resume_broadcasts()
+    resources.spawn("broadcast-resume", _broadcast_resume_loop())
+    # Emptying the registry before the tasks are cancelled makes shutdown leave jobs running for the next process
+    resources.on_shutdown(_broadcast_tasks.clear)
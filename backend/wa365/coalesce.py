@@ -0,0 +1,54 @@
+"""Coalescing of message bursts from one contact into a single LLM turn."""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from wa365.resources import resources
+
+COALESCE_MAX_WINDOW_MS = 10000
+
+# (user_id, jid) -> {"seq": latest message number, "texts": unanswered texts, "task": in-flight generation}
+_coalesce_buffers: Dict[tuple, Dict[str, Any]] = resources.cache("coalesce", dict)
+
+async def coalesce_join(user_id: str, jid: str, text: str, window_ms: int) -> Optional[int]:
+    """Buffer a message and wait out the coalescing window.
+
+    Returns this message's sequence number if it is still the latest of the burst
+    once the window closes, or None if a newer message will answer for it."""
+    buf = _coalesce_buffers.setdefault((user_id, jid), {"seq": 0, "texts": [], "task": None})
+    buf["seq"] += 1
+    seq = buf["seq"]
+    buf["texts"].append(text)
+    if buf["task"] and not buf["task"].done():
+        buf["task"].cancel()
+    await asyncio.sleep(min(window_ms, COALESCE_MAX_WINDOW_MS) / 1000)
+    return seq if buf["seq"] == seq else None
+
+def coalesce_pending(user_id: str, jid: str) -> List[str]:
+    return list(_coalesce_buffers[(user_id, jid)]["texts"])
+
+def coalesce_superseded(user_id: str, jid: str, seq: int) -> bool:
+    buf = _coalesce_buffers.get((user_id, jid))
+    return buf is None or buf["seq"] != seq
+
+async def coalesce_generate(user_id: str, jid: str, seq: int, coro):
+    """Await a generation for the latest message; a newer message cancels it.
+
+    Returns None when the generation was superseded."""
+    buf = _coalesce_buffers[(user_id, jid)]
+    buf["task"] = asyncio.ensure_future(coro)
+    try:
+        return await buf["task"]
+    except asyncio.CancelledError:
+        if not coalesce_superseded(user_id, jid, seq):
+            raise
+        return None
+
+def coalesce_done(user_id: str, jid: str, answered: int):
+    """Drop the texts a reply has answered, keeping any that arrived since."""
+    buf = _coalesce_buffers.get((user_id, jid))
+    if not buf:
+        return
+    del buf["texts"][:answered]
+    if not buf["texts"]:
+        _coalesce_buffers.pop((user_id, jid), None)
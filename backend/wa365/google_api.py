@@ -0,0 +1,117 @@
+"""Per-tenant Google credentials and API clients, run on a thread pool since the Google libraries block."""
+
+import asyncio, os
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict
+
+from fastapi import HTTPException
+
+from wa365.resources import db, resources
+from wa365.timestamps import as_utc
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+GMAIL_SCOPES = [
+    "https://www.googleapis.com/auth/gmail.send",
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+]
+
+GOOGLE_API_ENDPOINT = os.environ.get('GOOGLE_API_ENDPOINT', '')  # e.g. a local stub for tests
+GOOGLE_TOKEN_URI = os.environ.get('GOOGLE_TOKEN_URI', 'https://oauth2.googleapis.com/token')
+GOOGLE_API_WORKERS = int(os.environ.get('GOOGLE_API_WORKERS', '8'))
+GOOGLE_REFRESH_MARGIN_SECONDS = 120
+
+_google_creds: Dict[str, "Credentials"] = resources.cache("google_creds", dict)
+_google_services: Dict[tuple, tuple] = resources.cache("google_services", dict)  # (user_id, api, version) -> (credentials, future of the built service)
+_google_refreshes: Dict[str, asyncio.Task] = {}
+
+async def run_google(fn, *args):
+    """googleapiclient and google-auth are blocking; they run on this pool instead of on the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(resources.executor("google-api", GOOGLE_API_WORKERS), fn, *args)
+
+def forget_google_client(user_id: str):
+    _google_creds.pop(user_id, None)
+    for key in [k for k in _google_services if k[0] == user_id]:
+        _google_services.pop(key, None)
+
+def _google_fresh(creds: "Credentials") -> bool:
+    # google-auth keeps expiry as naive UTC
+    return bool(creds.token and creds.expiry and creds.expiry - timedelta(seconds=GOOGLE_REFRESH_MARGIN_SECONDS) > datetime.now(timezone.utc).replace(tzinfo=None))
+
+async def _refresh_google_creds(user_id: str, creds: "Credentials"):
+    from google.auth.transport.requests import Request as GoogleRequest
+    await run_google(creds.refresh, GoogleRequest())
+    await db.google_tokens.update_one({"user_id": user_id}, {"$set": {"access_token": creds.token, "expires_at": creds.expiry.replace(tzinfo=timezone.utc) if creds.expiry else None}})
+
+async def get_google_creds_for_user(user_id: str) -> "Credentials":
+    """Return the tenant's cached credentials, refreshing at most once at a time however many callers need them.
+
+    The stored token is read on every call, so a disconnect, reconnect or refresh handled by another
+    worker replaces this worker's cached credentials and services."""
+    token_doc = await db.google_tokens.find_one({"user_id": user_id}, {"_id": 0})
+    if not token_doc or not (token_doc.get("access_token") or token_doc.get("refresh_token")):
+        forget_google_client(user_id)
+        raise HTTPException(status_code=400, detail="Gmail not connected. Please connect Gmail first in Integrations.")
+    creds = _google_creds.get(user_id)
+    # While this worker refreshes, its credentials are ahead of the stored token
+    if creds is not None and user_id not in _google_refreshes and (
+        creds.refresh_token != token_doc.get("refresh_token") or creds.token != token_doc.get("access_token")
+    ):
+        forget_google_client(user_id)
+        creds = None
+    if creds is None:
+        from google.oauth2.credentials import Credentials
+        expires_at = as_utc(token_doc.get("expires_at"))
+        if expires_at:
+            expires_at = expires_at.replace(tzinfo=None)
+        creds = Credentials(
+            token=token_doc.get("access_token"),
+            refresh_token=token_doc.get("refresh_token"),
+            token_uri=GOOGLE_TOKEN_URI,
+            client_id=token_doc.get("client_id"),
+            client_secret=token_doc.get("client_secret"),
+            scopes=GMAIL_SCOPES,
+            expiry=expires_at,
+        )
+        creds = _google_creds.setdefault(user_id, creds)
+    if not _google_fresh(creds):
+        task = _google_refreshes.get(user_id)
+        if task is None:
+            task = _google_refreshes[user_id] = asyncio.create_task(_refresh_google_creds(user_id, creds))
+            task.add_done_callback(lambda _: _google_refreshes.pop(user_id, None))
+        await asyncio.shield(task)
+    return creds
+
+async def google_service(user_id: str, api: str, version: str):
+    """Return a built service for the tenant, reusing it until the tenant's credentials are replaced."""
+    creds = await get_google_creds_for_user(user_id)
+    key = (user_id, api, version)
+    cached = _google_services.get(key)
+    if not cached or cached[0] is not creds:
+
+        from googleapiclient.discovery import build
+        from googleapiclient.http import HttpRequest
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+
+        # httplib2 is not thread-safe, so every request gets its own authorized connection
+        def request_builder(_http, *args, **kwargs):
+            return HttpRequest(AuthorizedHttp(creds, http=httplib2.Http()), *args, **kwargs)
+
+        client_options = {"api_endpoint": GOOGLE_API_ENDPOINT} if GOOGLE_API_ENDPOINT else None
+        # Cache the pending build so concurrent first calls share one discovery parse
+        cached = _google_services[key] = (creds, asyncio.ensure_future(run_google(lambda: build(
+            api, version, credentials=creds, requestBuilder=request_builder, client_options=client_options, cache_discovery=False,
+        ))))
+    try:
+        return await asyncio.shield(cached[1])
+    except Exception:
+        if _google_services.get(key) is cached:
+            _google_services.pop(key)
+        raise
+
+async def google_execute(request) -> Dict:
+    return await run_google(request.execute)
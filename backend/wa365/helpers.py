@@ -0,0 +1,73 @@
+"""Helpers shared by the message pipeline and the dashboard routes."""
+
+import json, os, time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from wa365.models import BookingType, BotConfig
+from wa365.resources import db, resources
+
+# Conversation the dashboard's chat test writes to; left out of conversation lists and broadcasts
+TEST_JID = "test@chat.test"
+
+async def add_log(user_id: str, level: str, message: str):
+    await db.logs.insert_one({"user_id": user_id, "level": level, "message": message, "timestamp": datetime.now(timezone.utc)})
+
+async def get_bot_config(user_id: str) -> BotConfig:
+    doc = await db.bot_config.find_one({"user_id": user_id}, {"_id": 0})
+    if doc:
+        doc.pop("user_id", None)
+        return BotConfig(**doc)
+    return BotConfig()
+
+# The message path reuses a tenant's config for this long; dashboard routes always read it fresh
+BOT_CONFIG_CACHE_TTL_SECONDS = float(os.environ.get('BOT_CONFIG_CACHE_TTL_SECONDS', '5'))
+_bot_configs: Dict[str, tuple] = resources.cache("bot_configs", dict)  # user_id -> (loaded_at, BotConfig)
+
+async def cached_bot_config(user_id: str) -> BotConfig:
+    cached = _bot_configs.get(user_id)
+    if cached and time.monotonic() - cached[0] < BOT_CONFIG_CACHE_TTL_SECONDS:
+        return cached[1]
+    config = await get_bot_config(user_id)
+    _bot_configs[user_id] = (time.monotonic(), config)
+    return config
+
+def forget_bot_config(user_id: str):
+    """Drop this worker's cached config after a write; other workers pick it up within the TTL."""
+    _bot_configs.pop(user_id, None)
+
+async def preload_bot_configs() -> int:
+    """Cache every tenant's config in one query, so a fresh worker's first messages skip the read."""
+    loaded_at = time.monotonic()
+    count = 0
+    async for doc in db.bot_config.find({}, {"_id": 0}):
+        user_id = doc.pop("user_id", None)
+        if user_id:
+            _bot_configs[user_id] = (loaded_at, BotConfig(**doc))
+            count += 1
+    return count
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+BULK_ACTION_LIMIT = 500
+BULK_ACTION_CONCURRENCY = 20  # notifications enqueued at once by a bulk update
+
+def action_message(action: Dict, status: str, admin_note: Optional[str], config: BotConfig) -> Optional[str]:
+    """Message sent to the client when an admin approves or rejects an action."""
+    if status == "approved":
+        bt = next((b for b in config.booking_types if b.id == action["action_type"]), None)
+        return (bt.confirmation_message if bt else "Your request has been confirmed by our team.") + (f"\n\nNote: {admin_note}" if admin_note else "")
+    if status == "rejected":
+        return "We're sorry, we are unable to process your request at this time." + (f" {admin_note}" if admin_note else "")
+    return None
+
+def detect_booking(text: str, booking_types: List[BookingType]):
+    tl = text.lower()
+    for bt in booking_types:
+        if not bt.enabled:
+            continue
+        for kw in bt.keywords:
+            if kw.lower() in tl:
+                return bt
+    return None
@@ -0,0 +1,26 @@
+"""Text extraction for knowledge base uploads. The parsers are imported on first use."""
+
+import io
+
+def extract_text_from_pdf(data: bytes) -> str:
+    import pdfplumber
+    parts = []
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages:
+            t = page.extract_text()
+            if t:
+                parts.append(t)
+    return "\n\n".join(parts)
+
+def extract_text_from_docx(data: bytes) -> str:
+    import docx
+    doc = docx.Document(io.BytesIO(data))
+    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+
+def extract_text_from_txt(data: bytes) -> str:
+    for enc in ("utf-8", "latin-1", "cp1252"):
+        try:
+            return data.decode(enc)
+        except Exception:
+            continue
+    return data.decode("utf-8", errors="replace")
@@ -0,0 +1,271 @@
+"""LLM providers and the per-tenant route chain with fallback, cooldown and hedging."""
+
+import asyncio, hashlib, json, logging, os, time
+from typing import Any, Dict, List
+
+import httpx
+
+from wa365.models import BotConfig
+from wa365.resources import db, resources
+from wa365.settings import GEMINI_API_KEY
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
+# Forces every tenant onto one provider, e.g. "stub" for offline load tests
+LLM_PROVIDER_OVERRIDE = os.environ.get('LLM_PROVIDER_OVERRIDE', '')
+LLM_STUB_LATENCY_MS = int(os.environ.get('LLM_STUB_LATENCY_MS', '0'))
+LLM_FAILURE_COOLDOWN_SECONDS = 30
+
+class LLMError(Exception):
+    pass
+
+class LLMProvider:
+    """Base class for chat-completion backends; `params` holds temperature, max_tokens and top_p."""
+    name = ""
+
+    def configured(self) -> bool:
+        """False when the server lacks the credentials this provider needs."""
+        return True
+
+    async def generate(self, prompt: str, model: str, params: Dict[str, Any], user_id: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, model: str, params: Dict[str, Any], user_id: str):
+        yield await self.generate(prompt, model, params, user_id)
+
+def llm_http() -> httpx.AsyncClient:
+    return resources.http("llm", timeout=60.0)
+
+async def get_gemini_key_for_user(user_id: str) -> str:
+    doc = await db.bot_config.find_one({"user_id": user_id}, {"_id": 0, "gemini_api_key": 1})
+    return doc.get("gemini_api_key", "") if doc else ""
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self):
+        self._clients: Dict[str, Any] = {}
+
+    async def _client(self, user_id: str):
+        api_key = GEMINI_API_KEY or (await get_gemini_key_for_user(user_id) if user_id else "")
+        if not api_key:
+            raise LLMError("Gemini API key not configured. Please add it in Settings.")
+        if api_key not in self._clients:
+            from google import genai
+            self._clients[api_key] = genai.Client(api_key=api_key)
+        return self._clients[api_key]
+
+    def _config(self, params: Dict[str, Any]):
+        from google.genai import types
+        return types.GenerateContentConfig(temperature=params["temperature"], max_output_tokens=params["max_tokens"], top_p=params["top_p"])
+
+    async def generate(self, prompt, model, params, user_id):
+        gclient = await self._client(user_id)
+        response = await gclient.aio.models.generate_content(model=model, contents=prompt, config=self._config(params))
+        return response.text or ""
+
+    async def stream(self, prompt, model, params, user_id):
+        gclient = await self._client(user_id)
+        async for chunk in await gclient.aio.models.generate_content_stream(model=model, contents=prompt, config=self._config(params)):
+            if chunk.text:
+                yield chunk.text
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def configured(self):
+        return bool(OPENAI_API_KEY)
+
+    def _request(self, prompt, model, params, stream):
+        if not OPENAI_API_KEY:
+            raise LLMError("OPENAI_API_KEY not configured")
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": params["temperature"], "max_tokens": params["max_tokens"], "top_p": params["top_p"], "stream": stream}
+        return {"url": f"{OPENAI_BASE_URL}/chat/completions", "json": body, "headers": {"Authorization": f"Bearer {OPENAI_API_KEY}"}}
+
+    async def generate(self, prompt, model, params, user_id):
+        resp = await llm_http().post(**self._request(prompt, model, params, False))
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"] or ""
+
+    async def stream(self, prompt, model, params, user_id):
+        async with llm_http().stream("POST", **self._request(prompt, model, params, True)) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                delta = json.loads(line[6:])["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def configured(self):
+        return bool(ANTHROPIC_API_KEY)
+
+    def _request(self, prompt, model, params, stream):
+        if not ANTHROPIC_API_KEY:
+            raise LLMError("ANTHROPIC_API_KEY not configured")
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": params["max_tokens"], "temperature": params["temperature"], "stream": stream}
+        if params["top_p"] < 1.0:
+            body["top_p"] = params["top_p"]
+        headers = {"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01"}
+        return {"url": "https://api.anthropic.com/v1/messages", "json": body, "headers": headers}
+
+    async def generate(self, prompt, model, params, user_id):
+        resp = await llm_http().post(**self._request(prompt, model, params, False))
+        resp.raise_for_status()
+        return "".join(b.get("text", "") for b in resp.json().get("content", []))
+
+    async def stream(self, prompt, model, params, user_id):
+        async with llm_http().stream("POST", **self._request(prompt, model, params, True)) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event.get("type") == "content_block_delta" and event["delta"].get("text"):
+                    yield event["delta"]["text"]
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider: the reply depends only on model and prompt,
+    after LLM_STUB_LATENCY_MS of simulated generation time."""
+    name = "stub"
+
+    def _reply(self, prompt: str, model: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        message = prompt.rsplit("User message: ", 1)[-1][:80]
+        return f"[{model} {digest}] You said: {message}"
+
+    async def generate(self, prompt, model, params, user_id):
+        await asyncio.sleep(LLM_STUB_LATENCY_MS / 1000)
+        return self._reply(prompt, model)
+
+    async def stream(self, prompt, model, params, user_id):
+        words = self._reply(prompt, model).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(LLM_STUB_LATENCY_MS / 1000 / len(words))
+            yield word if i == 0 else f" {word}"
+
+LLM_PROVIDERS: Dict[str, LLMProvider] = {p.name: p for p in (GeminiProvider(), OpenAIProvider(), AnthropicProvider(), StubProvider())}
+
+# "provider:model" -> {"ewma_ms", "calls", "failures", "last_failure"}
+_llm_routes: Dict[str, Dict[str, float]] = resources.cache("llm_routes", dict)
+
+def _route_stats(route: tuple) -> Dict[str, float]:
+    return _llm_routes.setdefault(f"{route[0]}:{route[1]}", {"ewma_ms": 0.0, "calls": 0, "failures": 0, "last_failure": 0.0})
+
+def _record_route(route: tuple, started: float, ok: bool):
+    stats = _route_stats(route)
+    if ok:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats["ewma_ms"] = elapsed_ms if not stats["calls"] else 0.8 * stats["ewma_ms"] + 0.2 * elapsed_ms
+        stats["calls"] += 1
+        stats["failures"] = 0
+    else:
+        stats["failures"] += 1
+        stats["last_failure"] = time.monotonic()
+
+def _route_cooling_down(route: tuple) -> bool:
+    stats = _route_stats(route)
+    return stats["failures"] >= 3 and time.monotonic() - stats["last_failure"] < LLM_FAILURE_COOLDOWN_SECONDS
+
+def llm_route_stats(routes: List[tuple]) -> Dict[str, Dict[str, float]]:
+    """Latency and failure counters of the given routes, keyed "provider:model"; unused routes are left out."""
+    keys = (f"{provider}:{model}" for provider, model in routes)
+    return {k: dict(_llm_routes[k]) for k in keys if k in _llm_routes}
+
+def llm_routes(config: BotConfig) -> List[tuple]:
+    """Ordered (provider, model) candidates for a tenant: primary, then the fallback model.
+
+    Routes whose provider has no credentials on this server are skipped, so a tenant on the
+    default OpenAI model without OPENAI_API_KEY goes straight to the fallback. Routes that
+    failed repeatedly sit out a cooldown; with latency routing on, a fallback that has been
+    markedly faster than the primary is tried first."""
+    if LLM_PROVIDER_OVERRIDE:
+        return [(LLM_PROVIDER_OVERRIDE, config.model_name)]
+    routes = [(config.model_provider, config.model_name)]
+    if config.fallback_provider and config.fallback_model_name:
+        fallback = (config.fallback_provider, config.fallback_model_name)
+        if fallback != routes[0]:
+            routes.append(fallback)
+    healthy = [r for r in routes if r[0] in LLM_PROVIDERS and LLM_PROVIDERS[r[0]].configured() and not _route_cooling_down(r)]
+    if config.latency_routing and len(healthy) == 2:
+        primary, fallback = (_route_stats(r) for r in healthy)
+        if primary["calls"] and fallback["calls"] and primary["ewma_ms"] > 2 * fallback["ewma_ms"]:
+            healthy.reverse()
+    return healthy
+
+def llm_params(config: BotConfig) -> Dict[str, Any]:
+    return {"temperature": config.temperature, "max_tokens": config.max_tokens, "top_p": config.top_p}
+
+async def _call_route(route: tuple, prompt: str, params: Dict[str, Any], user_id: str) -> str:
+    started = time.perf_counter()
+    try:
+        reply = await LLM_PROVIDERS[route[0]].generate(prompt, route[1], params, user_id)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        _record_route(route, started, False)
+        raise
+    _record_route(route, started, True)
+    return reply
+
+async def llm_generate(prompt: str, user_id: str, config: BotConfig) -> str:
+    """Generate a reply along the tenant's route chain.
+
+    With hedge_after_ms set, the next route is started if the current one has not
+    answered in time, and whichever finishes first wins. Raises LLMError when every
+    route fails; callers then fall back to `fallback_message`."""
+    routes = llm_routes(config)
+    if not routes:
+        raise LLMError(f"No configured LLM provider for {config.model_provider}:{config.model_name}")
+    params = llm_params(config)
+    errors: List[str] = []
+    pending: Dict[asyncio.Task, tuple] = {}
+    queue = list(routes)
+    try:
+        while queue or pending:
+            if queue and (not pending or config.hedge_after_ms > 0):
+                route = queue.pop(0)
+                pending[asyncio.ensure_future(_call_route(route, prompt, params, user_id))] = route
+            hedge = config.hedge_after_ms / 1000 if queue and config.hedge_after_ms > 0 else None
+            done, _ = await asyncio.wait(pending, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                route = pending.pop(task)
+                if task.exception() is None:
+                    return task.result()
+                errors.append(f"{route[0]}:{route[1]}: {task.exception()}")
+                logger.warning(f"LLM route {route[0]}:{route[1]} failed: {task.exception()}")
+    finally:
+        for task in pending:
+            task.cancel()
+    raise LLMError("; ".join(errors))
+
+async def llm_stream(prompt: str, user_id: str, config: BotConfig):
+    """Stream a reply, falling through to the next route if one fails before its first chunk."""
+    routes = llm_routes(config)
+    if not routes:
+        raise LLMError(f"No configured LLM provider for {config.model_provider}:{config.model_name}")
+    params = llm_params(config)
+    errors: List[str] = []
+    for route in routes:
+        started = time.perf_counter()
+        produced = False
+        try:
+            async for chunk in LLM_PROVIDERS[route[0]].stream(prompt, route[1], params, user_id):
+                produced = True
+                yield chunk
+        except Exception as e:
+            _record_route(route, started, False)
+            if produced:
+                raise
+            errors.append(f"{route[0]}:{route[1]}: {e}")
+            logger.warning(f"LLM route {route[0]}:{route[1]} failed: {e}")
+            continue
+        _record_route(route, started, True)
+        return
+    raise LLMError("; ".join(errors))
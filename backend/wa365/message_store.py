@@ -0,0 +1,267 @@
+"""Compact storage for conversation messages, with archival of old messages to compressed files.
+
+One document per message, with short field names:
+
+    _id  ObjectId (also the message id the API returns)
+    u    user_id            j   contact jid
+    r    role: "u" user, "a" assistant
+    x    text               t   BSON datetime
+    tr, pt, ct, c, ft, lt   trace_id, prompt_tokens, completion_tokens, cached, ttft_ms, latency_ms
+
+The contact's push name is kept on the conversation only. Documents written before this layout
+(`user_id`, `from_jid`, `push_name`, a UUID `id` and an ISO `timestamp`) are rewritten in place by
+migrate_messages(), which start() runs in the background; until it finishes, queries match both
+layouts.
+
+Messages older than MESSAGE_ARCHIVE_DAYS are moved to one gzip JSONL file per conversation under
+MESSAGE_ARCHIVE_DIR (a volume shared by every dashboard worker) and read back by message_history().
+"""
+
+import asyncio, gzip, json, logging, os, time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from wa365.helpers import TEST_JID
+from wa365.resources import db, resources
+from wa365.timestamps import as_utc
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_ARCHIVE_DAYS = int(os.environ.get('MESSAGE_ARCHIVE_DAYS', '0'))  # 0 keeps every message in Mongo
+MESSAGE_ARCHIVE_DIR = Path(os.environ.get('MESSAGE_ARCHIVE_DIR', str(Path(__file__).resolve().parent.parent / "message_archive")))
+MESSAGE_ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('MESSAGE_ARCHIVE_INTERVAL_SECONDS', '3600'))
+MESSAGE_ARCHIVE_BATCH = 5000
+MESSAGE_MIGRATE_BATCH = 1000
+
+_ROLES = {"user": "u", "assistant": "a"}
+_ROLE_NAMES = {v: k for k, v in _ROLES.items()}
+_FIELDS = {"trace_id": "tr", "prompt_tokens": "pt", "completion_tokens": "ct", "cached": "c", "ttft_ms": "ft", "latency_ms": "lt"}
+_FIELD_NAMES = {v: k for k, v in _FIELDS.items()}
+
+# True while documents in the old layout may remain; cleared once a migration pass finds none
+_legacy = True
+
+def compact_message(user_id: str, jid: str, role: str, text: str, at: datetime, **extra) -> Dict[str, Any]:
+    doc = {"u": user_id, "j": jid, "r": _ROLES[role], "x": text, "t": at}
+    for key, value in extra.items():
+        doc[_FIELDS.get(key, key)] = value
+    return doc
+
+async def store_message(user_id: str, jid: str, role: str, text: str, at: Optional[datetime] = None, **extra):
+    await db.messages.insert_one(compact_message(user_id, jid, role, text, at or datetime.now(timezone.utc), **extra))
+
+def expand_message(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The API shape of a stored, archived or not yet migrated message."""
+    if "from_jid" in doc:
+        return {k: v for k, v in doc.items() if k not in ("_id", "user_id", "push_name")}
+    out = {
+        "id": str(doc.get("_id") or doc.get("id")), "from_jid": doc["j"], "role": _ROLE_NAMES[doc["r"]], "text": doc["x"],
+        "timestamp": as_utc(doc["t"]).isoformat() if isinstance(doc["t"], datetime) else doc["t"],
+    }
+    for key, value in doc.items():
+        if key in _FIELD_NAMES:
+            out[_FIELD_NAMES[key]] = value
+    return out
+
+def message_query(user_id: str, jid: Optional[str] = None, role: Optional[str] = None, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """Filter on the compact fields, also matching old-layout documents while any remain."""
+    query: Dict[str, Any] = {"u": user_id}
+    legacy: Dict[str, Any] = {"user_id": user_id}
+    if jid is not None:
+        query["j"] = legacy["from_jid"] = jid
+    if role is not None:
+        query["r"], legacy["role"] = _ROLES[role], role
+    if since is not None:
+        query["t"], legacy["timestamp"] = {"$gte": since}, {"$gte": since.isoformat()}
+    return {"$or": [query, legacy]} if _legacy else query
+
+def message_field(name: str) -> Any:
+    """Aggregation expression for a long-named field on either layout."""
+    return {"$ifNull": [f"${_FIELDS[name]}", f"${name}"]} if _legacy else f"${_FIELDS[name]}"
+
+def message_exists(name: str) -> Dict[str, Any]:
+    """Filter for messages that carry a long-named field on either layout."""
+    short = {_FIELDS[name]: {"$exists": True}}
+    return {"$or": [short, {name: {"$exists": True}}]} if _legacy else short
+
+# ─── HISTORY ──────────────────────────────────────────────
+
+def _archive_path(user_id: str, jid: str) -> Path:
+    return MESSAGE_ARCHIVE_DIR / quote(user_id, safe="") / f"{quote(jid, safe='')}.jsonl.gz"
+
+def _read_archive(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    seen = set()
+    rows = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            # An archive run interrupted between writing and deleting leaves duplicates behind
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                rows.append(row)
+    rows.sort(key=lambda row: row["t"])
+    return rows
+
+async def message_history(user_id: str, jid: str, limit: int) -> List[Dict[str, Any]]:
+    """The conversation's first `limit` messages, oldest first, archived ones included."""
+    out: List[Dict[str, Any]] = []
+    query = message_query(user_id, jid)
+    if await db.message_archives.find_one({"user_id": user_id, "jid": jid}, {"_id": 1}):
+        rows = await asyncio.get_running_loop().run_in_executor(resources.executor("message-archive", 1), _read_archive, _archive_path(user_id, jid))
+        out = [expand_message(row) for row in rows[:limit]]
+        # A batch archived by a run that stopped before deleting it is still in Mongo; skip those copies
+        oldest = await db.messages.find_one(query, {"t": 1}, sort=[("t", 1)]) if rows else None
+        if oldest and isinstance(oldest.get("t"), datetime):
+            copies = [ObjectId(row["id"]) for row in rows if as_utc(row["t"]) >= as_utc(oldest["t"])]
+            if copies:
+                query = {"$and": [query, {"_id": {"$nin": copies}}]}
+    if len(out) < limit:
+        remaining = limit - len(out)
+        docs = await db.messages.find(query).sort("t", 1).limit(remaining).to_list(remaining)
+        hot = [expand_message(d) for d in docs]
+        if _legacy:
+            hot.sort(key=lambda m: m["timestamp"])
+        out += hot
+    return out
+
+async def has_history(user_id: str, jid: str) -> bool:
+    if await db.messages.find_one(message_query(user_id, jid), {"_id": 1}):
+        return True
+    return bool(await db.message_archives.find_one({"user_id": user_id, "jid": jid}, {"_id": 1}))
+
+async def archived_counts(user_id: str) -> Dict[str, int]:
+    rows = await db.message_archives.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "total": {"$sum": "$count"}, "user": {"$sum": "$user_count"}, "assistant": {"$sum": "$assistant_count"}}},
+    ]).to_list(1)
+    return {k: rows[0][k] if rows else 0 for k in ("total", "user", "assistant")}
+
+# ─── MIGRATION ────────────────────────────────────────────
+
+def _from_legacy(doc: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        at = datetime.fromisoformat(doc["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        at = doc["_id"].generation_time
+    extra = {k: doc[k] for k in _FIELDS if k in doc}
+    return compact_message(doc["user_id"], doc["from_jid"], doc.get("role", "user"), doc.get("text", ""), at, **extra)
+
+async def migrate_messages() -> int:
+    """Rewrite old-layout messages in batches; safe to run from several workers at once."""
+    global _legacy
+    migrated = 0
+    while True:
+        docs = await db.messages.find({"from_jid": {"$exists": True}}).limit(MESSAGE_MIGRATE_BATCH).to_list(MESSAGE_MIGRATE_BATCH)
+        if not docs:
+            break
+        await db.messages.bulk_write([ReplaceOne({"_id": d["_id"], "from_jid": {"$exists": True}}, _from_legacy(d)) for d in docs], ordered=False)
+        # The push name now lives on the conversation only
+        names = {(d["user_id"], d["from_jid"]): d["push_name"] for d in docs if d.get("push_name")}
+        for (user_id, jid), push_name in names.items():
+            await db.conversations.update_one({"user_id": user_id, "jid": jid, "push_name": {"$exists": False}}, {"$set": {"push_name": push_name}})
+        migrated += len(docs)
+    _legacy = False
+    return migrated
+
+async def _migrate_in_background():
+    started = time.perf_counter()
+    try:
+        migrated = await migrate_messages()
+        if migrated:
+            logger.info(f"Migrated {migrated} messages to the compact layout in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.warning(f"Message migration failed: {e}")
+
+# ─── ARCHIVAL ─────────────────────────────────────────────
+
+def _append_archives(groups: Dict[tuple, List[Dict[str, Any]]]):
+    for (user_id, jid), docs in groups.items():
+        path = _archive_path(user_id, jid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps({**{k: v for k, v in d.items() if k not in ("_id", "u", "j")}, "id": str(d["_id"]), "j": jid, "t": as_utc(d["t"]).isoformat()}) + "\n" for d in docs)
+        # Each run appends a gzip member; readers see the concatenation as one stream
+        with open(path, "ab") as f:
+            f.write(gzip.compress(lines.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+
+async def archive_messages(days: int) -> int:
+    """Move messages older than `days` to the conversation archives, one batch at a time.
+
+    Files are written and synced, and the conversation's archive row exists, before the batch is
+    deleted from Mongo, so a crash can only leave a message in both places, never in neither.
+    Counts are added after the delete, so a batch archived twice is counted once."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    archived = 0
+    while True:
+        docs = await db.messages.find({"t": {"$lt": cutoff}, "j": {"$ne": TEST_JID}}).sort("t", 1).limit(MESSAGE_ARCHIVE_BATCH).to_list(MESSAGE_ARCHIVE_BATCH)
+        if not docs:
+            return archived
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for d in docs:
+            groups.setdefault((d["u"], d["j"]), []).append(d)
+        await asyncio.get_running_loop().run_in_executor(resources.executor("message-archive", 1), _append_archives, groups)
+        # History reads the file only once this row exists, so it has to precede the delete
+        for (user_id, jid), rows in groups.items():
+            await db.message_archives.update_one(
+                {"user_id": user_id, "jid": jid},
+                {"$max": {"last_at": rows[-1]["t"]}, "$min": {"first_at": rows[0]["t"]}},
+                upsert=True,
+            )
+        await db.messages.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        for (user_id, jid), rows in groups.items():
+            users = sum(1 for d in rows if d["r"] == "u")
+            await db.message_archives.update_one(
+                {"user_id": user_id, "jid": jid},
+                {"$inc": {"count": len(rows), "user_count": users, "assistant_count": len(rows) - users}},
+            )
+        archived += len(docs)
+        if len(docs) < MESSAGE_ARCHIVE_BATCH:
+            return archived
+
+async def _claim_archive_run() -> bool:
+    """Lease the archive job for one interval, so only one worker appends to the files."""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.jobs.find_one_and_update(
+            {"_id": "message-archive", "lease_until": {"$lt": now}},
+            {"$set": {"lease_until": now + timedelta(seconds=MESSAGE_ARCHIVE_INTERVAL_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def _archive_loop():
+    while True:
+        try:
+            if not _legacy and await _claim_archive_run():
+                archived = await archive_messages(MESSAGE_ARCHIVE_DAYS)
+                if archived:
+                    logger.info(f"Archived {archived} messages older than {MESSAGE_ARCHIVE_DAYS} days")
+        except Exception as e:
+            logger.warning(f"Message archival failed: {e}")
+        await asyncio.sleep(MESSAGE_ARCHIVE_INTERVAL_SECONDS)
+
+async def start():
+    """Create the indexes and migrate any old-layout messages in the background."""
+    global _legacy
+    await db.messages.create_index([("u", 1), ("j", 1), ("t", 1)])
+    await db.messages.create_index("t")
+    await db.message_archives.create_index([("user_id", 1), ("jid", 1)], unique=True)
+    _legacy = bool(await db.messages.find_one({"from_jid": {"$exists": True}}, {"_id": 1}))
+    if _legacy:
+        resources.spawn("messages-migrate", _migrate_in_background())
+
+async def start_archive():
+    """Run archival every MESSAGE_ARCHIVE_INTERVAL_SECONDS when MESSAGE_ARCHIVE_DAYS is set."""
+    if MESSAGE_ARCHIVE_DAYS > 0:
+        resources.spawn("messages-archive", _archive_loop())
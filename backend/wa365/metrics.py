@@ -0,0 +1,78 @@
+"""Per-stage latency tracing for /api/wa/message and the Prometheus exposition at /metrics."""
+
+import bisect, logging, os, time, uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from wa365.watchdog import render_loop_lag
+
+logger = logging.getLogger(__name__)
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Prometheus-style histogram over LATENCY_BUCKETS; the last slot counts observations above every bound."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+# (tenant, stage) -> Histogram for each stage of /wa/message; (tenant, outcome) -> Histogram for the whole request
+_stage_latency: Dict[tuple, Histogram] = {}
+_message_latency: Dict[tuple, Histogram] = {}
+
+class Trace:
+    """Timing spans for one incoming message. A stage entered more than once (e.g. persist) is summed."""
+
+    def __init__(self, user_id: str, trace_id: Optional[str] = None):
+        self.user_id = user_id
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - started
+
+    def finish(self, outcome: str):
+        total = time.perf_counter() - self.started
+        for stage, seconds in self.stages.items():
+            _stage_latency.setdefault((self.user_id, stage), Histogram()).observe(seconds)
+        _message_latency.setdefault((self.user_id, outcome), Histogram()).observe(total)
+        spans = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.stages.items())
+        logger.info(f"trace={self.trace_id} user={self.user_id} outcome={outcome} total={total * 1000:.1f}ms {spans}")
+
+def _metric_labels(labels: Dict[str, str]) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped))
+
+def _render_histograms(name: str, help_text: str, label_names: tuple, histograms: Dict[tuple, Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, h in sorted(histograms.items()):
+        labels = _metric_labels(dict(zip(label_names, key)))
+        cumulative = 0
+        for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), h.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+def render_metrics() -> str:
+    lines = _render_histograms("wa_message_stage_seconds", "Time spent in each stage of handling an incoming WhatsApp message.", ("tenant", "stage"), _stage_latency)
+    lines += _render_histograms("wa_message_seconds", "Total time to handle an incoming WhatsApp message.", ("tenant", "outcome"), _message_latency)
+    lines += render_loop_lag()
+    return "\n".join(lines) + "\n"
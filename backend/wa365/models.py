@@ -0,0 +1,186 @@
+"""Pydantic request, response and configuration models."""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+class User(BaseModel):
+    user_id: str
+    email: str
+    name: str
+    picture: Optional[str] = None
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class BookingType(BaseModel):
+    id: str
+    name: str
+    enabled: bool = True
+    keywords: List[str] = []
+    confirmation_message: str = ""
+
+class BotConfig(BaseModel):
+    bot_name: str = "WhatsApp 365 Bot"
+    greeting_message: str = "Hello! How can I help you today?"
+    fallback_message: str = "I'm sorry, I can only assist with topics related to our business."
+    model_provider: str = "openai"
+    model_name: str = "gpt-4o"
+    temperature: float = 0.3
+    max_tokens: int = 1024
+    top_p: float = 1.0
+    system_prompt: str = "You are a helpful business assistant."
+    language: str = "en-GB"
+    tone: str = "professional"
+    response_length: str = "normal"
+    business_context: str = ""
+    faq_text: str = ""
+    strict_mode: bool = True
+    booking_types: List[BookingType] = [
+        BookingType(id="breakdown", name="Breakdown", enabled=True, keywords=["breakdown","broke down","broken down","engine failed"], confirmation_message="I've logged a breakdown request. Our team will be in touch shortly to confirm."),
+        BookingType(id="arrange_collection", name="Arrange Collection", enabled=True, keywords=["collection","collect","pick up","pickup","come get"], confirmation_message="I've arranged a collection request. Please await admin confirmation."),
+        BookingType(id="arrange_delivery", name="Arrange Delivery", enabled=True, keywords=["delivery","deliver","drop off","dropoff","send"], confirmation_message="I've arranged a delivery request. Please await admin confirmation."),
+    ]
+    rate_limit_enabled: bool = False
+    rate_limit_msgs: int = 10
+    rate_limit_window_minutes: int = 1
+    blocked_words: List[str] = []
+    blocked_contacts: List[str] = []
+    schedule_enabled: bool = False
+    schedule_start: str = "09:00"
+    schedule_end: str = "18:00"
+    outside_hours_message: str = "We're currently outside business hours. We'll be back shortly."
+    ai_enabled: bool = True
+    coalesce_enabled: bool = False
+    coalesce_window_ms: int = 1500
+    response_cache_enabled: bool = True
+    response_cache_ttl_seconds: int = 3600
+    response_cache_fuzzy: bool = False
+    fallback_provider: str = "gemini"
+    fallback_model_name: str = "gemini-2.0-flash"
+    latency_routing: bool = False
+    hedge_after_ms: int = 0
+    prompt_token_budget: int = 8000
+    takeover_idle_minutes: int = 0
+    updated_at: Optional[datetime] = None
+
+class BotAction(BaseModel):
+    action_id: str
+    user_id: str
+    jid: str
+    push_name: str
+    action_type: str
+    action_label: str
+    trigger_message: str
+    status: str = "pending"
+    admin_note: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class KnowledgeDoc(BaseModel):
+    id: str
+    filename: str
+    file_type: str
+    size_bytes: int
+    char_count: int
+    enabled: bool = True
+    uploaded_at: datetime
+
+class ConversationModel(BaseModel):
+    id: str
+    jid: str
+    push_name: str
+    last_message: str
+    last_timestamp: str
+    message_count: int
+    taken_over: bool = False
+    takeover_by: Optional[str] = None
+
+class IncomingMessage(BaseModel):
+    from_: str = Field(alias="from")
+    pushName: str
+    text: str
+    timestamp: Any
+    user_id: Optional[str] = None
+    trace_id: Optional[str] = None
+    class Config:
+        populate_by_name = True
+
+class WAEvent(BaseModel):
+    event: str
+    data: Optional[Dict] = None
+    user_id: Optional[str] = None
+
+class SendMessageRequest(BaseModel):
+    jid: str
+    message: str
+    idempotency_key: Optional[str] = None
+
+class WorkflowNode(BaseModel):
+    id: str
+    type: str  # start | message | question | collect | escalate | end
+    title: str
+    content: str = ""
+    branches: List[Dict] = []  # [{label, next_id}]
+    position: int = 0
+
+class WorkflowData(BaseModel):
+    nodes: List[WorkflowNode] = []
+    active: bool = True
+    execution: str = "prompt"  # prompt | engine (opt-in)
+    updated_at: Optional[datetime] = None
+
+class TakeoverRequest(BaseModel):
+    active: bool
+
+class ChatTestRequest(BaseModel):
+    message: str
+
+class ActionUpdateRequest(BaseModel):
+    status: str
+    admin_note: Optional[str] = None
+
+class BroadcastFilter(BaseModel):
+    active_since_days: Optional[int] = None
+    min_messages: Optional[int] = None
+    include_taken_over: bool = False
+
+class BroadcastRequest(BaseModel):
+    template: str
+    jids: Optional[List[str]] = None
+    filter: Optional[BroadcastFilter] = None
+    concurrency: int = Field(default=5, ge=1, le=50)
+    interval_ms: int = Field(default=1000, ge=0, le=60000)
+
+class ActionBulkUpdateRequest(BaseModel):
+    action_ids: List[str]
+    status: str
+    admin_note: Optional[str] = None
+
+class GmailCredentials(BaseModel):
+    client_id: str
+    client_secret: str
+
+class SendEmailRequest(BaseModel):
+    to: str
+    subject: str
+    body: str
+
+class CreateSheetRequest(BaseModel):
+    title: str
+    mode: str = "edit"  # "edit" or "read"
+
+class ActionsExportRequest(BaseModel):
+    enabled: bool
+    backfill: bool = False
+
+class AppendSheetRequest(BaseModel):
+    spreadsheet_id: str
+    sheet_name: str = "Sheet1"
+    values: List[List[Any]]
+
+class ReadSheetRequest(BaseModel):
+    spreadsheet_id: str
+    range: str = "Sheet1"
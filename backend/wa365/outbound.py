@@ -0,0 +1,191 @@
+"""Persistent, paced and retrying queue for outbound WhatsApp messages."""
+
+import asyncio, logging, os, random, time, uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from wa365.baileys import baileys_send_batch
+from wa365.helpers import add_log
+from wa365.resources import db, resources
+from wa365.timestamps import as_utc, before, iso
+
+logger = logging.getLogger(__name__)
+
+# Per tenant and per worker process: N dashboard workers can together send N times this rate
+OUTBOUND_RATE_PER_SECOND = float(os.environ.get('OUTBOUND_RATE_PER_SECOND', '1'))
+OUTBOUND_BURST = int(os.environ.get('OUTBOUND_BURST', '5'))
+OUTBOUND_MAX_ATTEMPTS = int(os.environ.get('OUTBOUND_MAX_ATTEMPTS', '5'))
+OUTBOUND_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOUND_RETRY_BASE_SECONDS', '2'))
+OUTBOUND_RETRY_MAX_SECONDS = 300
+OUTBOUND_LEASE_SECONDS = 60
+OUTBOUND_BATCH_SIZE = 20
+OUTBOUND_DATETIME_FIELDS = ("created_at", "updated_at", "next_attempt_at", "lease_until", "sent_at")
+
+class SendBucket:
+    """Token bucket pacing one tenant's sends so WhatsApp never sees a large burst."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def try_take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+_outbound_queues: Dict[str, asyncio.Queue] = resources.cache("outbound_queues", dict)
+
+def outbound_queue(user_id: str) -> asyncio.Queue:
+    """Return the tenant's delivery queue, starting its worker on first use."""
+    queue = _outbound_queues.get(user_id)
+    if queue is None:
+        queue = _outbound_queues[user_id] = asyncio.Queue()
+        resources.spawn(f"outbound:{user_id}", _outbound_worker(user_id, queue))
+    return queue
+
+def schedule_outbound(user_id: str, delivery_id: str, delay: float = 0):
+    queue = outbound_queue(user_id)
+    if delay > 0:
+        asyncio.get_running_loop().call_later(delay, queue.put_nowait, delivery_id)
+    else:
+        queue.put_nowait(delivery_id)
+
+def outbound_backoff(attempts: int) -> float:
+    delay = min(OUTBOUND_RETRY_MAX_SECONDS, OUTBOUND_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+def outbound_view(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored delivery as the API returns it, timestamps as ISO strings."""
+    return {**doc, **{f: iso(doc[f]) or None for f in OUTBOUND_DATETIME_FIELDS if f in doc}}
+
+def _reclaimable(now: datetime, due_before: Optional[datetime] = None) -> Dict[str, Any]:
+    # Queued deliveries (only those due before `due_before` when given), and sends whose worker died before its lease ran out
+    queued: Dict[str, Any] = {"status": "queued"}
+    if due_before:
+        queued.update(before("outbound_messages", "next_attempt_at", due_before))
+    return {"$or": [queued, {"status": "sending", **before("outbound_messages", "lease_until", now)}]}
+
+async def enqueue_outbound(user_id: str, jid: str, message: str, source: str, idempotency_key: Optional[str] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """Persist an outbound message and queue it for delivery; repeated keys return the original."""
+    key = idempotency_key or str(uuid.uuid4())
+    existing = await db.outbound_messages.find_one({"user_id": user_id, "idempotency_key": key}, {"_id": 0})
+    if existing:
+        return existing
+    now = datetime.now(timezone.utc)
+    doc = {
+        "id": str(uuid.uuid4()), "user_id": user_id, "jid": jid, "message": message, "source": source, "job_id": job_id,
+        "idempotency_key": key, "status": "queued", "attempts": 0, "last_error": None,
+        "created_at": now, "updated_at": now, "next_attempt_at": now, "sent_at": None,
+    }
+    try:
+        await db.outbound_messages.insert_one({**doc})
+    except DuplicateKeyError:
+        return await db.outbound_messages.find_one({"user_id": user_id, "idempotency_key": key}, {"_id": 0})
+    schedule_outbound(user_id, doc["id"])
+    return doc
+
+async def _claim_outbound(delivery_id: str) -> Optional[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    doc = await db.outbound_messages.find_one_and_update(
+        {"id": delivery_id, **_reclaimable(now)},
+        {"$set": {"status": "sending", "lease_until": now + timedelta(seconds=OUTBOUND_LEASE_SECONDS), "updated_at": now}, "$inc": {"attempts": 1}},
+        projection={"_id": 0},
+    )
+    if doc:
+        doc["attempts"] = doc.get("attempts", 0) + 1
+    return doc
+
+async def _finish_outbound(user_id: str, doc: Dict[str, Any], result: Dict):
+    now = datetime.now(timezone.utc)
+    if result.get("success"):
+        await db.outbound_messages.update_one({"id": doc["id"]}, {"$set": {"status": "sent", "last_error": None, "sent_at": now, "updated_at": now}})
+        return
+    error = str(result.get("error") or "Send failed")[:300]
+    if doc["attempts"] >= OUTBOUND_MAX_ATTEMPTS:
+        await db.outbound_messages.update_one({"id": doc["id"]}, {"$set": {"status": "failed", "last_error": error, "updated_at": now}})
+        await add_log(user_id, "error", f"Message to {doc['jid'].split('@')[0]} failed after {doc['attempts']} attempts: {error}")
+        return
+    delay = outbound_backoff(doc["attempts"])
+    await db.outbound_messages.update_one({"id": doc["id"]}, {"$set": {
+        "status": "queued", "last_error": error, "updated_at": now,
+        "next_attempt_at": now + timedelta(seconds=delay),
+    }})
+    schedule_outbound(user_id, doc["id"], delay)
+
+async def _outbound_worker(user_id: str, queue: asyncio.Queue):
+    bucket = SendBucket(OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST)
+    while True:
+        delivery_id = await queue.get()
+        try:
+            doc = await _claim_outbound(delivery_id)
+            if not doc:
+                continue
+            await bucket.take()
+            # Whatever else is ready within the burst allowance rides along in the same batch
+            batch = [doc]
+            while len(batch) < OUTBOUND_BATCH_SIZE and not queue.empty() and bucket.try_take():
+                extra = await _claim_outbound(queue.get_nowait())
+                if extra:
+                    batch.append(extra)
+                else:
+                    bucket.tokens += 1
+            try:
+                results = await baileys_send_batch(user_id, [{"to": d["jid"], "message": d["message"], "idempotency_key": d["idempotency_key"]} for d in batch])
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}] * len(batch)
+            for d, result in zip(batch, results):
+                await _finish_outbound(user_id, d, result)
+        except Exception as e:
+            logger.warning(f"Outbound delivery {delivery_id} crashed: {e}")
+
+async def recover_outbound(overdue: bool = False) -> int:
+    """Requeue deliveries left queued or mid-send by a previous process, each at its due time.
+
+    With `overdue`, only deliveries that no live worker is holding are picked up: sends whose lease
+    ran out, and queued ones a full lease period past due, whose in-memory retry timer was lost."""
+    now = datetime.now(timezone.utc)
+    due_before = now - timedelta(seconds=OUTBOUND_LEASE_SECONDS) if overdue else None
+    pending = db.outbound_messages.find(
+        _reclaimable(now, due_before),
+        {"_id": 0, "id": 1, "user_id": 1, "next_attempt_at": 1},
+    )
+    requeued = 0
+    async for doc in pending:
+        due = as_utc(doc.get("next_attempt_at")) or now
+        schedule_outbound(doc["user_id"], doc["id"], max(0.0, (due - now).total_seconds()))
+        requeued += 1
+    return requeued
+
+async def _outbound_reclaim_loop():
+    while True:
+        await asyncio.sleep(OUTBOUND_LEASE_SECONDS)
+        try:
+            requeued = await recover_outbound(overdue=True)
+            if requeued:
+                logger.info(f"Reclaimed {requeued} stalled outbound deliveries")
+        except Exception as e:
+            logger.warning(f"Outbound reclaim failed: {e}")
+
+async def start():
+    await db.outbound_messages.create_index([("user_id", 1), ("idempotency_key", 1)], unique=True)
+    await db.outbound_messages.create_index([("status", 1), ("next_attempt_at", 1)])
+    await recover_outbound()
+    resources.spawn("outbound-reclaim", _outbound_reclaim_loop())
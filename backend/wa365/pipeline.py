@@ -0,0 +1,189 @@
+"""The inbound message pipeline behind /api/wa/message and the Baileys channel."""
+
+import logging, time, uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from wa365.coalesce import coalesce_done, coalesce_generate, coalesce_join, coalesce_pending, coalesce_superseded
+from wa365.helpers import add_log, cached_bot_config, detect_booking, preload_bot_configs
+from wa365.llm import llm_generate
+from wa365.message_store import has_history, message_query, store_message
+from wa365.metrics import Trace
+from wa365.models import BotConfig, IncomingMessage
+from wa365.prompt import build_enriched_prompt, estimate_tokens
+from wa365.resources import db
+from wa365.response_cache import response_cache_get, response_cache_put
+from wa365.takeover import takeover_holder
+from wa365.workflow import get_workflow_graph, preload_workflow_graphs, workflow_engine_active, workflow_turn
+
+logger = logging.getLogger(__name__)
+
+async def generate_reply(enriched_prompt: str, message: str, user_id: str, config: BotConfig, error_label: str = "LLM error"):
+    """Return (reply, usage); usage holds the estimated prompt/completion tokens spent."""
+    cached = response_cache_get(user_id, enriched_prompt, message, config)
+    if cached is not None:
+        return cached, {"prompt_tokens": 0, "completion_tokens": 0, "cached": True}
+    prompt = f"{enriched_prompt}\n\nUser message: {message}"
+    try:
+        reply = await llm_generate(prompt, user_id, config)
+    except Exception as e:
+        await add_log(user_id, "error", f"{error_label}: {str(e)}")
+        return config.fallback_message, {"prompt_tokens": 0, "completion_tokens": 0}
+    response_cache_put(user_id, enriched_prompt, message, reply, config)
+    return reply, {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(reply)}
+
+async def _store_unanswered(user_id: str, jid: str, push_name: str, text: str, received: datetime, trace: Trace):
+    """Record a message whose reply is left to a newer message in the same burst."""
+    with trace.span("persist"):
+        await db.conversations.update_one(
+            {"user_id": user_id, "jid": jid},
+            {"$set": {"user_id": user_id, "jid": jid, "push_name": push_name, "last_message": text, "last_timestamp": received}, "$inc": {"message_count": 1}},
+            upsert=True,
+        )
+        await add_log(user_id, "info", f"Message from {push_name} coalesced into a later reply")
+    return {"reply": None}
+
+async def process_incoming_message(msg: IncomingMessage, trace: Trace):
+    jid = msg.from_
+    push_name = msg.pushName or jid.split("@")[0]
+    text = msg.text
+    user_id = msg.user_id or "unknown"
+    received = datetime.now(timezone.utc)
+
+    with trace.span("persist"):
+        await add_log(user_id, "info", f"Message from {push_name}: {text[:60]}")
+    with trace.span("config"):
+        config = await cached_bot_config(user_id)
+
+    # Skip if AI is disabled
+    if not config.ai_enabled:
+        with trace.span("persist"):
+            await store_message(user_id, jid, "user", text, received)
+            await db.conversations.update_one({"user_id": user_id, "jid": jid}, {"$set": {"push_name": push_name, "last_message": text, "last_timestamp": received}, "$inc": {"message_count": 1}}, upsert=True)
+            await add_log(user_id, "info", f"[AI PAUSED] Message from {push_name} stored — AI is disabled")
+        return {"reply": None}
+
+    # Skip if conversation is taken over by admin
+    with trace.span("takeover"):
+        held = await takeover_holder(user_id, jid, config.takeover_idle_minutes)
+    if held:
+        with trace.span("persist"):
+            await store_message(user_id, jid, "user", text, received)
+            await db.conversations.update_one({"user_id": user_id, "jid": jid}, {"$set": {"push_name": push_name, "last_message": text, "last_timestamp": received}, "$inc": {"message_count": 1}})
+            await add_log(user_id, "info", f"[LIVE AGENT] Message from {push_name} held (admin takeover active)")
+        return {"reply": None}
+
+    if jid in (config.blocked_contacts or []):
+        return {"reply": None}
+    for word in (config.blocked_words or []):
+        if word.lower() in text.lower():
+            return {"reply": None}
+
+    if config.schedule_enabled:
+        now_time = datetime.now(timezone.utc).strftime("%H:%M")
+        if not (config.schedule_start <= now_time <= config.schedule_end):
+            return {"reply": config.outside_hours_message}
+
+    if config.rate_limit_enabled:
+        window_start = received - timedelta(minutes=config.rate_limit_window_minutes)
+        with trace.span("rate_limit"):
+            recent_count = await db.messages.count_documents(message_query(user_id, jid, "user", since=window_start))
+        if recent_count >= config.rate_limit_msgs:
+            return {"reply": None}
+
+    # First message greeting (a workflow run by the engine opens with its own start step)
+    with trace.span("greeting"):
+        workflow_graph = await get_workflow_graph(user_id)
+        is_first_message = not await has_history(user_id, jid)
+    if is_first_message and config.greeting_message and not workflow_engine_active(workflow_graph):
+        greeting_reply = config.greeting_message
+        with trace.span("persist"):
+            await store_message(user_id, jid, "user", text, received)
+            await store_message(user_id, jid, "assistant", greeting_reply, trace_id=trace.trace_id)
+            await db.conversations.update_one(
+                {"user_id": user_id, "jid": jid},
+                {"$set": {"user_id": user_id, "jid": jid, "push_name": push_name, "last_message": text, "last_timestamp": received, "taken_over": False}, "$inc": {"message_count": 1}},
+                upsert=True,
+            )
+            await add_log(user_id, "info", f"First message from {push_name} — greeting sent")
+        return {"reply": greeting_reply}
+
+    # Save user message
+    with trace.span("persist"):
+        await store_message(user_id, jid, "user", text, received)
+
+    # Coalesce bursts: only the last message of a burst is answered, for all of it
+    seq = None
+    turn_texts = [text]
+    if config.coalesce_enabled and config.coalesce_window_ms > 0:
+        with trace.span("coalesce"):
+            seq = await coalesce_join(user_id, jid, text, config.coalesce_window_ms)
+        if seq is None:
+            return await _store_unanswered(user_id, jid, push_name, text, received, trace)
+        turn_texts = coalesce_pending(user_id, jid)
+    turn_text = "\n".join(turn_texts)
+
+    buffered = seq is not None  # this turn still holds the burst's buffered texts
+    try:
+        # Detect booking
+        usage: Dict[str, Any] = {}
+        step = None
+        with trace.span("booking"):
+            booking = detect_booking(turn_text, config.booking_types)
+        if booking:
+            action_id = str(uuid.uuid4())
+            now = datetime.now(timezone.utc)
+            with trace.span("persist"):
+                await db.bot_actions.insert_one({
+                    "action_id": action_id, "user_id": user_id, "jid": jid, "push_name": push_name,
+                    "action_type": booking.id, "action_label": booking.name,
+                    "trigger_message": turn_text, "status": "pending",
+                    "admin_note": None, "created_at": now, "updated_at": now,
+                })
+                await add_log(user_id, "info", f"Booking detected: {booking.name} from {push_name}")
+            reply = f"{booking.confirmation_message}\n\nA reference has been logged (Ref: {action_id[:8].upper()}). An agent will confirm shortly."
+        else:
+            with trace.span("workflow"):
+                step = await workflow_turn(user_id, jid, turn_text, workflow_graph)
+            if step and step["reply"]:
+                reply = step["reply"]
+            else:
+                with trace.span("prompt"):
+                    enriched_prompt = await build_enriched_prompt(config, user_id)
+                if step and step["hint"]:
+                    enriched_prompt += step["hint"]
+                generation = generate_reply(enriched_prompt, turn_text, user_id, config)
+                with trace.span("llm"):
+                    result = await (generation if seq is None else coalesce_generate(user_id, jid, seq, generation))
+                reply, usage = result or (None, {})
+
+        if buffered:
+            # Bookings and workflow steps have already been recorded, so they are always sent; LLM replies yield to newer messages
+            if not booking and not (step and step["reply"]) and coalesce_superseded(user_id, jid, seq):
+                return await _store_unanswered(user_id, jid, push_name, text, received, trace)
+            coalesce_done(user_id, jid, len(turn_texts))
+            buffered = False
+    finally:
+        # Also on errors and cancellation, so a failed turn's texts aren't answered again with the contact's
+        # next message; texts a newer message has taken over are left to it
+        if buffered and not coalesce_superseded(user_id, jid, seq):
+            coalesce_done(user_id, jid, len(turn_texts))
+
+    with trace.span("persist"):
+        await store_message(user_id, jid, "assistant", reply, trace_id=trace.trace_id, **usage)
+        await db.conversations.update_one(
+            {"user_id": user_id, "jid": jid},
+            {"$set": {"user_id": user_id, "jid": jid, "push_name": push_name, "last_message": text, "last_timestamp": received}, "$inc": {"message_count": 1}},
+            upsert=True,
+        )
+        await add_log(user_id, "info", f"Replied to {push_name}: {reply[:60]}")
+    return {"reply": reply}
+
+async def warm_caches():
+    """Preload the per-tenant state every message reads (bot config, compiled workflow) in two bulk
+    queries. Ingest workers run this at startup so a restart or scale-out doesn't turn the first
+    message of every tenant into a Mongo round trip."""
+    started = time.perf_counter()
+    configs = await preload_bot_configs()
+    graphs = await preload_workflow_graphs()
+    logger.info(f"Message path caches warmed: {configs} configs, {graphs} workflows in {(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,185 @@
+"""On-demand sampling profiler and always-on stack capture for slow requests."""
+
+import asyncio, logging, os, sys, threading, time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from wa365.resources import resources
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MAX_SECONDS = 120
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '1000'))
+SLOW_REQUEST_PATHS = ("/api/wa/message", "/api/knowledge/upload")
+SLOW_REQUEST_SAMPLE_MS = 100
+SLOW_REQUEST_MAX_SAMPLES = 50
+
+# Frames are (function, file, line); stacks are tuples of frames, outermost first
+def frame_stack(frame) -> tuple:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+def coroutine_stack(coro) -> tuple:
+    """Where a suspended task is waiting: the chain of awaiting coroutines, outermost first."""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        code = frame.f_code
+        stack.append((code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return tuple(stack)
+
+def collapse_stack(stack: tuple) -> str:
+    return ";".join(f"{name} ({file}:{line})" for name, file, line in stack)
+
+def is_idle_stack(stack: tuple) -> bool:
+    return bool(stack) and stack[-1][0] == "select" and stack[-1][1] == "selectors.py"
+
+def sample_threads(thread_ids: Optional[set] = None) -> Dict[int, tuple]:
+    return {tid: frame_stack(frame) for tid, frame in sys._current_frames().items() if thread_ids is None or tid in thread_ids}
+
+class SamplingProfiler:
+    """Samples the Python stacks of running threads from a background thread for an on-demand profile."""
+
+    def __init__(self, interval: float, thread_ids: Optional[set]):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples: Dict[int, Counter] = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.started = self.elapsed = 0.0
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for tid, stack in sample_threads(self.thread_ids).items():
+                if tid != me:
+                    self.samples.setdefault(tid, Counter())[stack] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def thread_names(self) -> Dict[int, str]:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        return {tid: names.get(tid, str(tid)) for tid in self.samples}
+
+    def collapsed(self, include_idle: bool) -> str:
+        names = self.thread_names()
+        lines = []
+        for tid, counter in self.samples.items():
+            for stack, n in counter.most_common():
+                if include_idle or not is_idle_stack(stack):
+                    lines.append(f"{names[tid]};{collapse_stack(stack)} {n}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, include_idle: bool) -> Dict[str, Any]:
+        frames: List[Dict] = []
+        index: Dict[tuple, int] = {}
+        profiles = []
+        for tid, name in self.thread_names().items():
+            samples, weights = [], []
+            for stack, n in self.samples[tid].items():
+                if not include_idle and is_idle_stack(stack):
+                    continue
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                samples.append([index[f] for f in stack])
+                weights.append(n * self.interval)
+            profiles.append({"type": "sampled", "name": name, "unit": "seconds", "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights})
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"backend profile ({self.elapsed:.1f}s)", "exporter": "wa365-backend",
+            "shared": {"frames": frames}, "profiles": profiles,
+        }
+
+_profile_lock = asyncio.Lock()
+
+def profile_running() -> bool:
+    return _profile_lock.locked()
+
+async def run_profile(seconds: float, interval: float, thread_ids: Optional[set] = None) -> SamplingProfiler:
+    """Sample for `seconds`; one profile runs at a time, so check profile_running() first."""
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval, thread_ids)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+    return profiler
+
+
+_loop_thread_id: Optional[int] = None
+
+# id(scope) -> {"path", "started", "task", "samples": Counter}, for in-flight requests on SLOW_REQUEST_PATHS
+_inflight: Dict[int, Dict[str, Any]] = {}
+_slow_requests: deque = deque(maxlen=50)
+_slow_monitor_stop = threading.Event()
+
+def recent_slow_requests() -> List[Dict[str, Any]]:
+    """The last slow requests with their sampled stacks, newest first."""
+    return list(reversed(_slow_requests))
+
+def _slow_request_monitor():
+    """Always-on, low-rate sampler: stacks are only taken for requests already past SLOW_REQUEST_MS."""
+    while not _slow_monitor_stop.wait(SLOW_REQUEST_SAMPLE_MS / 1000):
+        now = time.perf_counter()
+        slow = [r for r in list(_inflight.values()) if (now - r["started"]) * 1000 >= SLOW_REQUEST_MS and sum(r["samples"].values()) < SLOW_REQUEST_MAX_SAMPLES]
+        if not slow:
+            continue
+        loop_stack = sample_threads({_loop_thread_id}).get(_loop_thread_id, ())
+        for r in slow:
+            try:
+                waiting = coroutine_stack(r["task"].get_coro())
+            except Exception:
+                waiting = ()
+            r["samples"][("task", waiting)] += 1
+            if loop_stack and not is_idle_stack(loop_stack):
+                r["samples"][("loop", loop_stack)] += 1
+
+class SlowRequestRecorder:
+    """ASGI middleware that keeps stacks of requests to SLOW_REQUEST_PATHS taking longer than SLOW_REQUEST_MS.
+
+    "task" samples show where the request's coroutine was awaiting; "loop" samples show
+    what else held the event loop at that moment (a blocking call shows up there)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in SLOW_REQUEST_PATHS:
+            return await self.app(scope, receive, send)
+        record = {"path": scope["path"], "started": time.perf_counter(), "task": asyncio.current_task(), "samples": Counter()}
+        _inflight[id(scope)] = record
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _inflight.pop(id(scope), None)
+            elapsed_ms = (time.perf_counter() - record["started"]) * 1000
+            if elapsed_ms >= SLOW_REQUEST_MS:
+                stacks = [{"kind": kind, "stack": collapse_stack(stack), "samples": n} for (kind, stack), n in record["samples"].most_common()]
+                _slow_requests.append({"path": record["path"], "elapsed_ms": round(elapsed_ms), "at": datetime.now(timezone.utc).isoformat(), "stacks": stacks})
+                top = stacks[0]["stack"].rsplit(";", 1)[-1] if stacks else "no samples"
+                logger.warning(f"Slow request {record['path']} took {elapsed_ms:.0f}ms (mostly at {top})")
+
+async def start():
+    global _loop_thread_id
+    _loop_thread_id = threading.get_ident()
+    _slow_monitor_stop.clear()
+    threading.Thread(target=_slow_request_monitor, name="slow-request-monitor", daemon=True).start()
+    resources.on_shutdown(_slow_monitor_stop.set)
@@ -0,0 +1,108 @@
+"""Prompt assembly under a per-tenant token budget."""
+
+from typing import Dict, List
+
+from wa365.helpers import add_log
+from wa365.models import BotConfig
+from wa365.resources import db, resources
+from wa365.workflow import get_workflow_graph
+
+PROMPT_TRUNCATION_MARKER = "\n[...truncated]"
+KB_HEADER = "\n\n## Knowledge Base Documents\n"
+
+# user_id -> the last over-budget warning logged, so an unchanged prompt is reported once
+_budget_warnings: Dict[str, str] = resources.cache("prompt_budget_warnings", dict)
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate, at roughly four characters per token."""
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` tokens, preferring a line or word boundary."""
+    limit = max(tokens, 0) * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > limit // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + PROMPT_TRUNCATION_MARKER
+
+def fit_prompt_sections(sections: List[tuple], budget: int):
+    """Fit (name, priority, text) sections into a token budget.
+
+    Budget is granted in priority order (lowest number first, ties by position) and
+    the last section to fit is truncated; lower-priority sections are dropped. Returns
+    the kept texts in their original order and a list of truncated/dropped names."""
+    kept: Dict[int, str] = {}
+    trimmed: List[str] = []
+    remaining = budget
+    marker_tokens = estimate_tokens(PROMPT_TRUNCATION_MARKER)
+    for i, (name, _, text) in sorted(enumerate(sections), key=lambda x: (x[1][1], x[0])):
+        tokens = estimate_tokens(text)
+        if tokens <= remaining:
+            kept[i] = text
+            remaining -= tokens
+        elif remaining > marker_tokens + 16:
+            kept[i] = truncate_to_tokens(text, remaining - marker_tokens)
+            remaining = 0
+            trimmed.append(f"{name} (truncated)")
+        else:
+            trimmed.append(f"{name} (dropped)")
+    return [kept[i] for i in sorted(kept)], trimmed
+
+async def build_enriched_prompt(config: BotConfig, user_id: str) -> str:
+    tone_map = {"friendly": "friendly and informal", "professional": "professional and formal", "technical": "technical and concise", "empathetic": "empathetic and supportive"}
+    length_map = {"concise": "1-2 sentences", "normal": "1-3 paragraphs", "detailed": "comprehensive"}
+    system = config.system_prompt
+    if config.strict_mode:
+        system += (
+            "\n\nCRITICAL: You MUST ONLY answer based on the context provided below (business context, FAQ, and knowledge base). "
+            "If you cannot answer using ONLY the provided information, respond exactly with: "
+            f"\"I'm sorry, I can only assist with {config.bot_name} related enquiries. Please contact us directly for other questions.\""
+            "\nDo NOT answer general knowledge questions. Do NOT make up information."
+        )
+    system += f"\n\nTone: Be {tone_map.get(config.tone, config.tone)}."
+    system += f"\nResponse length: {length_map.get(config.response_length, config.response_length)}."
+    if config.language != "auto":
+        system += f"\nLanguage: Always respond in {config.language}."
+
+    # (name, priority, text) in prompt order; priority decides what survives the budget
+    sections = [("system", 0, system)]
+    if config.business_context:
+        sections.append(("business context", 1, f"\n\nBusiness context:\n{config.business_context}"))
+    if config.faq_text:
+        sections.append(("FAQ", 3, f"\n\nFAQ:\n{config.faq_text}"))
+    graph = await get_workflow_graph(user_id)
+    if graph and graph["active"] and graph["order"]:
+        workflow_lines = ["\n\n## Conversation Workflow\nFollow this conversation flow. Adapt naturally, but always work toward completing each step:\n"]
+        for node in (graph["nodes"][nid] for nid in graph["order"]):
+            line = f"[{node['type'].upper()}] {node['title']}"
+            if node["content"]:
+                line += f": {node['content']}"
+            if node["branches"]:
+                line += f" → Options: {' | '.join(b['label'] for b in node['branches'])}"
+            workflow_lines.append(line)
+        workflow_text = "\n".join(workflow_lines)
+        workflow_text += "\n\nIMPORTANT: If a user skips steps, acknowledge it and guide them back toward the appropriate step based on context. Never skip the Escalate step when it applies."
+        sections.append(("workflow", 2, workflow_text))
+    kb_docs = await db.knowledge_docs.find({"user_id": user_id, "enabled": True}, {"_id": 0}).sort("uploaded_at", 1).to_list(50)
+    if kb_docs:
+        # Its own section, so it stays with whichever documents survive the budget
+        sections.append(("KB header", 4, KB_HEADER))
+    for i, d in enumerate(kb_docs):
+        separator = "" if i == 0 else "\n\n---\n\n"
+        sections.append((f"KB {d['filename']}", 4, f"{separator}[Document: {d['filename']}]\n{d['content'][:5000]}"))
+
+    parts, trimmed = fit_prompt_sections(sections, config.prompt_token_budget)
+    if KB_HEADER in parts and all(f"KB {d['filename']} (dropped)" in trimmed for d in kb_docs):
+        parts.remove(KB_HEADER)
+    if trimmed:
+        total = sum(estimate_tokens(text) for _, _, text in sections)
+        warning = f"Prompt over budget ({total} > {config.prompt_token_budget} tokens): {', '.join(trimmed)}"
+        if _budget_warnings.get(user_id) != warning:
+            _budget_warnings[user_id] = warning
+            await add_log(user_id, "warn", warning)
+    else:
+        _budget_warnings.pop(user_id, None)
+    return "".join(parts)
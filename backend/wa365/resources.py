@@ -0,0 +1,106 @@
+"""Process-wide resources: the Mongo client, pooled HTTP clients, thread pools, in-memory caches
+and background tasks. Each is created on first use and all of them are released together when
+the app's lifespan ends, so a worker only opens what the routers it serves actually touch."""
+
+import asyncio, inspect, logging, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_TASK_GRACE_SECONDS = 5
+
+
+class Resources:
+    def __init__(self):
+        self.mongo: Optional[AsyncIOMotorClient] = None
+        self.database = None
+        self.http_clients: Dict[str, httpx.AsyncClient] = {}
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        self.caches: Dict[str, Any] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.shutdown_hooks: List[Callable] = []
+
+    def db(self):
+        """The Motor database; assign `database` to point every module at another one (benchmarks, load tests)."""
+        if self.database is None:
+            self.mongo = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+            self.database = self.mongo[os.environ['DB_NAME']]
+        return self.database
+
+    def http(self, name: str, timeout: float = 10.0) -> httpx.AsyncClient:
+        """One pooled client per upstream (Baileys, LLM providers); `timeout` applies when it is created."""
+        client = self.http_clients.get(name)
+        if client is None or client.is_closed:
+            client = self.http_clients[name] = httpx.AsyncClient(timeout=timeout)
+        return client
+
+    def executor(self, name: str, workers: int) -> ThreadPoolExecutor:
+        pool = self.executors.get(name)
+        if pool is None:
+            pool = self.executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return pool
+
+    def cache(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Register an in-memory cache. Shutdown empties it in place, so module-level references stay valid."""
+        return self.caches.setdefault(name, factory())
+
+    def spawn(self, name: str, coro: Coroutine) -> asyncio.Task:
+        """Start a named background task, or keep the one already running under that name."""
+        task = self.tasks.get(name)
+        if task is not None and not task.done():
+            coro.close()
+            return task
+        task = self.tasks[name] = asyncio.create_task(coro)
+        task.add_done_callback(lambda t: self.tasks.pop(name) if self.tasks.get(name) is t else None)
+        return task
+
+    def on_shutdown(self, hook: Callable):
+        """Run `hook` (plain or async) at shutdown, before tasks are cancelled and clients closed."""
+        self.shutdown_hooks.append(hook)
+
+    async def close(self):
+        hooks, self.shutdown_hooks = self.shutdown_hooks, []
+        for hook in hooks:
+            try:
+                result = hook()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Shutdown hook {getattr(hook, '__qualname__', hook)} failed: {e}")
+        tasks = list(self.tasks.values())
+        self.tasks.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=SHUTDOWN_TASK_GRACE_SECONDS)
+        for client in self.http_clients.values():
+            await client.aclose()
+        self.http_clients.clear()
+        for pool in self.executors.values():
+            pool.shutdown(wait=False)
+        self.executors.clear()
+        for cache in self.caches.values():
+            cache.clear()
+        if self.mongo is not None:
+            self.mongo.close()
+            self.mongo = self.database = None
+
+
+resources = Resources()
+
+
+class DatabaseProxy:
+    """The module-level `db` every service and router uses; resolves to resources.db() on each access."""
+
+    def __getattr__(self, attr):
+        return getattr(resources.db(), attr)
+
+    def __getitem__(self, name):
+        return resources.db()[name]
+
+
+db = DatabaseProxy()
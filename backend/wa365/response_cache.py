@@ -0,0 +1,111 @@
+"""Per-tenant LLM reply cache keyed by prompt version and normalized message."""
+
+import hashlib, os, re, time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from wa365.models import BotConfig
+from wa365.resources import resources
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '5000'))
+RESPONSE_CACHE_FUZZY_THRESHOLD = 0.8
+# Words a fuzzy match must share exactly: "sunday at 10" must not be answered from "saturday at 10"
+_EXACT_WORDS = frozenset((
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "today", "tonight", "tomorrow", "yesterday",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december",
+))
+
+# (user_id, prompt_version, normalized message) -> (reply, expires_at), oldest first
+_response_cache: "OrderedDict[tuple, tuple]" = resources.cache("response", OrderedDict)
+# (user_id, prompt_version) -> {normalized message: (words, exact words)}, the fuzzy tier's candidates
+_response_index: Dict[tuple, Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]] = resources.cache("response_index", dict)
+_response_cache_stats: Dict[str, Dict[str, int]] = resources.cache("response_stats", dict)
+
+def normalize_message(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def prompt_version(enriched_prompt: str) -> str:
+    return hashlib.sha1(enriched_prompt.encode("utf-8")).hexdigest()[:16]
+
+def _cache_stat(user_id: str, name: str):
+    stats = _response_cache_stats.setdefault(user_id, {"hits": 0, "fuzzy_hits": 0, "misses": 0})
+    stats[name] += 1
+
+def _message_words(normalized: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    words = frozenset(normalized.split())
+    return words, frozenset(w for w in words if w in _EXACT_WORDS or any(c.isdigit() for c in w))
+
+def _drop(key: tuple):
+    _response_cache.pop(key, None)
+    entries = _response_index.get(key[:2])
+    if entries is not None:
+        entries.pop(key[2], None)
+        if not entries:
+            del _response_index[key[:2]]
+
+def _fuzzy_lookup(user_id: str, version: str, normalized: str, now: float) -> Optional[tuple]:
+    words, exact = _message_words(normalized)
+    if not words:
+        return None
+    best, best_score = None, RESPONSE_CACHE_FUZZY_THRESHOLD
+    for cached_msg, (cached_words, cached_exact) in _response_index.get((user_id, version), {}).items():
+        if cached_exact != exact:
+            continue
+        key = (user_id, version, cached_msg)
+        if _response_cache[key][1] < now:
+            continue
+        score = len(words & cached_words) / len(words | cached_words)
+        if score >= best_score:
+            best, best_score = key, score
+    return best
+
+def response_cache_get(user_id: str, enriched_prompt: str, message: str, config: BotConfig) -> Optional[str]:
+    """Return a cached reply for this tenant, prompt and message, or None.
+
+    Keys include a hash of the compiled prompt, so any change to config, workflow or
+    knowledge that alters the prompt misses naturally; the fuzzy tier matches
+    messages by word overlap within the same prompt version, and only when they
+    carry the same numbers, dates and day names."""
+    if not config.response_cache_enabled:
+        return None
+    now = time.monotonic()
+    version = prompt_version(enriched_prompt)
+    key = (user_id, version, normalize_message(message))
+    entry = _response_cache.get(key)
+    if entry and entry[1] < now:
+        _drop(key)
+        entry = None
+    if entry:
+        _response_cache.move_to_end(key)
+        _cache_stat(user_id, "hits")
+        return entry[0]
+    if config.response_cache_fuzzy:
+        fuzzy_key = _fuzzy_lookup(user_id, version, key[2], now)
+        if fuzzy_key:
+            _response_cache.move_to_end(fuzzy_key)
+            _cache_stat(user_id, "fuzzy_hits")
+            return _response_cache[fuzzy_key][0]
+    _cache_stat(user_id, "misses")
+    return None
+
+def response_cache_put(user_id: str, enriched_prompt: str, message: str, reply: str, config: BotConfig):
+    if not config.response_cache_enabled or config.response_cache_ttl_seconds <= 0:
+        return
+    key = (user_id, prompt_version(enriched_prompt), normalize_message(message))
+    _response_cache[key] = (reply, time.monotonic() + config.response_cache_ttl_seconds)
+    _response_cache.move_to_end(key)
+    _response_index.setdefault(key[:2], {})[key[2]] = _message_words(key[2])
+    while len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        _drop(next(iter(_response_cache)))
+
+def response_cache_stats(user_id: str) -> Dict[str, Any]:
+    """The tenant's hit and miss counters, hit rate and number of cached replies in this worker."""
+    stats = _response_cache_stats.get(user_id, {"hits": 0, "fuzzy_hits": 0, "misses": 0})
+    lookups = stats["hits"] + stats["fuzzy_hits"] + stats["misses"]
+    entries = sum(len(msgs) for (uid, _), msgs in _response_index.items() if uid == user_id)
+    return {**stats, "hit_rate": round((stats["hits"] + stats["fuzzy_hits"]) / lookups, 4) if lookups else 0.0, "entries": entries}
+
+def invalidate_response_cache(user_id: str):
+    for uid, version in [k for k in _response_index if k[0] == user_id]:
+        for msg in _response_index.pop((uid, version)):
+            _response_cache.pop((uid, version, msg), None)
@@ -0,0 +1,27 @@
+"""Feature routers. Each module defines `router`, and optionally STARTUP (coroutine functions run
+when the app starts, once each however many features list them) and LAZY_MODULES (imports warmed
+in the background after startup).
+
+A worker serves the features named in APP_FEATURES, so e.g. APP_FEATURES=webhook runs message
+ingestion without importing the dashboard, Google or document-parsing code."""
+
+from typing import Iterable, Optional, Tuple, Union
+
+from wa365.settings import APP_FEATURES
+
+FEATURES = ("auth", "webhook", "wa", "conversations", "workflow", "actions", "config", "knowledge", "stats", "integrations", "chat_test", "admin")
+
+
+def resolve_features(features: Optional[Union[str, Iterable[str]]] = None) -> Tuple[str, ...]:
+    """Normalise a comma-separated string or list of feature names ("all" for every one) into FEATURES order."""
+    if features is None:
+        features = APP_FEATURES
+    if isinstance(features, str):
+        features = features.split(",")
+    names = {f.strip() for f in features if f.strip()}
+    if "all" in names:
+        return FEATURES
+    unknown = names - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown app features: {', '.join(sorted(unknown))} (choose from {', '.join(FEATURES)})")
+    return tuple(f for f in FEATURES if f in names)
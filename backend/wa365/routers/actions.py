@@ -0,0 +1,77 @@
+"""Bot actions (bookings) raised by the pipeline and the workflow: listing and admin review."""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from wa365 import outbound
+from wa365.auth import get_current_user
+from wa365.helpers import BULK_ACTION_CONCURRENCY, BULK_ACTION_LIMIT, action_message, add_log, get_bot_config
+from wa365.models import ActionBulkUpdateRequest, ActionUpdateRequest, User
+from wa365.outbound import enqueue_outbound
+from wa365.resources import db
+from wa365.timestamps import iso
+
+router = APIRouter()
+STARTUP = (outbound.start,)
+
+@router.get("/actions")
+async def get_actions(status: Optional[str] = None, user: User = Depends(get_current_user)):
+    query = {"user_id": user.user_id}
+    if status:
+        query["status"] = status
+    actions = await db.bot_actions.find(query, {"_id": 0}).sort("created_at", -1).to_list(200)
+    for action in actions:
+        action["created_at"] = iso(action.get("created_at"))
+        action["updated_at"] = iso(action.get("updated_at"))
+    return actions
+
+@router.patch("/actions/bulk")
+async def bulk_update_actions(req: ActionBulkUpdateRequest, user: User = Depends(get_current_user)):
+    action_ids = list(dict.fromkeys(req.action_ids))
+    if len(action_ids) > BULK_ACTION_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_ACTION_LIMIT} actions per request")
+    actions = await db.bot_actions.find({"user_id": user.user_id, "action_id": {"$in": action_ids}}, {"_id": 0}).to_list(len(action_ids))
+    found = {a["action_id"]: a for a in actions}
+    if found:
+        now = datetime.now(timezone.utc)
+        await db.bot_actions.update_many(
+            {"user_id": user.user_id, "action_id": {"$in": list(found)}},
+            {"$set": {"status": req.status, "admin_note": req.admin_note, "updated_at": now}},
+        )
+    config = await get_bot_config(user.user_id)
+    enqueueing = asyncio.Semaphore(BULK_ACTION_CONCURRENCY)
+
+    async def notify(action_id: str) -> Dict[str, Any]:
+        action = found.get(action_id)
+        if not action:
+            return {"action_id": action_id, "ok": False, "error": "Action not found"}
+        message = action_message(action, req.status, req.admin_note, config)
+        if not message:
+            return {"action_id": action_id, "ok": True, "status": req.status, "delivery_id": None}
+        async with enqueueing:
+            delivery = await enqueue_outbound(user.user_id, action["jid"], message, "action", f"action:{action_id}:{req.status}")
+        return {"action_id": action_id, "ok": True, "status": req.status, "delivery_id": delivery["id"], "delivery_status": delivery["status"]}
+
+    results = await asyncio.gather(*(notify(a) for a in action_ids))
+    queued = sum(1 for r in results if r.get("delivery_id"))
+    await add_log(user.user_id, "info", f"Bulk {req.status}: {len(found)} actions updated, {queued} notifications queued")
+    return {"ok": True, "updated": len(found), "queued": queued, "results": results}
+
+@router.patch("/actions/{action_id}")
+async def update_action(action_id: str, req: ActionUpdateRequest, user: User = Depends(get_current_user)):
+    action = await db.bot_actions.find_one({"action_id": action_id, "user_id": user.user_id}, {"_id": 0})
+    if not action:
+        raise HTTPException(status_code=404, detail="Action not found")
+    now = datetime.now(timezone.utc)
+    await db.bot_actions.update_one({"action_id": action_id}, {"$set": {"status": req.status, "admin_note": req.admin_note, "updated_at": now}})
+    # Approved and rejected actions notify the client on WhatsApp
+    message = action_message(action, req.status, req.admin_note, await get_bot_config(user.user_id))
+    delivery = await enqueue_outbound(user.user_id, action["jid"], message, "action", f"action:{action_id}:{req.status}") if message else None
+    if req.status == "approved":
+        await add_log(user.user_id, "info", f"Action {action_id[:8]} approved, confirmation queued for {action['push_name']}")
+    elif req.status == "rejected":
+        await add_log(user.user_id, "info", f"Action {action_id[:8]} rejected")
+    return {"ok": True, "status": req.status, "delivery_id": delivery["id"] if delivery else None}
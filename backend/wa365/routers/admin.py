@@ -0,0 +1,43 @@
+"""Operator diagnostics: on-demand profiles, slow requests and event-loop stalls."""
+
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from wa365.auth import require_admin
+from wa365.helpers import add_log
+from wa365.models import User
+from wa365.profiling import PROFILE_MAX_SECONDS, SLOW_REQUEST_MS, profile_running, recent_slow_requests, run_profile
+from wa365.watchdog import LOOP_DEBUG_SLOW_MS, loop_lag_summary, loop_stall_threshold_ms, recent_loop_stalls
+
+router = APIRouter()
+
+@router.get("/admin/profile")
+async def profile_backend(seconds: float = 10, interval_ms: int = 5, format: str = "collapsed", all_threads: bool = False, include_idle: bool = False, user: User = Depends(require_admin)):
+    """Sample the running worker for `seconds` and return collapsed stacks (for flamegraph.pl / speedscope) or speedscope JSON.
+
+    Only the event-loop thread is sampled unless all_threads is set; idle samples (the loop waiting in select) are dropped unless include_idle."""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be collapsed or speedscope")
+    if profile_running():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    profiler = await run_profile(seconds, max(interval_ms, 1) / 1000, None if all_threads else {threading.get_ident()})
+    await add_log(user.user_id, "info", f"Backend profiled for {seconds:g}s")
+    if format == "speedscope":
+        return profiler.speedscope(include_idle)
+    return Response(profiler.collapsed(include_idle), media_type="text/plain")
+
+@router.get("/admin/loop-stalls")
+async def list_loop_stalls(user: User = Depends(require_admin)):
+    """Event-loop lag percentiles and the most recent stalls, newest first, with the stack that held the loop."""
+    return {
+        "threshold_ms": loop_stall_threshold_ms(), "debug": LOOP_DEBUG_SLOW_MS > 0,
+        "lag_ms": loop_lag_summary(), "stalls": recent_loop_stalls(),
+    }
+
+@router.get("/admin/slow-requests")
+async def list_slow_requests(user: User = Depends(require_admin)):
+    """Most recent requests over SLOW_REQUEST_MS, newest first, with the stacks sampled while they ran."""
+    return {"threshold_ms": SLOW_REQUEST_MS, "requests": recent_slow_requests()}
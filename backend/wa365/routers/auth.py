@@ -0,0 +1,118 @@
+"""Dashboard login, Google session exchange and logout."""
+
+import asyncio, uuid
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from wa365.auth import get_current_user
+from wa365.models import User
+from wa365.resources import db
+from wa365.settings import ADMIN_PASSWORD, ADMIN_USERNAME
+
+router = APIRouter()
+LAZY_MODULES = ("bcrypt",)
+
+@router.post("/auth/login")
+async def login(request: Request, response: Response):
+    body = await request.json()
+    username = body.get("username")
+    password = body.get("password")
+    
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="Username and password required")
+    
+    # Verify credentials
+    if username != ADMIN_USERNAME:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Check if password matches (hash or plain)
+    password_valid = False
+    if ADMIN_PASSWORD:
+        # Check if it's a bcrypt hash (starts with $2a$, $2b$, or $2y$)
+        if ADMIN_PASSWORD.startswith(('$2a$', '$2b$', '$2y$')):
+            import bcrypt
+            try:
+                password_valid = await asyncio.to_thread(bcrypt.checkpw, password.encode('utf-8'), ADMIN_PASSWORD.encode('utf-8'))
+            except Exception:
+                password_valid = False
+        else:
+            # Plain text comparison (development only)
+            password_valid = (password == ADMIN_PASSWORD)
+    else:
+        raise HTTPException(status_code=500, detail="Admin password not configured")
+    
+    if not password_valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Get or create admin user
+    user_id = "admin"
+    user_email = f"{ADMIN_USERNAME}@admin.local"
+    user_name = "Admin"
+    
+    existing = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    if not existing:
+        await db.users.insert_one({
+            "user_id": user_id, 
+            "email": user_email, 
+            "name": user_name, 
+            "picture": None, 
+            "created_at": datetime.now(timezone.utc)
+        })
+    
+    # Create session
+    session_token = str(uuid.uuid4())
+    from datetime import timedelta
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    await db.user_sessions.insert_one({
+        "user_id": user_id, 
+        "session_token": session_token, 
+        "expires_at": expires_at,
+        "created_at": datetime.now(timezone.utc)
+    })
+    
+    response.set_cookie("session_token", session_token, httponly=True, secure=False, samesite="lax", path="/", max_age=604800)
+    return {"user_id": user_id, "email": user_email, "name": user_name, "picture": None}
+
+@router.post("/auth/session")
+async def create_session(request: Request, response: Response):
+    body = await request.json()
+    session_id = body.get("session_id")
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id required")
+    async with httpx.AsyncClient(timeout=10) as c:
+        resp = await c.get(
+            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+            headers={"X-Session-ID": session_id}
+        )
+    if resp.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session_id")
+    data = resp.json()
+    email = data["email"]
+    existing = await db.users.find_one({"email": email}, {"_id": 0})
+    if existing:
+        user_id = existing["user_id"]
+        await db.users.update_one({"email": email}, {"$set": {"name": data.get("name", ""), "picture": data.get("picture", "")}})
+    else:
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        await db.users.insert_one({"user_id": user_id, "email": email, "name": data.get("name", ""), "picture": data.get("picture", ""), "created_at": datetime.now(timezone.utc)})
+    session_token = data["session_token"]
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=timezone.utc)
+    from datetime import timedelta
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    await db.user_sessions.insert_one({"user_id": user_id, "session_token": session_token, "expires_at": expires_at, "created_at": datetime.now(timezone.utc)})
+    response.set_cookie("session_token", session_token, httponly=True, secure=True, samesite="none", path="/", max_age=604800)
+    return {"user_id": user_id, "email": email, "name": data.get("name",""), "picture": data.get("picture","")}
+
+@router.get("/auth/me")
+async def get_me(user: User = Depends(get_current_user)):
+    return user
+
+@router.post("/auth/logout")
+async def logout(request: Request, response: Response):
+    token = request.cookies.get("session_token")
+    if token:
+        await db.user_sessions.delete_one({"session_token": token})
+    response.delete_cookie("session_token", path="/", samesite="none", secure=True)
+    return {"ok": True}
@@ -0,0 +1,116 @@
+"""Chat test: try the bot from the dashboard without WhatsApp, optionally streamed."""
+
+import time, uuid
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from wa365.auth import get_current_user
+from wa365.helpers import TEST_JID, add_log, detect_booking, get_bot_config, sse_event
+from wa365 import message_store
+from wa365.llm import llm_stream
+from wa365.message_store import message_history, message_query, store_message
+from wa365.models import ChatTestRequest, User
+from wa365.pipeline import generate_reply
+from wa365.prompt import build_enriched_prompt, estimate_tokens
+from wa365.resources import db
+from wa365.response_cache import response_cache_get, response_cache_put
+from wa365.workflow import get_workflow_graph, workflow_turn
+
+router = APIRouter()
+STARTUP = (message_store.start,)
+LAZY_MODULES = ("google.genai",)
+
+async def test_workflow_turn(user_id: str, text: str) -> Optional[Dict[str, Any]]:
+    return await workflow_turn(user_id, TEST_JID, text, await get_workflow_graph(user_id))
+
+@router.post("/chat-test")
+async def chat_test(req: ChatTestRequest, user: User = Depends(get_current_user)):
+    user_id = user.user_id
+    config = await get_bot_config(user_id)
+
+    await store_message(user_id, TEST_JID, "user", req.message)
+
+    booking = detect_booking(req.message, config.booking_types)
+    if booking:
+        reply = f"[BOOKING DETECTED: {booking.name}]\n\n{booking.confirmation_message}\n\nRef: {uuid.uuid4().hex[:8].upper()} (simulated)"
+        booking_detected = True
+        usage = {}
+    elif (step := await test_workflow_turn(user_id, req.message)) and step["reply"]:
+        reply, usage, booking_detected = step["reply"], {}, False
+    else:
+        enriched_prompt = await build_enriched_prompt(config, user_id) + ((step["hint"] or "") if step else "")
+        reply, usage = await generate_reply(enriched_prompt, req.message, user_id, config, "Chat test LLM error")
+        booking_detected = False
+
+    await store_message(user_id, TEST_JID, "assistant", reply, **usage)
+    return {"reply": reply, "booking_detected": booking_detected}
+
+@router.post("/chat-test/stream")
+async def chat_test_stream(req: ChatTestRequest, user: User = Depends(get_current_user)):
+    """Server-sent events variant of /chat-test: `token` events carry text as it is
+    generated, a final `done` event carries the reply, time-to-first-token and total latency."""
+    user_id = user.user_id
+    started = time.perf_counter()
+    config = await get_bot_config(user_id)
+    await store_message(user_id, TEST_JID, "user", req.message)
+
+    booking = detect_booking(req.message, config.booking_types)
+    step = None if booking else await test_workflow_turn(user_id, req.message)
+    scripted = step["reply"] if step else None
+    enriched_prompt = None if booking or scripted else await build_enriched_prompt(config, user_id) + ((step["hint"] or "") if step else "")
+
+    async def events():
+        ttft_ms = None
+        cached = False
+        if booking:
+            chunks = [f"[BOOKING DETECTED: {booking.name}]\n\n{booking.confirmation_message}\n\nRef: {uuid.uuid4().hex[:8].upper()} (simulated)"]
+            source = None
+        elif scripted:
+            chunks = [scripted]
+            source = None
+        else:
+            hit = response_cache_get(user_id, enriched_prompt, req.message, config)
+            cached = hit is not None
+            chunks = [hit] if cached else []
+            prompt = f"{enriched_prompt}\n\nUser message: {req.message}"
+            source = None if cached else llm_stream(prompt, user_id, config)
+        parts = []
+        for chunk in chunks:
+            ttft_ms = round((time.perf_counter() - started) * 1000)
+            parts.append(chunk)
+            yield sse_event("token", {"text": chunk})
+        if source:
+            try:
+                async for chunk in source:
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - started) * 1000)
+                    parts.append(chunk)
+                    yield sse_event("token", {"text": chunk})
+            except Exception as e:
+                await add_log(user_id, "error", f"Chat test LLM error: {str(e)}")
+                if not parts:
+                    parts.append(config.fallback_message)
+                    yield sse_event("token", {"text": config.fallback_message})
+                source = None
+        reply = "".join(parts)
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached": True} if cached else {}
+        if source and reply:
+            response_cache_put(user_id, enriched_prompt, req.message, reply, config)
+            usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(reply)}
+        total_ms = round((time.perf_counter() - started) * 1000)
+        await store_message(user_id, TEST_JID, "assistant", reply, ttft_ms=ttft_ms, latency_ms=total_ms, **usage)
+        yield sse_event("done", {"reply": reply, "booking_detected": bool(booking), "cached": cached, "ttft_ms": ttft_ms, "latency_ms": total_ms})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/chat-test/messages")
+async def get_test_messages(user: User = Depends(get_current_user)):
+    return await message_history(user.user_id, TEST_JID, 200)
+
+@router.delete("/chat-test/messages")
+async def clear_test_messages(user: User = Depends(get_current_user)):
+    await db.messages.delete_many(message_query(user.user_id, TEST_JID))
+    await db.conversations.delete_one({"user_id": user.user_id, "jid": TEST_JID})
+    return {"ok": True}
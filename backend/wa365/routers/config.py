@@ -0,0 +1,65 @@
+"""Bot configuration, the tenant's Gemini key and the AI on/off switch."""
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+from wa365.auth import get_current_user
+from wa365.helpers import add_log, forget_bot_config, get_bot_config
+from wa365.models import BotConfig, User
+from wa365.resources import db
+from wa365.response_cache import invalidate_response_cache
+
+router = APIRouter()
+
+# ─── CONFIG ───────────────────────────────────────────────
+
+@router.get("/config")
+async def get_config(user: User = Depends(get_current_user)):
+    return await get_bot_config(user.user_id)
+
+@router.post("/config")
+async def save_config(config: BotConfig, user: User = Depends(get_current_user)):
+    config.updated_at = datetime.now(timezone.utc)
+    doc = {**config.model_dump(), "user_id": user.user_id}
+    await db.bot_config.replace_one({"user_id": user.user_id}, doc, upsert=True)
+    forget_bot_config(user.user_id)
+    invalidate_response_cache(user.user_id)
+    await add_log(user.user_id, "info", "Bot configuration updated")
+    return {"ok": True}
+
+# ─── GEMINI API KEY ──────────────────────────────────────────
+
+class GeminiKeyRequest(BaseModel):
+    api_key: str
+
+@router.get("/config/gemini")
+async def get_gemini_key(user: User = Depends(get_current_user)):
+    doc = await db.bot_config.find_one({"user_id": user.user_id}, {"_id": 0, "gemini_api_key": 1})
+    return {"api_key": doc.get("gemini_api_key", "") if doc else ""}
+
+@router.post("/config/gemini")
+async def save_gemini_key(req: GeminiKeyRequest, user: User = Depends(get_current_user)):
+    await db.bot_config.update_one(
+        {"user_id": user.user_id},
+        {"$set": {"gemini_api_key": req.api_key, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    await add_log(user.user_id, "info", "Gemini API key updated")
+    return {"ok": True}
+
+# ─── AI TOGGLE ────────────────────────────────────────────
+
+@router.post("/ai/toggle")
+async def toggle_ai(user: User = Depends(get_current_user)):
+    config = await get_bot_config(user.user_id)
+    new_state = not config.ai_enabled
+    await db.bot_config.update_one(
+        {"user_id": user.user_id},
+        {"$set": {"ai_enabled": new_state, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    forget_bot_config(user.user_id)
+    await add_log(user.user_id, "info", f"AI {'activated' if new_state else 'paused'} by admin")
+    return {"ai_enabled": new_state}
@@ -0,0 +1,46 @@
+"""Conversation list, message history and agent takeover."""
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+
+from wa365 import message_store, takeover
+from wa365.auth import get_current_user
+from wa365.helpers import TEST_JID, add_log, get_bot_config
+from wa365.message_store import message_history
+from wa365.models import ConversationModel, TakeoverRequest, User
+from wa365.resources import db
+from wa365.takeover import takeover_holder, write_takeover
+from wa365.timestamps import iso
+
+router = APIRouter()
+STARTUP = (takeover.start, message_store.start, message_store.start_archive)
+
+# ─── CONVERSATIONS ─────────────────────────────────────────
+
+@router.get("/conversations", response_model=List[ConversationModel])
+async def get_conversations(user: User = Depends(get_current_user)):
+    convs = await db.conversations.find({"user_id": user.user_id, "jid": {"$ne": TEST_JID}}, {"_id": 0}).sort("last_timestamp", -1).to_list(100)
+    return [ConversationModel(id=c["jid"], jid=c["jid"], push_name=c.get("push_name", c["jid"].split("@")[0]), last_message=c.get("last_message", ""), last_timestamp=iso(c.get("last_timestamp")), message_count=c.get("message_count", 0), taken_over=c.get("taken_over", False), takeover_by=c.get("takeover_by")) for c in convs]
+
+@router.get("/messages/{jid}")
+async def get_messages(jid: str, user: User = Depends(get_current_user)):
+    decoded_jid = jid.replace("%40", "@")
+    return await message_history(user.user_id, decoded_jid, 500)
+
+# ─── TAKEOVER ─────────────────────────────────────────────
+
+@router.post("/conversations/{jid_encoded}/takeover")
+async def set_takeover(jid_encoded: str, req: TakeoverRequest, user: User = Depends(get_current_user)):
+    jid = jid_encoded.replace("%40", "@")
+    await write_takeover(user.user_id, jid, req.active, user.email)
+    action = "taken over" if req.active else "released"
+    await add_log(user.user_id, "info", f"Conversation {jid.split('@')[0]} {action} by {user.name}")
+    return {"ok": True, "taken_over": req.active}
+
+@router.get("/conversations/{jid_encoded}/takeover")
+async def get_takeover(jid_encoded: str, user: User = Depends(get_current_user)):
+    jid = jid_encoded.replace("%40", "@")
+    config = await get_bot_config(user.user_id)
+    entry = await takeover_holder(user.user_id, jid, config.takeover_idle_minutes)
+    return {"taken_over": entry is not None, "takeover_by": entry["by"] if entry else None}
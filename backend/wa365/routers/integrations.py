@@ -0,0 +1,160 @@
+"""Gmail and Google Sheets: OAuth connection, sending, spreadsheet access and the actions export binding."""
+
+import base64, email as email_lib, os, warnings
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import RedirectResponse
+
+from wa365 import actions_export
+from wa365.actions_export import EXPORT_EPOCH, prepare_actions_export_sheet
+from wa365.auth import get_current_user
+from wa365.google_api import GMAIL_SCOPES, GOOGLE_API_ENDPOINT, GOOGLE_TOKEN_URI, forget_google_client, google_execute, google_service, run_google
+from wa365.helpers import add_log
+from wa365.models import ActionsExportRequest, AppendSheetRequest, CreateSheetRequest, GmailCredentials, ReadSheetRequest, SendEmailRequest, User
+from wa365.resources import db
+from wa365.timestamps import iso
+
+router = APIRouter()
+STARTUP = (actions_export.start,)
+LAZY_MODULES = (
+    "google_auth_oauthlib.flow", "google.oauth2.credentials", "google.auth.transport.requests",
+    "googleapiclient.discovery", "googleapiclient.http", "google_auth_httplib2",
+)
+
+@router.get("/integrations/gmail/status")
+async def gmail_status(user: User = Depends(get_current_user)):
+    doc = await db.google_tokens.find_one({"user_id": user.user_id}, {"_id": 0})
+    if doc and doc.get("access_token"):
+        return {"connected": True, "email": doc.get("gmail_email", user.email)}
+    return {"connected": False}
+
+@router.post("/integrations/gmail/connect")
+async def gmail_connect_start(req: GmailCredentials, user: User = Depends(get_current_user)):
+    await db.google_tokens.update_one(
+        {"user_id": user.user_id},
+        {"$set": {"user_id": user.user_id, "client_id": req.client_id, "client_secret": req.client_secret}},
+        upsert=True,
+    )
+    backend_url = os.environ.get("REACT_APP_BACKEND_URL", "")
+    if not backend_url:
+        import httpx as _httpx
+    redirect_uri = f"{backend_url}/api/integrations/gmail/callback"
+    from google_auth_oauthlib.flow import Flow
+    flow = Flow.from_client_config(
+        {"web": {"client_id": req.client_id, "client_secret": req.client_secret, "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": GOOGLE_TOKEN_URI}},
+        scopes=GMAIL_SCOPES,
+        redirect_uri=redirect_uri,
+    )
+    url, state = flow.authorization_url(access_type="offline", prompt="consent", state=user.user_id)
+    return {"auth_url": url}
+
+@router.get("/integrations/gmail/callback")
+async def gmail_callback(code: str, state: str):
+    user_id = state
+    doc = await db.google_tokens.find_one({"user_id": user_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=400, detail="No credentials found")
+    backend_url = os.environ.get("REACT_APP_BACKEND_URL", "")
+    redirect_uri = f"{backend_url}/api/integrations/gmail/callback"
+    from google_auth_oauthlib.flow import Flow
+    from googleapiclient.discovery import build
+    flow = Flow.from_client_config(
+        {"web": {"client_id": doc["client_id"], "client_secret": doc["client_secret"], "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": GOOGLE_TOKEN_URI}},
+        scopes=GMAIL_SCOPES,
+        redirect_uri=redirect_uri,
+    )
+
+    def fetch_token():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            flow.fetch_token(code=code)
+
+    await run_google(fetch_token)
+    creds = flow.credentials
+    client_options = {"api_endpoint": GOOGLE_API_ENDPOINT} if GOOGLE_API_ENDPOINT else None
+    info = await run_google(lambda: build("oauth2", "v2", credentials=creds, client_options=client_options, cache_discovery=False).userinfo().get().execute())
+    await db.google_tokens.update_one(
+        {"user_id": user_id},
+        {"$set": {"access_token": creds.token, "refresh_token": creds.refresh_token, "expires_at": creds.expiry.replace(tzinfo=timezone.utc) if creds.expiry else None, "gmail_email": info.get("email", "")}},
+    )
+    forget_google_client(user_id)
+    return RedirectResponse(url="/#integrations?connected=true")
+
+@router.post("/integrations/gmail/disconnect")
+async def gmail_disconnect(user: User = Depends(get_current_user)):
+    await db.google_tokens.delete_one({"user_id": user.user_id})
+    forget_google_client(user.user_id)
+    return {"ok": True}
+
+@router.post("/integrations/gmail/send")
+async def send_gmail(req: SendEmailRequest, user: User = Depends(get_current_user)):
+    service = await google_service(user.user_id, "gmail", "v1")
+    message = email_lib.mime.text.MIMEText(req.body)
+    message["to"] = req.to
+    message["subject"] = req.subject
+    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+    await google_execute(service.users().messages().send(userId="me", body={"raw": raw}))
+    await add_log(user.user_id, "info", f"Email sent to {req.to}: {req.subject}")
+    return {"ok": True}
+
+@router.post("/integrations/sheets/create")
+async def create_sheet(req: CreateSheetRequest, user: User = Depends(get_current_user)):
+    service = await google_service(user.user_id, "sheets", "v4")
+    spreadsheet = await google_execute(service.spreadsheets().create(body={"properties": {"title": req.title}}))
+    sheet_id = spreadsheet["spreadsheetId"]
+    sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}"
+    await db.user_sheets.insert_one({"user_id": user.user_id, "spreadsheet_id": sheet_id, "title": req.title, "mode": req.mode, "url": sheet_url, "created_at": datetime.now(timezone.utc)})
+    await add_log(user.user_id, "info", f"Spreadsheet created: {req.title}")
+    return {"spreadsheet_id": sheet_id, "title": req.title, "url": sheet_url, "mode": req.mode}
+
+@router.get("/integrations/sheets")
+async def list_sheets(user: User = Depends(get_current_user)):
+    sheets = await db.user_sheets.find({"user_id": user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
+    for sheet in sheets:
+        for field in ("created_at", "export_last_run", "export_lease_until"):
+            if field in sheet:
+                sheet[field] = iso(sheet[field]) or None
+        if sheet.get("export_hwm"):
+            sheet["export_hwm"] = {"updated_at": iso(sheet["export_hwm"].get("updated_at")), "action_id": sheet["export_hwm"].get("action_id", "")}
+    return sheets
+
+@router.delete("/integrations/sheets/{sheet_id}")
+async def delete_sheet_record(sheet_id: str, user: User = Depends(get_current_user)):
+    await db.user_sheets.delete_one({"user_id": user.user_id, "spreadsheet_id": sheet_id})
+    return {"ok": True}
+
+@router.post("/integrations/sheets/append")
+async def append_to_sheet(req: AppendSheetRequest, user: User = Depends(get_current_user)):
+    service = await google_service(user.user_id, "sheets", "v4")
+    await google_execute(service.spreadsheets().values().append(
+        spreadsheetId=req.spreadsheet_id,
+        range=req.sheet_name,
+        valueInputOption="USER_ENTERED",
+        body={"values": req.values},
+    ))
+    return {"ok": True}
+
+@router.post("/integrations/sheets/read")
+async def read_sheet(req: ReadSheetRequest, user: User = Depends(get_current_user)):
+    service = await google_service(user.user_id, "sheets", "v4")
+    result = await google_execute(service.spreadsheets().values().get(spreadsheetId=req.spreadsheet_id, range=req.range))
+    return {"values": result.get("values", [])}
+
+@router.post("/integrations/sheets/{sheet_id}/export-actions")
+async def set_actions_export(sheet_id: str, req: ActionsExportRequest, user: User = Depends(get_current_user)):
+    sheet = await db.user_sheets.find_one({"user_id": user.user_id, "spreadsheet_id": sheet_id}, {"_id": 0})
+    if not sheet:
+        raise HTTPException(status_code=404, detail="Spreadsheet not found")
+    update: Dict[str, Any] = {"export_actions": req.enabled, "export_error": None}
+    if req.enabled:
+        if sheet.get("mode") == "read":
+            raise HTTPException(status_code=400, detail="Spreadsheet is read only")
+        await prepare_actions_export_sheet(user.user_id, sheet_id)
+        if not sheet.get("export_hwm"):
+            # Without a backfill only changes from now on are exported
+            update["export_hwm"] = {"updated_at": EXPORT_EPOCH if req.backfill else datetime.now(timezone.utc), "action_id": ""}
+    await db.user_sheets.update_one({"user_id": user.user_id, "spreadsheet_id": sheet_id}, {"$set": update})
+    await add_log(user.user_id, "info", f"Bot actions export to {sheet['title']} {'enabled' if req.enabled else 'disabled'}")
+    return {"ok": True, "export_actions": req.enabled}
@@ -0,0 +1,70 @@
+"""Knowledge base documents: upload with text extraction, listing and toggling."""
+
+import asyncio, uuid
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+
+from wa365.auth import get_current_user
+from wa365.helpers import add_log
+from wa365.knowledge import extract_text_from_docx, extract_text_from_pdf, extract_text_from_txt
+from wa365.models import KnowledgeDoc, User
+from wa365.resources import db
+from wa365.response_cache import invalidate_response_cache
+from wa365.timestamps import iso
+
+router = APIRouter()
+LAZY_MODULES = ("pdfplumber", "docx")
+
+@router.post("/knowledge/upload")
+async def upload_knowledge_doc(file: UploadFile = File(...), user: User = Depends(get_current_user)):
+    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
+    if ext not in ("pdf", "docx", "txt", "md"):
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: .{ext}")
+    data = await file.read()
+    if len(data) > 10 * 1024 * 1024:
+        raise HTTPException(status_code=400, detail="File too large. Max 10 MB.")
+    try:
+        extract = extract_text_from_pdf if ext == "pdf" else extract_text_from_docx if ext == "docx" else extract_text_from_txt
+        content = await asyncio.to_thread(extract, data)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Failed to extract text: {e}")
+    if not content.strip():
+        raise HTTPException(status_code=422, detail="No readable text found.")
+    doc_id = str(uuid.uuid4())
+    doc = {"id": doc_id, "user_id": user.user_id, "filename": file.filename, "file_type": ext, "size_bytes": len(data), "char_count": len(content), "content": content, "enabled": True, "uploaded_at": datetime.now(timezone.utc)}
+    await db.knowledge_docs.insert_one(doc)
+    invalidate_response_cache(user.user_id)
+    await add_log(user.user_id, "info", f"Knowledge doc uploaded: {file.filename}")
+    return {"id": doc_id, "filename": file.filename, "file_type": ext, "size_bytes": len(data), "char_count": len(content), "enabled": True, "uploaded_at": iso(doc["uploaded_at"])}
+
+@router.get("/knowledge", response_model=List[KnowledgeDoc])
+async def list_knowledge_docs(user: User = Depends(get_current_user)):
+    docs = await db.knowledge_docs.find({"user_id": user.user_id}, {"_id": 0, "content": 0}).sort("uploaded_at", -1).to_list(100)
+    return docs
+
+@router.patch("/knowledge/{doc_id}/toggle")
+async def toggle_knowledge_doc(doc_id: str, user: User = Depends(get_current_user)):
+    doc = await db.knowledge_docs.find_one({"id": doc_id, "user_id": user.user_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Not found")
+    new_state = not doc.get("enabled", True)
+    await db.knowledge_docs.update_one({"id": doc_id}, {"$set": {"enabled": new_state}})
+    invalidate_response_cache(user.user_id)
+    return {"id": doc_id, "enabled": new_state}
+
+@router.delete("/knowledge/{doc_id}")
+async def delete_knowledge_doc(doc_id: str, user: User = Depends(get_current_user)):
+    result = await db.knowledge_docs.delete_one({"id": doc_id, "user_id": user.user_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Not found")
+    invalidate_response_cache(user.user_id)
+    return {"ok": True}
+
+@router.get("/knowledge/{doc_id}/preview")
+async def preview_knowledge_doc(doc_id: str, user: User = Depends(get_current_user)):
+    doc = await db.knowledge_docs.find_one({"id": doc_id, "user_id": user.user_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"id": doc_id, "filename": doc["filename"], "preview": doc.get("content", "")[:3000]}
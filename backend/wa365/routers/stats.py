@@ -0,0 +1,89 @@
+"""Logs, usage statistics and the response cache and LLM route counters."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends
+
+from wa365 import message_store
+from wa365.auth import get_current_user
+from wa365.baileys import baileys_http
+from wa365.helpers import get_bot_config
+from wa365.llm import llm_route_stats, llm_routes
+from wa365.message_store import archived_counts, message_exists, message_field, message_query
+from wa365.models import User
+from wa365.resources import db
+from wa365.response_cache import invalidate_response_cache, response_cache_stats
+from wa365.settings import BAILEYS_URL
+from wa365.timestamps import iso
+
+router = APIRouter()
+STARTUP = (message_store.start,)
+
+# ─── LOGS ─────────────────────────────────────────────────
+
+def merge_logs(backend_logs: List[Dict], baileys_logs: List[Dict], limit: int) -> List[Dict]:
+    """Newest-first union of the backend and Baileys logs."""
+    all_logs = backend_logs + baileys_logs
+    all_logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    return all_logs[:limit]
+
+@router.get("/logs")
+async def get_logs(limit: int = 100, user: User = Depends(get_current_user)):
+    backend_logs = await db.logs.find({"user_id": user.user_id}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+    for log in backend_logs:
+        log["timestamp"] = iso(log.get("timestamp"))
+    baileys_logs = []
+    try:
+        resp = await baileys_http().get(f"{BAILEYS_URL}/logs", params={"user_id": user.user_id}, timeout=5.0)
+        baileys_logs = resp.json().get("logs", [])
+    except Exception:
+        pass
+    return merge_logs(backend_logs, baileys_logs, limit)
+
+@router.delete("/logs")
+async def clear_logs(user: User = Depends(get_current_user)):
+    await db.logs.delete_many({"user_id": user.user_id})
+    return {"ok": True}
+
+# ─── STATS ────────────────────────────────────────────────
+
+@router.get("/stats")
+async def get_stats(user: User = Depends(get_current_user)):
+    total_convs = await db.conversations.count_documents({"user_id": user.user_id})
+    archived = await archived_counts(user.user_id)
+    total_msgs = await db.messages.count_documents(message_query(user.user_id)) + archived["total"]
+    user_msgs = await db.messages.count_documents(message_query(user.user_id, role="user")) + archived["user"]
+    bot_msgs = await db.messages.count_documents(message_query(user.user_id, role="assistant")) + archived["assistant"]
+    pending_actions = await db.bot_actions.count_documents({"user_id": user.user_id, "status": "pending"})
+    config = await get_bot_config(user.user_id)
+    return {"total_conversations": total_convs, "total_messages": total_msgs, "user_messages": user_msgs, "bot_messages": bot_msgs, "pending_actions": pending_actions, "ai_enabled": config.ai_enabled}
+
+@router.get("/stats/cache")
+async def get_cache_stats(user: User = Depends(get_current_user)):
+    return response_cache_stats(user.user_id)
+
+@router.get("/stats/tokens")
+async def get_token_stats(days: int = 30, user: User = Depends(get_current_user)):
+    """Token usage of replies still in Mongo; archived messages are not counted."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    prompt_tokens, cached = message_field("prompt_tokens"), message_field("cached")
+    pipeline = [
+        {"$match": {"$and": [message_query(user.user_id, role="assistant", since=since), message_exists("prompt_tokens")]}},
+        {"$group": {"_id": None, "replies": {"$sum": 1}, "cached_replies": {"$sum": {"$cond": [{"$eq": [cached, True]}, 1, 0]}}, "prompt_tokens": {"$sum": prompt_tokens}, "completion_tokens": {"$sum": message_field("completion_tokens")}, "max_prompt_tokens": {"$max": prompt_tokens}}},
+    ]
+    rows = await db.messages.aggregate(pipeline).to_list(1)
+    totals = rows[0] if rows else {"replies": 0, "cached_replies": 0, "prompt_tokens": 0, "completion_tokens": 0, "max_prompt_tokens": 0}
+    totals.pop("_id", None)
+    return {"days": days, "prompt_token_budget": (await get_bot_config(user.user_id)).prompt_token_budget, **totals}
+
+@router.get("/stats/llm")
+async def get_llm_stats(user: User = Depends(get_current_user)):
+    config = await get_bot_config(user.user_id)
+    routes = llm_routes(config)
+    return {"routes": [f"{p}:{m}" for p, m in routes], "route_stats": llm_route_stats(routes)}
+
+@router.delete("/stats/cache")
+async def clear_response_cache(user: User = Depends(get_current_user)):
+    invalidate_response_cache(user.user_id)
+    return {"ok": True}
@@ -0,0 +1,157 @@
+"""Dashboard WhatsApp routes: connection status, manual sends, the outbound queue and broadcasts."""
+
+import asyncio, uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from wa365 import broadcasts, outbound, takeover
+from wa365.auth import get_current_user
+from wa365.baileys import WA_STATUS_HEARTBEAT_SECONDS, baileys_http, set_wa_status, subscribe_wa_status, unsubscribe_wa_status, wa_status
+from wa365.broadcasts import BROADCAST_MAX_RECIPIENTS, broadcast_progress, broadcast_view, cancel_local_broadcast, resolve_broadcast_recipients, start_broadcast
+from wa365.helpers import add_log, sse_event
+from wa365.models import BroadcastRequest, SendMessageRequest, User
+from wa365.outbound import enqueue_outbound, outbound_view, schedule_outbound
+from wa365.resources import db
+from wa365.settings import BAILEYS_URL
+from wa365.takeover import touch_takeover
+
+router = APIRouter()
+STARTUP = (takeover.start, outbound.start, broadcasts.start)
+
+@router.get("/wa/status")
+async def get_wa_status(user: User = Depends(get_current_user)):
+    status = await wa_status(user.user_id)
+    return {"status": status["status"], "connected": status["connected"], "jid": status["jid"]}
+
+@router.get("/wa/qr")
+async def get_qr(user: User = Depends(get_current_user)):
+    status = await wa_status(user.user_id)
+    return {"qr": status["qr"], "status": status["status"]}
+
+@router.get("/wa/status/stream")
+async def stream_wa_status(request: Request, user: User = Depends(get_current_user)):
+    queue = subscribe_wa_status(user.user_id)
+
+    async def events():
+        try:
+            last = await wa_status(user.user_id)
+            yield sse_event("status", last)
+            while not await request.is_disconnected():
+                try:
+                    status = await asyncio.wait_for(queue.get(), WA_STATUS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    # Without the channel, changes may have reached another worker; this refresh publishes them
+                    await wa_status(user.user_id)
+                    continue
+                if status != last:
+                    last = status
+                    yield sse_event("status", status)
+        finally:
+            unsubscribe_wa_status(user.user_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.post("/wa/disconnect")
+async def disconnect_wa(user: User = Depends(get_current_user)):
+    try:
+        resp = await baileys_http().post(f"{BAILEYS_URL}/disconnect", json={"user_id": user.user_id})
+        set_wa_status(user.user_id, {"status": "disconnected", "connected": False, "jid": None})
+        await add_log(user.user_id, "info", "WhatsApp disconnected by user")
+        return resp.json()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/wa/reconnect")
+async def reconnect_wa(user: User = Depends(get_current_user)):
+    try:
+        resp = await baileys_http().post(f"{BAILEYS_URL}/reconnect", json={"user_id": user.user_id})
+        await add_log(user.user_id, "info", "WhatsApp reconnect requested")
+        return resp.json()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/wa/send")
+async def send_message(req: SendMessageRequest, user: User = Depends(get_current_user)):
+    delivery = await enqueue_outbound(user.user_id, req.jid, req.message, "manual", req.idempotency_key)
+    await touch_takeover(user.user_id, req.jid)
+    return {"success": True, "id": delivery["id"], "status": delivery["status"]}
+
+@router.get("/wa/outbound")
+async def list_outbound(status: Optional[str] = None, user: User = Depends(get_current_user)):
+    query = {"user_id": user.user_id}
+    if status:
+        query["status"] = status
+    docs = await db.outbound_messages.find(query, {"_id": 0}).sort("created_at", -1).to_list(200)
+    return [outbound_view(d) for d in docs]
+
+@router.get("/wa/outbound/{delivery_id}")
+async def get_outbound(delivery_id: str, user: User = Depends(get_current_user)):
+    doc = await db.outbound_messages.find_one({"id": delivery_id, "user_id": user.user_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return outbound_view(doc)
+
+@router.post("/wa/outbound/{delivery_id}/retry")
+async def retry_outbound(delivery_id: str, user: User = Depends(get_current_user)):
+    now = datetime.now(timezone.utc)
+    result = await db.outbound_messages.update_one(
+        {"id": delivery_id, "user_id": user.user_id, "status": "failed"},
+        {"$set": {"status": "queued", "attempts": 0, "next_attempt_at": now, "updated_at": now}},
+    )
+    if not result.modified_count:
+        raise HTTPException(status_code=404, detail="No failed message with this id")
+    schedule_outbound(user.user_id, delivery_id)
+    return {"ok": True, "status": "queued"}
+
+@router.post("/wa/broadcast")
+async def create_broadcast(req: BroadcastRequest, user: User = Depends(get_current_user)):
+    if not req.template.strip():
+        raise HTTPException(status_code=400, detail="Message template is empty")
+    recipients = await resolve_broadcast_recipients(user.user_id, req)
+    if not recipients:
+        raise HTTPException(status_code=400, detail="No recipients match")
+    if len(recipients) > BROADCAST_MAX_RECIPIENTS:
+        raise HTTPException(status_code=400, detail=f"At most {BROADCAST_MAX_RECIPIENTS} recipients per broadcast")
+    job = {
+        "id": str(uuid.uuid4()), "user_id": user.user_id, "status": "running", "template": req.template,
+        "recipients": recipients, "total": len(recipients), "cursor": 0,
+        "concurrency": req.concurrency, "interval_ms": req.interval_ms, "progress": {},
+        "created_at": datetime.now(timezone.utc), "finished_at": None, "created_by": user.email,
+    }
+    await db.broadcast_jobs.insert_one({**job})
+    start_broadcast(job["id"])
+    await add_log(user.user_id, "info", f"Broadcast {job['id'][:8]} started for {len(recipients)} contacts")
+    job.pop("recipients")
+    return broadcast_view(job)
+
+@router.get("/wa/broadcasts")
+async def list_broadcasts(user: User = Depends(get_current_user)):
+    jobs = await db.broadcast_jobs.find({"user_id": user.user_id}, {"_id": 0, "recipients": 0, "lease_until": 0}).sort("created_at", -1).to_list(50)
+    return [broadcast_view(job) for job in jobs]
+
+@router.get("/wa/broadcast/{job_id}")
+async def get_broadcast(job_id: str, user: User = Depends(get_current_user)):
+    job = await db.broadcast_jobs.find_one({"id": job_id, "user_id": user.user_id}, {"_id": 0, "recipients": 0, "lease_until": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    if job["status"] == "running":
+        job["progress"] = await broadcast_progress(job_id)
+    return broadcast_view(job)
+
+@router.post("/wa/broadcast/{job_id}/cancel")
+async def cancel_broadcast(job_id: str, user: User = Depends(get_current_user)):
+    job = await db.broadcast_jobs.find_one({"id": job_id, "user_id": user.user_id}, {"_id": 0, "status": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    if job["status"] != "running":
+        raise HTTPException(status_code=409, detail=f"Broadcast is already {job['status']}")
+    if not cancel_local_broadcast(job_id):
+        # Running on another worker: mark it so that worker's queue skips what is left
+        now = datetime.now(timezone.utc)
+        await db.broadcast_jobs.update_one({"id": job_id}, {"$set": {"status": "cancelled", "finished_at": now}})
+        await db.outbound_messages.update_many({"job_id": job_id, "status": "queued"}, {"$set": {"status": "cancelled", "updated_at": now}})
+    return {"ok": True, "status": "cancelled"}
@@ -0,0 +1,82 @@
+"""Ingestion from the Baileys sidecar: inbound messages, connection events and the multiplexed channel."""
+
+import hmac, logging
+from typing import Dict
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from wa365 import message_store, takeover
+from wa365.baileys import BAILEYS_CHANNEL_TOKEN, baileys_channel, set_wa_status
+from wa365.helpers import add_log
+from wa365.metrics import Trace
+from wa365.models import IncomingMessage, WAEvent
+from wa365.pipeline import process_incoming_message
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+STARTUP = (takeover.start, message_store.start)
+LAZY_MODULES = ("google.genai",)
+
+@router.post("/wa/event")
+async def handle_wa_event(event: WAEvent):
+    uid = event.user_id or "system"
+    if event.event == "status":
+        set_wa_status(uid, event.data or {})
+        return {"ok": True}
+    if event.event == "connected":
+        set_wa_status(uid, {"status": "connected", "connected": True, "jid": (event.data or {}).get("jid")})
+    await add_log(uid, "info", f"WA Event: {event.event}")
+    return {"ok": True}
+
+async def _channel_message(frame: Dict):
+    try:
+        result = await handle_incoming_message(IncomingMessage(**{k: frame.get(k) for k in ("from", "pushName", "text", "timestamp", "user_id", "trace_id")}))
+    except Exception as e:
+        logger.warning(f"Channel message failed (trace={frame.get('trace_id')}): {e}")
+        result = {"reply": None, "trace_id": frame.get("trace_id")}
+    if baileys_channel.connected:
+        await baileys_channel.send({"type": "reply", "id": frame["id"], "reply": result.get("reply"), "trace_id": result.get("trace_id")})
+
+@router.websocket("/wa/channel")
+async def baileys_channel_socket(websocket: WebSocket, token: str = ""):
+    # The channel carries every tenant's outbound sends, so it is only opened to the token holder
+    if not BAILEYS_CHANNEL_TOKEN or not hmac.compare_digest(token.encode(), BAILEYS_CHANNEL_TOKEN.encode()):
+        await websocket.close(code=1008)
+        return
+    if not baileys_channel.attach(websocket):
+        logger.warning("Baileys channel refused: another connection is live")
+        await websocket.close(code=1008)
+        return
+    try:
+        await websocket.accept()
+        logger.info("Baileys channel connected")
+        while True:
+            frame = await websocket.receive_json()
+            kind = frame.get("type")
+            if kind == "ack":
+                baileys_channel.resolve(frame)
+            elif kind == "message":
+                baileys_channel.spawn(_channel_message(frame))
+            elif kind == "event":
+                baileys_channel.spawn(handle_wa_event(WAEvent(event=frame["event"], data=frame.get("data"), user_id=frame.get("user_id"))))
+            elif kind == "status":
+                for uid, status in (frame.get("statuses") or {}).items():
+                    set_wa_status(uid, status)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        baileys_channel.detach(websocket)
+        logger.info("Baileys channel disconnected")
+
+@router.post("/wa/message")
+async def handle_incoming_message(msg: IncomingMessage):
+    """Answer an inbound message; the trace id (Baileys' own, if it sent one) is echoed so both sides can log it."""
+    trace = Trace(msg.user_id or "unknown", msg.trace_id)
+    try:
+        result = await process_incoming_message(msg, trace)
+    except Exception:
+        trace.finish("error")
+        raise
+    trace.finish("replied" if result.get("reply") else "silent")
+    return {**result, "trace_id": trace.trace_id}
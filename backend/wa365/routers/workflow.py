@@ -0,0 +1,41 @@
+"""Workflow editing and validation."""
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from wa365.auth import get_current_user
+from wa365.helpers import add_log
+from wa365.models import User, WorkflowData
+from wa365.resources import db
+from wa365.response_cache import invalidate_response_cache
+from wa365.timestamps import iso
+from wa365.workflow import cache_workflow_graph, compile_workflow
+
+router = APIRouter()
+
+@router.get("/workflow")
+async def get_workflow(user: User = Depends(get_current_user)):
+    doc = await db.workflows.find_one({"user_id": user.user_id}, {"_id": 0})
+    if doc:
+        doc.pop("user_id", None)
+        compiled = doc.pop("compiled", None)
+        doc["report"] = compiled["report"] if compiled else None
+        doc["updated_at"] = iso(doc.get("updated_at")) or None
+        return doc
+    return WorkflowData().model_dump()
+
+@router.post("/workflow")
+async def save_workflow(data: WorkflowData, user: User = Depends(get_current_user)):
+    # Millisecond precision, as stored, so a graph recompiled from the document gets the same version
+    now = datetime.now(timezone.utc)
+    data.updated_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    compiled = compile_workflow([n.model_dump() for n in data.nodes], data.active, data.execution, iso(data.updated_at))
+    if compiled["report"]["errors"]:
+        raise HTTPException(status_code=422, detail={"message": "Workflow has errors", "report": compiled["report"]})
+    doc = {**data.model_dump(), "user_id": user.user_id, "compiled": compiled}
+    await db.workflows.replace_one({"user_id": user.user_id}, doc, upsert=True)
+    cache_workflow_graph(user.user_id, compiled)
+    invalidate_response_cache(user.user_id)
+    await add_log(user.user_id, "info", f"Workflow saved ({len(data.nodes)} nodes)")
+    return {"ok": True, "report": compiled["report"]}
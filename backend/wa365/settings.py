@@ -0,0 +1,17 @@
+"""Environment settings used across modules; feature-specific knobs live next to the code they tune."""
+
+import os
+
+BAILEYS_URL = os.environ.get('BAILEYS_URL', 'http://localhost:4000')
+EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+
+ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', '')
+
+# Comma-separated wa365.routers.FEATURES this worker serves, or "all"
+APP_FEATURES = os.environ.get('APP_FEATURES', 'all')
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+# Gemini, Google APIs, document extraction and bcrypt are imported where they are used, and the
+# ones the served routers need are warmed off the loop after startup (see each router's LAZY_MODULES)
+WARM_LAZY_IMPORTS = os.environ.get('WARM_LAZY_IMPORTS', 'true').lower() == 'true'
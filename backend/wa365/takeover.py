@@ -0,0 +1,80 @@
+"""Registry of conversations taken over by an agent, kept in sync across workers through Mongo."""
+
+import asyncio, logging, os, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from wa365.helpers import add_log
+from wa365.resources import db, resources
+from wa365.timestamps import as_utc, since
+
+logger = logging.getLogger(__name__)
+
+TAKEOVER_SYNC_SECONDS = float(os.environ.get('TAKEOVER_SYNC_SECONDS', '2'))
+# Each sync re-reads this far behind the newest change seen, for writers with a lagging clock or a late commit
+TAKEOVER_SYNC_MARGIN_SECONDS = 30
+
+# user_id -> {jid: {"by": takeover_by, "activity": epoch seconds of last admin activity}}
+_takeovers: Dict[str, Dict[str, Dict[str, Any]]] = resources.cache("takeovers", dict)
+# Newest takeover_updated_at seen; incremental syncs read from a margin behind it
+_takeover_synced_at: Optional[datetime] = None
+
+def _apply_takeover_doc(doc: Dict):
+    jids = _takeovers.setdefault(doc["user_id"], {})
+    if doc.get("taken_over"):
+        activity = as_utc(doc.get("takeover_activity_at") or doc.get("takeover_updated_at"))
+        jids[doc["jid"]] = {"by": doc.get("takeover_by"), "activity": activity.timestamp() if activity else time.time()}
+    else:
+        jids.pop(doc["jid"], None)
+
+async def sync_takeovers(full: bool = False):
+    """Pull takeover changes written by any worker since the last sync."""
+    global _takeover_synced_at
+    if full or _takeover_synced_at is None:
+        query = {"taken_over": True}
+        _takeover_synced_at = datetime.now(timezone.utc)
+    else:
+        query = since("conversations", "takeover_updated_at", _takeover_synced_at - timedelta(seconds=TAKEOVER_SYNC_MARGIN_SECONDS))
+    projection = {"_id": 0, "user_id": 1, "jid": 1, "taken_over": 1, "takeover_by": 1, "takeover_activity_at": 1, "takeover_updated_at": 1}
+    async for doc in db.conversations.find(query, projection):
+        _apply_takeover_doc(doc)
+        updated_at = as_utc(doc.get("takeover_updated_at"))
+        if updated_at and updated_at > _takeover_synced_at:
+            _takeover_synced_at = updated_at
+
+async def _takeover_sync_loop():
+    while True:
+        await asyncio.sleep(TAKEOVER_SYNC_SECONDS)
+        try:
+            await sync_takeovers()
+        except Exception as e:
+            logger.warning(f"Takeover sync failed: {e}")
+
+async def start():
+    """Load every active takeover, then follow changes made by other workers."""
+    await db.conversations.create_index("takeover_updated_at", sparse=True)
+    await db.conversations.create_index("taken_over", sparse=True)
+    await sync_takeovers(full=True)
+    resources.spawn("takeover-sync", _takeover_sync_loop())
+
+async def write_takeover(user_id: str, jid: str, active: bool, by: Optional[str] = None):
+    """Set or release a takeover in Mongo and in this worker's registry."""
+    now = datetime.now(timezone.utc)
+    doc = {"user_id": user_id, "jid": jid, "taken_over": active, "takeover_by": by if active else None, "takeover_activity_at": now, "takeover_updated_at": now}
+    await db.conversations.update_one({"user_id": user_id, "jid": jid}, {"$set": doc}, upsert=True)
+    _apply_takeover_doc(doc)
+
+async def touch_takeover(user_id: str, jid: str):
+    """Record admin activity on a taken-over conversation, postponing idle expiry."""
+    entry = _takeovers.get(user_id, {}).get(jid)
+    if entry:
+        await write_takeover(user_id, jid, True, entry["by"])
+
+async def takeover_holder(user_id: str, jid: str, idle_minutes: int = 0) -> Optional[Dict[str, Any]]:
+    """Return the takeover entry for a conversation, releasing it once idle too long."""
+    entry = _takeovers.get(user_id, {}).get(jid)
+    if entry and idle_minutes > 0 and time.time() - entry["activity"] > idle_minutes * 60:
+        await write_takeover(user_id, jid, False)
+        await add_log(user_id, "info", f"Takeover of {jid.split('@')[0]} expired after {idle_minutes} idle minutes")
+        return None
+    return entry
@@ -0,0 +1,130 @@
+"""Timestamps stored as BSON datetimes: read helpers for either stored form and the migration of
+fields that older versions wrote as ISO strings.
+
+Until the background migration has converted a field, queries on it go through since() or before(),
+which match both forms; values read back go through as_utc() or iso()."""
+
+import logging, os, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Union
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from wa365.resources import db, resources
+
+logger = logging.getLogger(__name__)
+
+# (collection, field) pairs written as datetimes; messages.t is handled by wa365.message_store
+DATETIME_FIELDS = (
+    ("conversations", "last_timestamp"),
+    ("conversations", "takeover_updated_at"),
+    ("conversations", "takeover_activity_at"),
+    ("logs", "timestamp"),
+    ("bot_actions", "created_at"),
+    ("bot_actions", "updated_at"),
+    ("user_sessions", "expires_at"),
+    ("outbound_messages", "created_at"),
+    ("outbound_messages", "updated_at"),
+    ("outbound_messages", "next_attempt_at"),
+    ("outbound_messages", "lease_until"),
+    ("outbound_messages", "sent_at"),
+    ("user_sheets", "created_at"),
+    ("user_sheets", "export_lease_until"),
+    ("user_sheets", "export_last_run"),
+    ("broadcast_jobs", "created_at"),
+    ("broadcast_jobs", "finished_at"),
+    ("bot_config", "updated_at"),
+    ("workflows", "updated_at"),
+    ("knowledge_docs", "uploaded_at"),
+    ("users", "created_at"),
+    ("user_sessions", "created_at"),
+    ("google_tokens", "expires_at"),
+)
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', '0'))  # 0 keeps logs forever
+DATETIME_MIGRATE_BATCH = 1000
+
+# Fields that may still hold ISO strings in this database; emptied as the migration finishes each one
+_pending = set(DATETIME_FIELDS)
+
+def as_utc(value: Union[datetime, str, None]) -> Optional[datetime]:
+    """A timezone-aware UTC datetime from a stored datetime (naive means UTC) or ISO string."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def iso(value: Union[datetime, str, None]) -> str:
+    """The ISO string the API returns for a stored timestamp."""
+    value = as_utc(value)
+    return value.isoformat() if value else ""
+
+def since(collection: str, field: str, at: datetime) -> Dict[str, Any]:
+    """Filter for `field >= at`, also matching ISO strings while the field is being migrated."""
+    if (collection, field) in _pending:
+        return {"$or": [{field: {"$gte": at}}, {field: {"$gte": at.isoformat()}}]}
+    return {field: {"$gte": at}}
+
+def before(collection: str, field: str, at: datetime) -> Dict[str, Any]:
+    """Filter for `field < at`, also matching ISO strings while the field is being migrated."""
+    if (collection, field) in _pending:
+        return {"$or": [{field: {"$lt": at}}, {field: {"$lt": at.isoformat()}}]}
+    return {field: {"$lt": at}}
+
+def migrating(collection: str, field: str) -> bool:
+    """Whether the field may still hold ISO strings that a datetime range query would miss."""
+    return (collection, field) in _pending
+
+async def migrate_field(collection: str, field: str) -> int:
+    """Convert the field's ISO strings to datetimes in batches; safe to run from several workers."""
+    coll = db[collection]
+    migrated = 0
+    while True:
+        docs = await coll.find({field: {"$type": "string"}}, {field: 1}).limit(DATETIME_MIGRATE_BATCH).to_list(DATETIME_MIGRATE_BATCH)
+        if not docs:
+            break
+        updates = []
+        for d in docs:
+            try:
+                value = as_utc(d[field])
+            except ValueError:
+                value = None
+            updates.append(UpdateOne({"_id": d["_id"], field: d[field]}, {"$set": {field: value}}))
+        await coll.bulk_write(updates, ordered=False)
+        migrated += len(docs)
+    _pending.discard((collection, field))
+    return migrated
+
+async def _migrate_in_background(fields):
+    for collection, field in fields:
+        started = time.perf_counter()
+        try:
+            migrated = await migrate_field(collection, field)
+            if migrated:
+                logger.info(f"Migrated {migrated} {collection}.{field} values to datetimes in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.warning(f"Datetime migration of {collection}.{field} failed: {e}")
+
+async def _ensure_ttl_index(collection: str, field: str, seconds: int):
+    try:
+        await db[collection].create_index(field, expireAfterSeconds=seconds)
+    except OperationFailure:
+        # The index exists with another expiry; change it in place
+        await db.command("collMod", collection, index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds})
+
+async def start():
+    """Create the timestamp and TTL indexes, then convert leftover ISO strings in the background."""
+    await db.conversations.create_index([("user_id", 1), ("last_timestamp", -1)])
+    await db.logs.create_index([("user_id", 1), ("timestamp", -1)])
+    await db.bot_actions.create_index([("user_id", 1), ("created_at", -1)])
+    await db.user_sessions.create_index("session_token")
+    # Mongo's TTL monitor only removes documents whose field is a date; get_current_user still checks expiry
+    await _ensure_ttl_index("user_sessions", "expires_at", 0)
+    if LOG_RETENTION_DAYS > 0:
+        await _ensure_ttl_index("logs", "timestamp", LOG_RETENTION_DAYS * 86400)
+    for collection, field in DATETIME_FIELDS:
+        if not await db[collection].find_one({field: {"$type": "string"}}, {"_id": 1}):
+            _pending.discard((collection, field))
+    if _pending:
+        resources.spawn("datetime-migrate", _migrate_in_background(sorted(_pending)))
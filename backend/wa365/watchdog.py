@@ -0,0 +1,90 @@
+"""Event-loop lag probe and a watchdog thread that logs what is holding the loop."""
+
+import asyncio, logging, os, threading, time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from wa365.profiling import collapse_stack, sample_threads
+from wa365.resources import resources
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_MS = 100
+LOOP_STALL_MS = int(os.environ.get('LOOP_STALL_MS', '250'))
+# Debug mode: > 0 turns on asyncio debug with this slow_callback_duration, and stacks are taken from this lag up
+LOOP_DEBUG_SLOW_MS = int(os.environ.get('LOOP_DEBUG_SLOW_MS', '0'))
+LOOP_LAG_WINDOW = 3000  # probes kept for percentiles: five minutes at the default interval
+
+_loop_lag: deque = deque(maxlen=LOOP_LAG_WINDOW)
+_loop_lag_totals = {"sum": 0.0, "count": 0, "stalls": 0}
+_loop_stalls: deque = deque(maxlen=50)
+_loop_heartbeat = 0.0
+_loop_watchdog_stop = threading.Event()
+
+def loop_stall_threshold_ms() -> int:
+    return min(LOOP_STALL_MS, LOOP_DEBUG_SLOW_MS) if LOOP_DEBUG_SLOW_MS > 0 else LOOP_STALL_MS
+
+async def _loop_lag_probe():
+    """Sleep a fixed interval and record how late the loop woke us; a late wake-up is time something held the loop."""
+    global _loop_heartbeat
+    interval = LOOP_LAG_INTERVAL_MS / 1000
+    _loop_heartbeat = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        lag = max(0.0, now - _loop_heartbeat - interval)
+        _loop_heartbeat = now
+        _loop_lag.append(lag)
+        _loop_lag_totals["sum"] += lag
+        _loop_lag_totals["count"] += 1
+
+def _loop_stall_watchdog(loop_thread_id: int):
+    """Runs off the loop: once the probe is overdue by the stall threshold, log what the loop thread is executing."""
+    threshold = loop_stall_threshold_ms() / 1000
+    interval = LOOP_LAG_INTERVAL_MS / 1000
+    reported = None
+    while not _loop_watchdog_stop.wait(max(threshold / 4, 0.01)):
+        heartbeat = _loop_heartbeat
+        stalled = time.perf_counter() - heartbeat - interval
+        if not heartbeat or stalled < threshold or reported == heartbeat:
+            continue
+        reported = heartbeat
+        stack = sample_threads({loop_thread_id}).get(loop_thread_id, ())
+        _loop_lag_totals["stalls"] += 1
+        _loop_stalls.append({"at": datetime.now(timezone.utc).isoformat(), "stalled_ms": round(stalled * 1000), "stack": collapse_stack(stack)})
+        where = "\n".join(f"  {file}:{line} in {name}" for name, file, line in stack[-20:])
+        logger.warning(f"Event loop blocked for {stalled * 1000:.0f}ms so far, in:\n{where}")
+
+def loop_lag_summary() -> Dict[str, float]:
+    """Percentiles of the recent loop lag window, in milliseconds."""
+    window = sorted(_loop_lag)
+    pct = lambda q: round(window[min(int(q * len(window)), len(window) - 1)] * 1000, 1) if window else 0.0
+    return {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)}
+
+def recent_loop_stalls() -> List[Dict[str, Any]]:
+    """The last stalls with the stack that held the loop, newest first."""
+    return list(reversed(_loop_stalls))
+
+def render_loop_lag() -> List[str]:
+    lines = ["# HELP wa_event_loop_lag_seconds Event-loop scheduling lag over recent probes.", "# TYPE wa_event_loop_lag_seconds summary"]
+    window = sorted(_loop_lag)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        value = window[min(int(q * len(window)), len(window) - 1)] if window else 0.0
+        lines.append(f'wa_event_loop_lag_seconds{{quantile="{q}"}} {value:.6f}')
+    lines.append(f"wa_event_loop_lag_seconds_sum {_loop_lag_totals['sum']:.6f}")
+    lines.append(f"wa_event_loop_lag_seconds_count {_loop_lag_totals['count']}")
+    lines += ["# HELP wa_event_loop_stalls_total Times the loop was blocked past the stall threshold.", "# TYPE wa_event_loop_stalls_total counter"]
+    lines.append(f"wa_event_loop_stalls_total {_loop_lag_totals['stalls']}")
+    return lines
+
+async def start():
+    if LOOP_DEBUG_SLOW_MS > 0:
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = LOOP_DEBUG_SLOW_MS / 1000
+        logger.warning(f"asyncio debug mode on: callbacks holding the loop over {LOOP_DEBUG_SLOW_MS}ms are logged")
+    _loop_watchdog_stop.clear()
+    resources.spawn("loop-lag-probe", _loop_lag_probe())
+    threading.Thread(target=_loop_stall_watchdog, args=(threading.get_ident(),), name="loop-watchdog", daemon=True).start()
+    resources.on_shutdown(_loop_watchdog_stop.set)
@@ -0,0 +1,234 @@
+"""Workflow compiler and the per-conversation state machine that runs it."""
+
+import os, re, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from wa365.helpers import add_log
+from wa365.resources import db, resources
+from wa365.response_cache import normalize_message
+from wa365.takeover import write_takeover
+from wa365.timestamps import as_utc, iso
+
+WORKFLOW_DONE = "__done__"
+WORKFLOW_FORMAT = 1
+WORKFLOW_NODE_TYPES = ("start", "message", "question", "collect", "escalate", "end")
+WORKFLOW_CACHE_TTL_SECONDS = float(os.environ.get('WORKFLOW_CACHE_TTL_SECONDS', '5'))
+# A conversation silent for this long starts the flow again, finished or not
+WORKFLOW_IDLE_RESET_HOURS = float(os.environ.get('WORKFLOW_IDLE_RESET_HOURS', '24'))
+
+def compile_workflow(nodes: List[Dict], active: bool = True, execution: str = "prompt", version: Optional[str] = None) -> Dict[str, Any]:
+    """Compile saved workflow nodes into an indexed graph for the message path.
+
+    The artifact holds an id -> node map, each node's default successor and edges,
+    and a report of errors (duplicate ids, unknown types, dangling branch targets)
+    and warnings (missing start/end, unreachable nodes, cycles)."""
+    ordered = sorted(nodes, key=lambda n: n.get("position", 0))
+    errors: List[str] = []
+    warnings_: List[str] = []
+    by_id: Dict[str, Dict] = {}
+    for n in ordered:
+        if n["id"] in by_id:
+            errors.append(f"Duplicate step id {n['id']}")
+        if n.get("type") not in WORKFLOW_NODE_TYPES:
+            errors.append(f"Step \"{n.get('title') or n['id']}\" has unknown type {n.get('type')}")
+        by_id[n["id"]] = {"type": n.get("type", "message"), "title": n.get("title", ""), "content": n.get("content", ""),
+                          "branches": [{"label": b.get("label", ""), "next_id": b.get("next_id")} for b in n.get("branches", [])]}
+    order = list(by_id)
+    next_ids = {nid: (order[i + 1] if i + 1 < len(order) else None) for i, nid in enumerate(order)}
+    edges: Dict[str, List[str]] = {}
+    dangling = []
+    for nid, node in by_id.items():
+        if node["type"] in ("escalate", "end"):
+            edges[nid] = []
+            continue
+        targets = []
+        if node["type"] == "question" and node["branches"]:
+            for b in node["branches"]:
+                target = b["next_id"] or next_ids[nid]
+                if b["next_id"] and b["next_id"] not in by_id:
+                    dangling.append({"node": nid, "branch": b["label"], "next_id": b["next_id"]})
+                    errors.append(f"Option \"{b['label']}\" of \"{node['title'] or nid}\" points to a missing step")
+                elif target and target not in targets:
+                    targets.append(target)
+        elif next_ids[nid]:
+            targets.append(next_ids[nid])
+        edges[nid] = targets
+
+    start = next((nid for nid in order if by_id[nid]["type"] == "start"), order[0] if order else None)
+    if order and by_id[start]["type"] != "start":
+        warnings_.append("No Start step; the flow begins at the first step")
+    if order and not any(n["type"] in ("end", "escalate") for n in by_id.values()):
+        warnings_.append("No End or Escalate step; conversations leave the flow after the last step")
+
+    reachable = set()
+    frontier = [start] if start else []
+    while frontier:
+        nid = frontier.pop()
+        if nid not in reachable:
+            reachable.add(nid)
+            frontier.extend(edges[nid])
+    unreachable = [nid for nid in order if nid not in reachable]
+    for nid in unreachable:
+        warnings_.append(f"Step \"{by_id[nid]['title'] or nid}\" can never be reached")
+
+    cycles: List[List[str]] = []
+    colour: Dict[str, int] = {}
+    def visit(nid: str, path: List[str]):
+        colour[nid] = 1
+        for target in edges[nid]:
+            if colour.get(target) == 1:
+                cycles.append(path[path.index(target):] + [target])
+            elif not colour.get(target):
+                visit(target, path + [target])
+        colour[nid] = 2
+    for nid in order:
+        if not colour.get(nid):
+            visit(nid, [nid])
+    for cycle in cycles:
+        warnings_.append("Loop: " + " → ".join(by_id[c]["title"] or c for c in cycle))
+
+    return {
+        "format": WORKFLOW_FORMAT, "version": version, "active": active, "execution": execution,
+        "start": start, "order": order, "nodes": by_id, "next": next_ids, "edges": edges,
+        "report": {"errors": errors, "warnings": warnings_, "unreachable": unreachable, "dangling": dangling, "cycles": cycles},
+    }
+
+# user_id -> (loaded_at, compiled graph or None)
+_workflow_graphs: Dict[str, tuple] = resources.cache("workflow_graphs", dict)
+
+async def get_workflow_graph(user_id: str) -> Optional[Dict[str, Any]]:
+    """Return the tenant's compiled workflow, reusing it in memory for a few seconds."""
+    cached = _workflow_graphs.get(user_id)
+    if cached and time.monotonic() - cached[0] < WORKFLOW_CACHE_TTL_SECONDS:
+        return cached[1]
+    doc = await db.workflows.find_one({"user_id": user_id}, {"_id": 0})
+    graph = _graph_from_doc(doc) if doc else None
+    cache_workflow_graph(user_id, graph)
+    return graph
+
+def cache_workflow_graph(user_id: str, graph: Optional[Dict[str, Any]]):
+    """Replace the tenant's cached graph, e.g. with the one just saved."""
+    _workflow_graphs[user_id] = (time.monotonic(), graph)
+
+def _graph_from_doc(doc: Dict) -> Dict[str, Any]:
+    graph = doc.get("compiled")
+    if not graph or graph.get("format") != WORKFLOW_FORMAT:
+        graph = compile_workflow(doc.get("nodes", []), doc.get("active", True), doc.get("execution") or "prompt", iso(doc.get("updated_at")) or None)
+    return graph
+
+async def preload_workflow_graphs() -> int:
+    """Cache every tenant's compiled workflow in one query, so a fresh worker's first messages skip the read."""
+    loaded_at = time.monotonic()
+    count = 0
+    async for doc in db.workflows.find({}, {"_id": 0}):
+        if doc.get("user_id"):
+            _workflow_graphs[doc["user_id"]] = (loaded_at, _graph_from_doc(doc))
+            count += 1
+    return count
+
+def workflow_engine_active(graph: Optional[Dict]) -> bool:
+    return bool(graph and graph["active"] and graph["order"] and graph["execution"] == "engine")
+
+def _contains_words(words: List[str], part: List[str]) -> bool:
+    return any(words[i:i + len(part)] == part for i in range(len(words) - len(part) + 1))
+
+def match_branch(text: str, branches: List[Dict]) -> Optional[Dict]:
+    """Pick the branch a reply refers to by option number, label, or a distinctive label word.
+
+    Labels are matched on whole words, so "I'm not sure" or "nothing" never select "No"."""
+    t = normalize_message(text)
+    if not t:
+        return None
+    if t.isdigit():
+        i = int(t) - 1
+        return branches[i] if 0 <= i < len(branches) else None
+    words = t.split()
+    labels = [normalize_message(b.get("label", "")).split() for b in branches]
+    for branch, label in zip(branches, labels):
+        if label and (_contains_words(words, label) or (len(t) >= 3 and _contains_words(label, words))):
+            return branch
+    for branch, label in zip(branches, labels):
+        if set(words) & {w for w in label if len(w) >= 4}:
+            return branch
+    return None
+
+def _node_prompt(node: Dict) -> str:
+    content = node["content"].strip()
+    if node["type"] == "question" and node["branches"]:
+        options = "\n".join(f"{i + 1}. {b['label']}" for i, b in enumerate(node["branches"]))
+        return f"{content}\n{options}" if content else options
+    if node["type"] == "collect":
+        details = re.sub(r"^collect\s*:\s*", "", content, flags=re.IGNORECASE)
+        return details if details.endswith("?") else f"Please send me the following details: {details}"
+    return content
+
+def run_workflow(graph: Dict[str, Any], state: Dict, text: str) -> Dict[str, Any]:
+    """Advance a conversation through the compiled workflow for one inbound message.
+
+    `state` is {"node": id awaiting input | WORKFLOW_DONE | None, "fields": {...}}.
+    Returns {"reply", "state", "escalate", "hint"}: `reply` is None when the step
+    needs free-form understanding, in which case `hint` describes the current step
+    for the LLM prompt and the state is left unchanged."""
+    nodes, next_ids = graph["nodes"], graph["next"]
+    fields = dict(state.get("fields") or {})
+    result = {"reply": None, "state": state, "escalate": False, "hint": None}
+    if state.get("node") == WORKFLOW_DONE:
+        return result
+    current_id = state.get("node")
+    current = nodes.get(current_id) if current_id else None
+    if current is None:
+        next_id = graph["start"]
+    elif current["type"] == "question" and current["branches"]:
+        branch = match_branch(text, current["branches"])
+        if branch is None:
+            options = " | ".join(b["label"] for b in current["branches"])
+            result["hint"] = (
+                f"\n\n## Current Workflow Step\nThe customer is at step \"{current['title']}\" and was asked: {current['content']}"
+                f"\nTheir reply did not match an option ({options}). Help them briefly and ask them to choose one."
+            )
+            return result
+        fields[current["title"] or current_id] = branch["label"]
+        next_id = branch["next_id"] or next_ids[current_id]
+    else:
+        # collect, or a question without options: the reply is the answer
+        fields[current["title"] or current_id] = text
+        next_id = next_ids[current_id]
+
+    replies = []
+    node_id = WORKFLOW_DONE
+    for _ in range(len(nodes)):
+        node = nodes.get(next_id)
+        if node is None:
+            break
+        if _node_prompt(node):
+            replies.append(_node_prompt(node))
+        if node["type"] in ("question", "collect"):
+            node_id = next_id
+            break
+        if node["type"] == "escalate":
+            result["escalate"] = True
+            break
+        if node["type"] == "end":
+            break
+        next_id = next_ids[next_id]
+    result["state"] = {"node": node_id, "fields": fields}
+    result["reply"] = "\n\n".join(replies) or None
+    return result
+
+async def workflow_turn(user_id: str, jid: str, text: str, graph: Optional[Dict]) -> Optional[Dict[str, Any]]:
+    """Run the workflow engine for a message and persist the conversation's position."""
+    if not workflow_engine_active(graph):
+        return None
+    conv_doc = await db.conversations.find_one({"user_id": user_id, "jid": jid}, {"_id": 0, "workflow_state": 1})
+    state = (conv_doc or {}).get("workflow_state") or {}
+    now = datetime.now(timezone.utc)
+    last_active = as_utc(state.get("updated_at"))
+    if state.get("version") != graph["version"] or (last_active and now - last_active > timedelta(hours=WORKFLOW_IDLE_RESET_HOURS)):
+        state = {}
+    result = run_workflow(graph, state, text)
+    await db.conversations.update_one({"user_id": user_id, "jid": jid}, {"$set": {"workflow_state": {**result["state"], "version": graph["version"], "updated_at": now}}}, upsert=True)
+    if result["escalate"]:
+        await write_takeover(user_id, jid, True, "workflow")
+        await add_log(user_id, "info", f"Workflow escalated conversation {jid.split('@')[0]} to an agent")
+    return result
@@ -7,6 +7,7 @@ import {
   isJidBroadcast,
 } from "@whiskeysockets/baileys";
 import express from "express";
+import WebSocket from "ws";
 import QRCode from "qrcode";
 import axios from "axios";
 import pino from "pino";
@@ -15,6 +16,7 @@ import { mkdir } from "fs/promises";
 import { existsSync } from "fs";
 import path from "path";
 import { fileURLToPath } from "url";
+import { randomUUID } from "crypto";
 import dotenv from "dotenv";
 
 dotenv.config();
@@ -25,6 +27,11 @@ const __dirname = path.dirname(__filename);
 const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:8001";
 const PORT = parseInt(process.env.BAILEYS_PORT || "3001");
 const AUTH_BASE = path.join(__dirname, "auth_sessions");
+const CHANNEL_URL = process.env.BACKEND_CHANNEL_URL || `${BACKEND_URL.replace(/^http/, "ws")}/api/wa/channel`;
+const CHANNEL_TOKEN = process.env.BAILEYS_CHANNEL_TOKEN || "";
+// "off" sends everything over HTTP, so a multi-worker backend spreads inbound messages across its workers
+const CHANNEL_ENABLED = process.env.BACKEND_CHANNEL !== "off";
+const REPLY_TIMEOUT_MS = 30000;
 
 const logger = pino({ level: "silent" });
 const app = express();
@@ -48,12 +55,80 @@ function addLog(userId, level, message) {
   console.log(`[${userId}][${level.toUpperCase()}] ${message}`);
 }
 
+function statusOf(userId) {
+  const s = getSession(userId);
+  return { status: s.status, connected: s.status === "connected", jid: s.sock?.user?.id || null, qr: s.qr };
+}
+
+// ── Channel to backend ────────────────────────────────────
+// One WebSocket carries events, status pushes, inbound messages (answered by
+// "reply" frames) and send commands (answered by "ack" frames). While it is
+// down everything falls back to the per-call HTTP routes. The backend only
+// accepts it with BAILEYS_CHANNEL_TOKEN set on both sides.
+let channel = null;
+const pendingReplies = new Map(); // frame id -> { resolve, reject, timer }
+
+function channelSend(frame) {
+  if (channel?.readyState !== WebSocket.OPEN) return false;
+  channel.send(JSON.stringify(frame));
+  return true;
+}
+
+function connectChannel(delay = 1000) {
+  const ws = new WebSocket(`${CHANNEL_URL}?token=${encodeURIComponent(CHANNEL_TOKEN)}`);
+  ws.on("open", () => {
+    channel = ws;
+    delay = 1000;
+    console.log("[Baileys] Channel to backend open");
+    const statuses = Object.fromEntries([...sessions.keys()].map((id) => [id, statusOf(id)]));
+    channelSend({ type: "status", statuses });
+  });
+  ws.on("message", async (raw) => {
+    let frame;
+    try { frame = JSON.parse(raw); } catch { return; }
+    if (frame.type === "reply") {
+      const pending = pendingReplies.get(frame.id);
+      if (pending) { clearTimeout(pending.timer); pendingReplies.delete(frame.id); pending.resolve(frame.reply); }
+    } else if (frame.type === "send") {
+      const results = await sendBatch(frame.user_id || "default", frame.messages || []);
+      channelSend({ type: "ack", id: frame.id, results });
+    }
+  });
+  ws.on("close", () => {
+    if (channel === ws) channel = null;
+    for (const [id, pending] of pendingReplies) { clearTimeout(pending.timer); pending.reject(new Error("Channel closed")); }
+    pendingReplies.clear();
+    setTimeout(() => connectChannel(Math.min(delay * 2, 30000)), delay);
+  });
+  ws.on("error", () => {}); // "close" follows and schedules the reconnect
+}
+
+function pushStatus(userId) {
+  const status = statusOf(userId);
+  if (channelSend({ type: "status", statuses: { [userId]: status } })) return;
+  axios.post(`${BACKEND_URL}/api/wa/event`, { event: "status", data: status, user_id: userId }, { timeout: 5000 }).catch(() => {});
+}
+
 async function notifyBackend(userId, event, data) {
+  if (channelSend({ type: "event", event, data, user_id: userId })) return;
   try {
     await axios.post(`${BACKEND_URL}/api/wa/event`, { event, data, user_id: userId }, { timeout: 5000 });
   } catch {}
 }
 
+async function forwardMessage(payload) {
+  if (channel?.readyState === WebSocket.OPEN) {
+    const id = randomUUID();
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => { pendingReplies.delete(id); reject(new Error("Reply timed out")); }, REPLY_TIMEOUT_MS);
+      pendingReplies.set(id, { resolve, reject, timer });
+      channelSend({ type: "message", id, ...payload });
+    });
+  }
+  const resp = await axios.post(`${BACKEND_URL}/api/wa/message`, payload, { timeout: REPLY_TIMEOUT_MS });
+  return resp.data?.reply;
+}
+
 // ── Connect per user ──────────────────────────────────────
 async function connectUser(userId) {
   const authDir = path.join(AUTH_BASE, userId);
@@ -66,6 +141,7 @@ async function connectUser(userId) {
   addLog(userId, "info", `Connecting Baileys v${version.join(".")}`);
   s.status = "connecting";
   s.qr = null;
+  pushStatus(userId);
 
   const sock = makeWASocket({
     version,
@@ -84,6 +160,7 @@ async function connectUser(userId) {
       addLog(userId, "info", "QR code generated — scan with WhatsApp");
       try { s.qr = await QRCode.toDataURL(qr, { width: 300, margin: 2 }); } catch {}
       s.status = "qr_ready";
+      pushStatus(userId);
     }
 
     if (connection === "close") {
@@ -93,6 +170,7 @@ async function connectUser(userId) {
         lastDisconnect.error.output?.statusCode !== DisconnectReason.loggedOut;
       addLog(userId, "warn", `Connection closed: ${lastDisconnect?.error?.message || "unknown"}`);
       s.status = "disconnected";
+      pushStatus(userId);
       if (shouldReconnect) {
         addLog(userId, "info", "Reconnecting...");
         setTimeout(() => connectUser(userId), 3000);
@@ -105,6 +183,7 @@ async function connectUser(userId) {
     if (connection === "open") {
       s.qr = null;
       s.status = "connected";
+      pushStatus(userId);
       addLog(userId, "info", `Connected! JID: ${sock.user?.id}`);
       await notifyBackend(userId, "connected", { jid: sock.user?.id });
     }
@@ -121,16 +200,18 @@ async function connectUser(userId) {
       const pushName = msg.pushName || from.split("@")[0];
       const text = msg.message?.conversation || msg.message?.extendedTextMessage?.text || msg.message?.imageMessage?.caption || null;
       if (!text) continue;
-      addLog(userId, "info", `Message from ${pushName}: ${text.substring(0, 50)}`);
+      // The backend tags its stage timings with this id, so a slow reply can be matched across both logs
+      const traceId = randomUUID().replace(/-/g, "").slice(0, 16);
+      const started = Date.now();
+      addLog(userId, "info", `Message from ${pushName}: ${text.substring(0, 50)} [trace ${traceId}]`);
       try {
-        const resp = await axios.post(`${BACKEND_URL}/api/wa/message`, { from, pushName, text, timestamp: msg.messageTimestamp, user_id: userId }, { timeout: 30000 });
-        const reply = resp.data?.reply;
+        const reply = await forwardMessage({ from, pushName, text, timestamp: msg.messageTimestamp, user_id: userId, trace_id: traceId });
         if (reply && s.sock) {
           await s.sock.sendMessage(from, { text: reply });
-          addLog(userId, "info", `Replied to ${pushName}: ${reply.substring(0, 50)}`);
+          addLog(userId, "info", `Replied to ${pushName} in ${Date.now() - started}ms: ${reply.substring(0, 50)} [trace ${traceId}]`);
         }
       } catch (e) {
-        addLog(userId, "error", `Error processing message: ${e.message}`);
+        addLog(userId, "error", `Error processing message: ${e.message} [trace ${traceId}]`);
       }
     }
   });
@@ -139,9 +220,12 @@ async function connectUser(userId) {
 // ── REST API ──────────────────────────────────────────────
 
 app.get("/status", (req, res) => {
-  const userId = req.query.user_id || "default";
-  const s = getSession(userId);
-  res.json({ status: s.status, connected: s.status === "connected", jid: s.sock?.user?.id || null });
+  if (req.query.user_ids) {
+    const ids = String(req.query.user_ids).split(",").filter(Boolean);
+    return res.json({ statuses: Object.fromEntries(ids.map((id) => [id, statusOf(id)])) });
+  }
+  const { status, connected, jid } = statusOf(req.query.user_id || "default");
+  res.json({ status, connected, jid });
 });
 
 app.get("/qr", (req, res) => {
@@ -168,20 +252,55 @@ app.post("/disconnect", async (req, res) => {
     if (s.sock) { await s.sock.logout(); s.sock = null; }
     s.status = "disconnected";
     s.qr = null;
+    pushStatus(userId);
     addLog(userId, "info", "Disconnected by user");
     res.json({ success: true });
   } catch (e) { res.status(500).json({ error: e.message }); }
 });
 
-app.post("/send", async (req, res) => {
-  const { user_id, to, message } = req.body;
-  const userId = user_id || "default";
+// Backend retries resend the same idempotency_key; remember recent ones so a
+// retry after a lost response does not deliver the message twice.
+const SENT_KEY_TTL_MS = 10 * 60 * 1000;
+const sentKeys = new Map(); // `${user_id}:${key}` -> { id, at }
+
+function recentSend(userId, key) {
+  const now = Date.now();
+  for (const [k, v] of sentKeys) {
+    if (now - v.at < SENT_KEY_TTL_MS) break;
+    sentKeys.delete(k);
+  }
+  return key ? sentKeys.get(`${userId}:${key}`) : undefined;
+}
+
+async function sendOne(userId, { to, message, idempotency_key }) {
   const s = getSession(userId);
-  if (!s.sock || s.status !== "connected") return res.status(400).json({ error: "Not connected" });
+  const previous = recentSend(userId, idempotency_key);
+  if (previous) return { success: true, duplicate: true, id: previous.id };
+  if (!s.sock || s.status !== "connected") return { success: false, error: "Not connected" };
   try {
-    await s.sock.sendMessage(to, { text: message });
-    res.json({ success: true });
-  } catch (e) { res.status(500).json({ error: e.message }); }
+    const sent = await s.sock.sendMessage(to, { text: message });
+    const id = sent?.key?.id || null;
+    if (idempotency_key) sentKeys.set(`${userId}:${idempotency_key}`, { id, at: Date.now() });
+    return { success: true, id };
+  } catch (e) { return { success: false, error: e.message }; }
+}
+
+async function sendBatch(userId, messages) {
+  const results = [];
+  for (const m of messages) results.push(await sendOne(userId, m));
+  return results;
+}
+
+app.post("/send", async (req, res) => {
+  const result = await sendOne(req.body.user_id || "default", req.body);
+  if (result.success) return res.json(result);
+  res.status(result.error === "Not connected" ? 400 : 500).json({ error: result.error });
+});
+
+app.post("/send-batch", async (req, res) => {
+  const { user_id, messages } = req.body;
+  if (!Array.isArray(messages)) return res.status(400).json({ error: "messages must be an array" });
+  res.json({ results: await sendBatch(user_id || "default", messages) });
 });
 
 app.get("/logs", (req, res) => {
@@ -192,4 +311,6 @@ app.get("/logs", (req, res) => {
 
 app.listen(PORT, "0.0.0.0", () => {
   console.log(`[Baileys] Listening on port ${PORT}`);
+  if (CHANNEL_ENABLED && CHANNEL_TOKEN) connectChannel();
+  else console.log("[Baileys] Channel disabled, using HTTP to reach the backend");
 });
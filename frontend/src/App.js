@@ -11,6 +11,7 @@ import ConfigPage from "./pages/ConfigPage";
 import LogsPage from "./pages/LogsPage";
 import KnowledgePage from "./pages/KnowledgePage";
 import ActionsPage from "./pages/ActionsPage";
+import BroadcastPage from "./pages/BroadcastPage";
 import IntegrationsPage from "./pages/IntegrationsPage";
 import WorkflowPage from "./pages/WorkflowPage";
 import ChatTestPage from "./pages/ChatTestPage";
@@ -39,6 +40,7 @@ function AppRoutes() {
               <Route path="/chats" element={<ChatsPage />} />
               <Route path="/knowledge" element={<KnowledgePage />} />
               <Route path="/actions" element={<ActionsPage />} />
+              <Route path="/broadcast" element={<BroadcastPage />} />
               <Route path="/integrations" element={<IntegrationsPage />} />
               <Route path="/workflow" element={<WorkflowPage />} />
               <Route path="/chat-test" element={<ChatTestPage />} />
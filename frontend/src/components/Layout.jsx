@@ -3,7 +3,7 @@ import { NavLink, useLocation } from "react-router-dom";
 import {
   LayoutDashboard, MessageSquare, Settings, Terminal, Wifi, WifiOff,
   Loader2, Menu, X, Bot, BookOpen, Zap, LogOut, ChevronDown, GitBranch,
-  FlaskConical, ZapOff
+  FlaskConical, ZapOff, Megaphone
 } from "lucide-react";
 import { Badge } from "../components/ui/badge";
 import { Button } from "../components/ui/button";
@@ -11,6 +11,7 @@ import { Separator } from "../components/ui/separator";
 import { DropdownMenu, DropdownMenuContent, DropdownMenuItem, DropdownMenuTrigger } from "../components/ui/dropdown-menu";
 import axios from "axios";
 import { useAuth } from "./AuthProvider";
+import { WaStatusProvider, useWaStatus } from "./WaStatusProvider";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -20,6 +21,7 @@ const navItems = [
   { path: "/chats", icon: MessageSquare, label: "Conversations" },
   { path: "/knowledge", icon: BookOpen, label: "Knowledge Base" },
   { path: "/actions", icon: Zap, label: "Bot Actions" },
+  { path: "/broadcast", icon: Megaphone, label: "Broadcast" },
   { path: "/workflow", icon: GitBranch, label: "Workflow" },
   { path: "/chat-test", icon: FlaskConical, label: "Chat Test" },
   { path: "/integrations", icon: Settings, label: "Integrations" },
@@ -28,7 +30,15 @@ const navItems = [
 ];
 
 export function Layout({ children }) {
-  const [status, setStatus] = useState({ connected: false, status: "disconnected" });
+  return (
+    <WaStatusProvider>
+      <LayoutShell>{children}</LayoutShell>
+    </WaStatusProvider>
+  );
+}
+
+function LayoutShell({ children }) {
+  const status = useWaStatus();
   const [mobileOpen, setMobileOpen] = useState(false);
   const [pendingCount, setPendingCount] = useState(0);
   const [aiEnabled, setAiEnabled] = useState(true);
@@ -39,11 +49,7 @@ export function Layout({ children }) {
   useEffect(() => {
     const fetchStatus = async () => {
       try {
-        const [st, stats] = await Promise.all([
-          axios.get(`${API}/wa/status`, { withCredentials: true }),
-          axios.get(`${API}/stats`, { withCredentials: true }),
-        ]);
-        setStatus(st.data);
+        const stats = await axios.get(`${API}/stats`, { withCredentials: true });
         setPendingCount(stats.data.pending_actions || 0);
         setAiEnabled(stats.data.ai_enabled ?? true);
       } catch {}
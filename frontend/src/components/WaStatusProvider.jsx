@@ -0,0 +1,30 @@
+import { createContext, useContext, useEffect, useState } from "react";
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+const INITIAL = { status: "disconnected", connected: false, jid: null, qr: null };
+const WaStatusContext = createContext(INITIAL);
+
+// Live WhatsApp connection status pushed by the backend over server-sent events.
+// One stream serves every component under the provider; EventSource reconnects on its own.
+export function WaStatusProvider({ children }) {
+  const [status, setStatus] = useState(INITIAL);
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/wa/status/stream`, { withCredentials: true });
+    source.addEventListener("status", (e) => {
+      try { setStatus(JSON.parse(e.data)); } catch {}
+    });
+    return () => source.close();
+  }, []);
+
+  return (
+    <WaStatusContext.Provider value={status}>
+      {children}
+    </WaStatusContext.Provider>
+  );
+}
+
+export function useWaStatus() {
+  return useContext(WaStatusContext);
+}
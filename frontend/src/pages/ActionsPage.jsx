@@ -7,6 +7,7 @@ import { Badge } from "../components/ui/badge";
 import { Separator } from "../components/ui/separator";
 import { Textarea } from "../components/ui/textarea";
 import { Label } from "../components/ui/label";
+import { Checkbox } from "../components/ui/checkbox";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../components/ui/select";
 import { toast } from "sonner";
 
@@ -35,6 +36,9 @@ export default function ActionsPage() {
   const [expanded, setExpanded] = useState(null);
   const [notes, setNotes] = useState({});
   const [processing, setProcessing] = useState({});
+  const [selected, setSelected] = useState([]);
+  const [bulkNote, setBulkNote] = useState("");
+  const [bulkBusy, setBulkBusy] = useState(false);
 
   const loadActions = async () => {
     setLoading(true);
@@ -48,6 +52,11 @@ export default function ActionsPage() {
 
   useEffect(() => { loadActions(); }, [filter]);
 
+  useEffect(() => {
+    const pendingIds = new Set(actions.filter((a) => a.status === "pending").map((a) => a.action_id));
+    setSelected((s) => s.filter((id) => pendingIds.has(id)));
+  }, [actions]);
+
   useEffect(() => {
     const interval = setInterval(loadActions, 10000);
     return () => clearInterval(interval);
@@ -57,7 +66,7 @@ export default function ActionsPage() {
     setProcessing((p) => ({ ...p, [actionId]: true }));
     try {
       await axios.patch(`${API}/actions/${actionId}`, { status, admin_note: notes[actionId] || null }, { withCredentials: true });
-      toast.success(status === "approved" ? "Action approved — confirmation sent to client." : "Action rejected — client notified.");
+      toast.success(status === "approved" ? "Action approved — confirmation queued for client." : "Action rejected — client notification queued.");
       setExpanded(null);
       await loadActions();
     } catch {
@@ -66,7 +75,28 @@ export default function ActionsPage() {
     setProcessing((p) => ({ ...p, [actionId]: false }));
   };
 
-  const pending = actions.filter((a) => a.status === "pending").length;
+  const handleBulk = async (status) => {
+    setBulkBusy(true);
+    try {
+      const resp = await axios.patch(`${API}/actions/bulk`, { action_ids: selected, status, admin_note: bulkNote || null }, { withCredentials: true });
+      const { updated, queued } = resp.data;
+      const verb = status === "approved" ? "approved" : "rejected";
+      toast.success(`${updated} actions ${verb} — ${queued} client notifications queued.`);
+      setSelected([]);
+      setBulkNote("");
+      await loadActions();
+    } catch {
+      toast.error("Failed to update actions.");
+    }
+    setBulkBusy(false);
+  };
+
+  const toggleSelected = (actionId, checked) =>
+    setSelected((s) => (checked ? [...s, actionId] : s.filter((id) => id !== actionId)));
+
+  const pendingActions = actions.filter((a) => a.status === "pending");
+  const pending = pendingActions.length;
+  const allSelected = pending > 0 && selected.length === pending;
 
   return (
     <div className="p-6 max-w-4xl space-y-4">
@@ -91,10 +121,52 @@ export default function ActionsPage() {
 
       <Card>
         <CardHeader className="pb-2 flex-row items-center justify-between space-y-0">
-          <CardTitle className="text-sm font-medium">Actions list</CardTitle>
+          <div className="flex items-center gap-2">
+            {pending > 0 && (
+              <Checkbox
+                checked={allSelected}
+                onCheckedChange={(v) => setSelected(v ? pendingActions.map((a) => a.action_id) : [])}
+                data-testid="select-all-actions"
+              />
+            )}
+            <CardTitle className="text-sm font-medium">Actions list</CardTitle>
+          </div>
           <Badge variant="secondary" className="text-xs font-normal">{actions.length} records</Badge>
         </CardHeader>
         <Separator />
+        {selected.length > 0 && (
+          <div className="px-4 py-3 space-y-2 bg-muted/50 border-b border-border" data-testid="bulk-actions-bar">
+            <Textarea
+              value={bulkNote}
+              onChange={(e) => setBulkNote(e.target.value)}
+              placeholder="Note for all selected clients (optional)"
+              className="text-xs min-h-[48px] resize-none"
+              data-testid="bulk-action-note"
+            />
+            <div className="flex items-center gap-2">
+              <span className="text-xs text-muted-foreground flex-1">{selected.length} selected</span>
+              <Button
+                size="sm"
+                className="gap-1.5 bg-green-600 hover:bg-green-700 text-white"
+                onClick={() => handleBulk("approved")}
+                disabled={bulkBusy}
+                data-testid="bulk-approve-actions"
+              >
+                <CheckCircle size={13} /> Approve selected
+              </Button>
+              <Button
+                size="sm"
+                variant="outline"
+                className="gap-1.5 text-red-600 border-red-200 hover:bg-red-50"
+                onClick={() => handleBulk("rejected")}
+                disabled={bulkBusy}
+                data-testid="bulk-reject-actions"
+              >
+                <XCircle size={13} /> Reject selected
+              </Button>
+            </div>
+          </div>
+        )}
         <CardContent className="p-0">
           {actions.length === 0 ? (
             <div className="py-12 text-center">
@@ -107,6 +179,14 @@ export default function ActionsPage() {
               {actions.map((action) => (
                 <div key={action.action_id} className="px-4 py-3">
                   <div className="flex items-start justify-between gap-3">
+                    {action.status === "pending" && (
+                      <Checkbox
+                        checked={selected.includes(action.action_id)}
+                        onCheckedChange={(v) => toggleSelected(action.action_id, v)}
+                        className="mt-0.5"
+                        data-testid={`select-action-${action.action_id}`}
+                      />
+                    )}
                     <div className="flex-1 min-w-0">
                       <div className="flex items-center gap-2 flex-wrap">
                         {statusBadge(action.status)}
@@ -0,0 +1,230 @@
+import { useState, useEffect } from "react";
+import axios from "axios";
+import { Megaphone, Send, Loader2, RefreshCw, XCircle } from "lucide-react";
+import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "../components/ui/card";
+import { Button } from "../components/ui/button";
+import { Badge } from "../components/ui/badge";
+import { Separator } from "../components/ui/separator";
+import { Textarea } from "../components/ui/textarea";
+import { Input } from "../components/ui/input";
+import { Label } from "../components/ui/label";
+import { Switch } from "../components/ui/switch";
+import { Slider } from "../components/ui/slider";
+import { Progress } from "../components/ui/progress";
+import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../components/ui/select";
+import { toast } from "sonner";
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+const AUDIENCES = [
+  { value: "filter", label: "Conversations matching a filter" },
+  { value: "jids", label: "Specific numbers" },
+];
+
+function statusBadge(status) {
+  switch (status) {
+    case "running": return <Badge variant="outline" className="text-[10px] bg-blue-50 text-blue-700 border-blue-200 gap-1"><Loader2 size={9} className="animate-spin" /> Running</Badge>;
+    case "completed": return <Badge variant="outline" className="text-[10px] bg-green-50 text-green-700 border-green-200">Completed</Badge>;
+    case "cancelled": return <Badge variant="outline" className="text-[10px] bg-orange-50 text-orange-700 border-orange-200">Cancelled</Badge>;
+    case "failed": return <Badge variant="outline" className="text-[10px] bg-red-50 text-red-700 border-red-200">Failed</Badge>;
+    default: return <Badge variant="secondary" className="text-[10px]">{status}</Badge>;
+  }
+}
+
+function toJid(value) {
+  const v = value.trim();
+  if (!v) return null;
+  return v.includes("@") ? v : `${v.replace(/\D/g, "")}@s.whatsapp.net`;
+}
+
+export default function BroadcastPage() {
+  const [template, setTemplate] = useState("Hi {first_name}, ");
+  const [audience, setAudience] = useState("filter");
+  const [numbers, setNumbers] = useState("");
+  const [activeDays, setActiveDays] = useState("30");
+  const [minMessages, setMinMessages] = useState("");
+  const [includeTakenOver, setIncludeTakenOver] = useState(false);
+  const [concurrency, setConcurrency] = useState(5);
+  const [intervalMs, setIntervalMs] = useState(1000);
+  const [starting, setStarting] = useState(false);
+  const [jobs, setJobs] = useState([]);
+
+  const loadJobs = async () => {
+    try {
+      const resp = await axios.get(`${API}/wa/broadcasts`, { withCredentials: true });
+      const running = resp.data.filter((j) => j.status === "running");
+      const live = await Promise.all(running.map((j) => axios.get(`${API}/wa/broadcast/${j.id}`, { withCredentials: true }).then((r) => r.data).catch(() => j)));
+      const byId = Object.fromEntries(live.map((j) => [j.id, j]));
+      setJobs(resp.data.map((j) => byId[j.id] || j));
+    } catch {}
+  };
+
+  useEffect(() => { loadJobs(); }, []);
+
+  useEffect(() => {
+    if (!jobs.some((j) => j.status === "running")) return;
+    const interval = setInterval(loadJobs, 3000);
+    return () => clearInterval(interval);
+  }, [jobs]);
+
+  const handleStart = async () => {
+    const body = { template, concurrency, interval_ms: intervalMs };
+    if (audience === "jids") {
+      body.jids = numbers.split(/[\n,;]+/).map(toJid).filter(Boolean);
+      if (body.jids.length === 0) return toast.error("Add at least one number.");
+    } else {
+      body.filter = {
+        active_since_days: activeDays ? parseInt(activeDays) : null,
+        min_messages: minMessages ? parseInt(minMessages) : null,
+        include_taken_over: includeTakenOver,
+      };
+    }
+    setStarting(true);
+    try {
+      const resp = await axios.post(`${API}/wa/broadcast`, body, { withCredentials: true });
+      toast.success(`Broadcast started for ${resp.data.total} contacts.`);
+      await loadJobs();
+    } catch (e) {
+      toast.error(e.response?.data?.detail || "Failed to start broadcast.");
+    }
+    setStarting(false);
+  };
+
+  const handleCancel = async (jobId) => {
+    try {
+      await axios.post(`${API}/wa/broadcast/${jobId}/cancel`, {}, { withCredentials: true });
+      toast.success("Broadcast cancelled — messages not yet sent were dropped.");
+      await loadJobs();
+    } catch (e) {
+      toast.error(e.response?.data?.detail || "Failed to cancel broadcast.");
+    }
+  };
+
+  return (
+    <div className="p-6 max-w-4xl space-y-4">
+      <div>
+        <h1 className="text-lg font-semibold">Broadcast</h1>
+        <p className="text-sm text-muted-foreground">Send one message to many contacts, paced to stay within WhatsApp limits</p>
+      </div>
+
+      <Card>
+        <CardHeader className="pb-2">
+          <CardTitle className="text-sm font-medium">New broadcast</CardTitle>
+          <CardDescription className="text-xs">Use {"{push_name}"}, {"{first_name}"} or {"{phone}"} to personalise each message</CardDescription>
+        </CardHeader>
+        <Separator />
+        <CardContent className="pt-4 space-y-4">
+          <div className="space-y-1.5">
+            <Label className="text-sm">Message</Label>
+            <Textarea
+              value={template}
+              onChange={(e) => setTemplate(e.target.value)}
+              className="text-sm min-h-[100px] resize-none"
+              data-testid="broadcast-template"
+            />
+          </div>
+
+          <div className="space-y-1.5">
+            <Label className="text-sm">Recipients</Label>
+            <Select value={audience} onValueChange={setAudience}>
+              <SelectTrigger className="text-sm"><SelectValue /></SelectTrigger>
+              <SelectContent>{AUDIENCES.map((a) => <SelectItem key={a.value} value={a.value} className="text-sm">{a.label}</SelectItem>)}</SelectContent>
+            </Select>
+          </div>
+
+          {audience === "jids" ? (
+            <div className="space-y-1.5">
+              <Label className="text-sm">Numbers</Label>
+              <Textarea
+                value={numbers}
+                onChange={(e) => setNumbers(e.target.value)}
+                placeholder="One number per line, with country code"
+                className="text-sm min-h-[80px] resize-none font-mono"
+                data-testid="broadcast-numbers"
+              />
+            </div>
+          ) : (
+            <div className="grid grid-cols-2 gap-3">
+              <div className="space-y-1.5">
+                <Label className="text-sm">Active in the last (days)</Label>
+                <Input type="number" min={1} value={activeDays} onChange={(e) => setActiveDays(e.target.value)} placeholder="Any time" className="text-sm" />
+              </div>
+              <div className="space-y-1.5">
+                <Label className="text-sm">At least (messages)</Label>
+                <Input type="number" min={1} value={minMessages} onChange={(e) => setMinMessages(e.target.value)} placeholder="Any" className="text-sm" />
+              </div>
+              <div className="col-span-2 flex items-center justify-between">
+                <Label className="text-sm">Include conversations under agent takeover</Label>
+                <Switch checked={includeTakenOver} onCheckedChange={setIncludeTakenOver} />
+              </div>
+            </div>
+          )}
+
+          <div className="grid grid-cols-2 gap-6">
+            <div className="space-y-1.5">
+              <div className="flex items-center justify-between">
+                <Label className="text-sm">Messages in flight</Label>
+                <Badge variant="secondary" className="text-xs font-mono">{concurrency}</Badge>
+              </div>
+              <Slider min={1} max={20} step={1} value={[concurrency]} onValueChange={([v]) => setConcurrency(v)} className="py-1" />
+            </div>
+            <div className="space-y-1.5">
+              <div className="flex items-center justify-between">
+                <Label className="text-sm">Pause between messages</Label>
+                <Badge variant="secondary" className="text-xs font-mono">{(intervalMs / 1000).toFixed(1)} s</Badge>
+              </div>
+              <Slider min={0} max={10000} step={500} value={[intervalMs]} onValueChange={([v]) => setIntervalMs(v)} className="py-1" />
+            </div>
+          </div>
+
+          <Button onClick={handleStart} disabled={starting || !template.trim()} className="gap-1.5" data-testid="start-broadcast-btn">
+            {starting ? <Loader2 size={13} className="animate-spin" /> : <Send size={13} />} Start broadcast
+          </Button>
+        </CardContent>
+      </Card>
+
+      <Card>
+        <CardHeader className="pb-2 flex-row items-center justify-between space-y-0">
+          <CardTitle className="text-sm font-medium">Recent broadcasts</CardTitle>
+          <Button variant="outline" size="sm" onClick={loadJobs}><RefreshCw size={13} /></Button>
+        </CardHeader>
+        <Separator />
+        <CardContent className="p-0">
+          {jobs.length === 0 ? (
+            <div className="py-12 text-center">
+              <Megaphone size={28} className="text-muted-foreground/20 mx-auto mb-2" />
+              <p className="text-sm text-muted-foreground">No broadcasts yet</p>
+            </div>
+          ) : (
+            <div className="divide-y divide-border">
+              {jobs.map((job) => {
+                const p = job.progress || {};
+                const done = (p.sent || 0) + (p.failed || 0) + (p.cancelled || 0);
+                return (
+                  <div key={job.id} className="px-4 py-3 space-y-2" data-testid={`broadcast-${job.id}`}>
+                    <div className="flex items-center justify-between gap-3">
+                      <div className="flex items-center gap-2 min-w-0">
+                        {statusBadge(job.status)}
+                        <span className="text-sm truncate">{job.template}</span>
+                      </div>
+                      {job.status === "running" && (
+                        <Button size="sm" variant="outline" className="gap-1.5 text-red-600 border-red-200 hover:bg-red-50 h-7" onClick={() => handleCancel(job.id)}>
+                          <XCircle size={12} /> Cancel
+                        </Button>
+                      )}
+                    </div>
+                    <Progress value={job.total ? (done / job.total) * 100 : 0} className="h-1.5" />
+                    <p className="text-[10px] text-muted-foreground">
+                      {p.sent || 0} sent · {p.failed || 0} failed · {(p.queued || 0) + (p.sending || 0)} in flight · {job.total} total
+                      <span className="ml-1.5">{new Date(job.created_at).toLocaleString("en-GB", { day: "numeric", month: "short", hour: "2-digit", minute: "2-digit" })}</span>
+                    </p>
+                  </div>
+                );
+              })}
+            </div>
+          )}
+        </CardContent>
+      </Card>
+    </div>
+  );
+}
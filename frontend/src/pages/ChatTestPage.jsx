@@ -11,6 +11,31 @@ import { toast } from "sonner";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+function formatLatency(ms) {
+  if (ms == null) return "";
+  return ms < 1000 ? `${ms} ms` : `${(ms / 1000).toFixed(1)} s`;
+}
+
+// Reads a server-sent event stream from a fetch response, calling onEvent(name, data) per event
+async function readEventStream(resp, onEvent) {
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, idx);
+      buffer = buffer.slice(idx + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (event && data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 function formatTime(ts) {
   if (!ts) return "";
   try { return new Date(ts).toLocaleTimeString("en-GB", { hour: "2-digit", minute: "2-digit" }); } catch { return ""; }
@@ -71,17 +96,36 @@ export default function ChatTestPage() {
     const tempMsg = { id: `tmp_${Date.now()}`, role: "user", text, timestamp: new Date().toISOString() };
     setMessages((prev) => [...prev, tempMsg]);
 
+    const replyId = `tmp_reply_${Date.now()}`;
     try {
-      const resp = await axios.post(`${API}/chat-test`, { message: text }, { withCredentials: true });
-      // Reload messages from server to get proper IDs and timestamps
+      const resp = await fetch(`${API}/chat-test/stream`, {
+        method: "POST",
+        credentials: "include",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: text }),
+      });
+      if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+      let bookingDetected = false;
+      await readEventStream(resp, (event, data) => {
+        if (event === "token") {
+          setMessages((prev) => {
+            const existing = prev.find((m) => m.id === replyId);
+            if (existing) return prev.map((m) => (m.id === replyId ? { ...m, text: m.text + data.text } : m));
+            return [...prev, { id: replyId, role: "assistant", text: data.text, timestamp: new Date().toISOString() }];
+          });
+        } else if (event === "done") {
+          bookingDetected = data.booking_detected;
+        }
+      });
+      // Reload messages from server to get proper IDs, timestamps and latency figures
       const msgsR = await axios.get(`${API}/chat-test/messages`, { withCredentials: true });
       setMessages(msgsR.data);
-      if (resp.data.booking_detected) {
+      if (bookingDetected) {
         toast.info("Booking intent detected — simulated pending action created");
       }
     } catch {
       toast.error("Failed to get AI response.");
-      setMessages((prev) => prev.filter((m) => m.id !== tempMsg.id));
+      setMessages((prev) => prev.filter((m) => m.id !== tempMsg.id && m.id !== replyId));
     }
     setSending(false);
   };
@@ -199,6 +243,11 @@ export default function ChatTestPage() {
               }`}>
                 <p className="leading-relaxed whitespace-pre-wrap">{msg.text}</p>
                 <p className={`text-[10px] mt-1 text-right ${msg.role === "user" ? "text-primary-foreground/70" : "text-muted-foreground"}`}>
+                  {msg.latency_ms != null && (
+                    <span className="mr-1.5" data-testid="test-msg-latency">
+                      first token {formatLatency(msg.ttft_ms)} · total {formatLatency(msg.latency_ms)} ·
+                    </span>
+                  )}
                   {formatTime(msg.timestamp)}
                 </p>
               </div>
@@ -210,7 +259,7 @@ export default function ChatTestPage() {
             </div>
           ))}
 
-          {sending && (
+          {sending && !messages.some((m) => m.id.startsWith("tmp_reply_")) && (
             <div className="flex justify-start items-end gap-2">
               <div className="w-6 h-6 rounded-full bg-primary/10 flex items-center justify-center flex-shrink-0">
                 <Bot size={11} className="text-primary" />
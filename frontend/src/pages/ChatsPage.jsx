@@ -64,7 +64,7 @@ export default function ChatsPage() {
     if (!manualMsg.trim() || !selectedJid) return;
     setSendingMsg(true);
     try {
-      await axios.post(`${API}/wa/send`, { jid: selectedJid, message: manualMsg }, { withCredentials: true });
+      await axios.post(`${API}/wa/send`, { jid: selectedJid, message: manualMsg, idempotency_key: crypto.randomUUID() }, { withCredentials: true });
       setManualMsg("");
       setTimeout(() => loadMessages(selectedJid), 1000);
     } catch {}
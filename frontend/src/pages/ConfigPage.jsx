@@ -58,6 +58,10 @@ const defaultConfig = {
   temperature: 0.7,
   max_tokens: 1024,
   top_p: 1.0,
+  fallback_provider: "gemini",
+  fallback_model_name: "gemini-2.0-flash",
+  latency_routing: false,
+  hedge_after_ms: 0,
   system_prompt: "You are a helpful and friendly virtual assistant. Respond clearly and concisely.",
   language: "en-GB",
   tone: "friendly",
@@ -65,6 +69,7 @@ const defaultConfig = {
   fallback_message: "I'm sorry, I didn't quite understand that. Could you rephrase your question?",
   business_context: "",
   faq_text: "",
+  prompt_token_budget: 8000,
   rate_limit_enabled: false,
   rate_limit_msgs: 10,
   rate_limit_window_minutes: 1,
@@ -75,6 +80,11 @@ const defaultConfig = {
   schedule_end: "18:00",
   outside_hours_message: "We're currently outside business hours. We'll be back shortly.",
   strict_mode: true,
+  coalesce_enabled: false,
+  coalesce_window_ms: 1500,
+  response_cache_enabled: true,
+  response_cache_fuzzy: false,
+  takeover_idle_minutes: 0,
   booking_types: [
     { id: "breakdown", name: "Breakdown", enabled: true, keywords: ["breakdown","broke down","broken down"], confirmation_message: "I've logged a breakdown request. Our team will be in touch shortly." },
     { id: "arrange_collection", name: "Arrange Collection", enabled: true, keywords: ["collection","collect","pick up","pickup"], confirmation_message: "I've arranged a collection request. Please await admin confirmation." },
@@ -307,6 +317,61 @@ export default function ConfigPage() {
                 <p className="text-xs text-muted-foreground">Powered by Emergent Universal Key</p>
               </div>
 
+              <div className="py-4 space-y-1.5">
+                <Label className="text-sm">Fallback model</Label>
+                <Select
+                  value={`${config.fallback_provider}::${config.fallback_model_name}`}
+                  onValueChange={(v) => {
+                    const [provider, name] = v.split("::");
+                    set("fallback_provider", provider); set("fallback_model_name", name);
+                  }}
+                >
+                  <SelectTrigger className="text-sm" data-testid="fallback-model-select">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    {!MODELS.some((m) => m.provider === config.fallback_provider && m.name === config.fallback_model_name) && (
+                      <SelectItem value={`${config.fallback_provider}::${config.fallback_model_name}`} className="text-sm">
+                        {config.fallback_model_name}
+                        <span className="ml-1.5 text-muted-foreground text-xs">{config.fallback_provider}</span>
+                      </SelectItem>
+                    )}
+                    {MODELS.map((m) => (
+                      <SelectItem key={`${m.provider}::${m.name}`} value={`${m.provider}::${m.name}`} className="text-sm">
+                        {m.label}
+                        <span className="ml-1.5 text-muted-foreground text-xs">{m.provider}</span>
+                      </SelectItem>
+                    ))}
+                  </SelectContent>
+                </Select>
+                <p className="text-xs text-muted-foreground">Used when the main model fails; if both fail the fallback message is sent</p>
+              </div>
+
+              <SettingRow
+                label="Prefer the faster model"
+                description="Try the fallback model first while it is answering much faster than the main model"
+              >
+                <Switch
+                  checked={config.latency_routing}
+                  onCheckedChange={(v) => set("latency_routing", v)}
+                  data-testid="latency-routing-switch"
+                />
+              </SettingRow>
+
+              <div className="py-4 space-y-1.5">
+                <div className="flex items-center justify-between">
+                  <Label className="text-sm">Hedge slow replies</Label>
+                  <Badge variant="secondary" className="text-xs font-mono">{config.hedge_after_ms ? `${config.hedge_after_ms} ms` : "off"}</Badge>
+                </div>
+                <Slider
+                  min={0} max={10000} step={500}
+                  value={[config.hedge_after_ms]}
+                  onValueChange={([v]) => set("hedge_after_ms", v)}
+                  className="py-1"
+                />
+                <p className="text-xs text-muted-foreground">Also ask the fallback model if the main model has not answered by then, and use whichever replies first</p>
+              </div>
+
               <div className="py-4 space-y-2">
                 <div className="flex items-center justify-between">
                   <Label className="text-sm">Temperature</Label>
@@ -414,6 +479,71 @@ export default function ConfigPage() {
                   </SelectContent>
                 </Select>
               </div>
+
+              <SettingRow
+                label="Combine rapid messages"
+                description="Wait briefly for follow-up messages and answer a burst with a single reply"
+              >
+                <Switch
+                  checked={config.coalesce_enabled}
+                  onCheckedChange={(v) => set("coalesce_enabled", v)}
+                  data-testid="coalesce-switch"
+                />
+              </SettingRow>
+
+              {config.coalesce_enabled && (
+                <div className="py-4 space-y-1.5">
+                  <div className="flex items-center justify-between">
+                    <Label className="text-sm">Wait window</Label>
+                    <Badge variant="secondary" className="text-xs font-mono">{(config.coalesce_window_ms / 1000).toFixed(1)} s</Badge>
+                  </div>
+                  <Slider
+                    min={500} max={10000} step={500}
+                    value={[config.coalesce_window_ms]}
+                    onValueChange={([v]) => set("coalesce_window_ms", v)}
+                    className="py-1"
+                  />
+                  <p className="text-xs text-muted-foreground">Messages from the same contact within this window are merged into one reply</p>
+                </div>
+              )}
+
+              <SettingRow
+                label="Reuse answers to repeated questions"
+                description="Serve identical questions from a cache until your settings, workflow or knowledge base change"
+              >
+                <Switch
+                  checked={config.response_cache_enabled}
+                  onCheckedChange={(v) => set("response_cache_enabled", v)}
+                  data-testid="response-cache-switch"
+                />
+              </SettingRow>
+
+              {config.response_cache_enabled && (
+                <SettingRow
+                  label="Match similar wording"
+                  description="Also reuse answers for questions phrased almost the same way"
+                >
+                  <Switch
+                    checked={config.response_cache_fuzzy}
+                    onCheckedChange={(v) => set("response_cache_fuzzy", v)}
+                    data-testid="response-cache-fuzzy-switch"
+                  />
+                </SettingRow>
+              )}
+
+              <div className="py-4 space-y-1.5">
+                <div className="flex items-center justify-between">
+                  <Label className="text-sm">Release idle takeovers</Label>
+                  <Badge variant="secondary" className="text-xs font-mono">{config.takeover_idle_minutes ? `${config.takeover_idle_minutes} min` : "Never"}</Badge>
+                </div>
+                <Slider
+                  min={0} max={240} step={15}
+                  value={[config.takeover_idle_minutes]}
+                  onValueChange={([v]) => set("takeover_idle_minutes", v)}
+                  className="py-1"
+                />
+                <p className="text-xs text-muted-foreground">Hand a conversation back to the bot when the agent has not replied for this long</p>
+              </div>
             </CardContent>
           </Card>
         </TabsContent>
@@ -447,6 +577,22 @@ export default function ConfigPage() {
                   className="text-sm min-h-[160px] resize-none font-mono"
                 />
               </div>
+
+              <div className="py-4 space-y-1.5">
+                <div className="flex items-center justify-between">
+                  <Label className="text-sm">Prompt budget</Label>
+                  <Badge variant="secondary" className="text-xs font-mono">{config.prompt_token_budget} tokens</Badge>
+                </div>
+                <Slider
+                  min={1000} max={32000} step={1000}
+                  value={[config.prompt_token_budget]}
+                  onValueChange={([v]) => set("prompt_token_budget", v)}
+                  className="py-1"
+                />
+                <p className="text-xs text-muted-foreground">
+                  Context beyond this size is trimmed in order: knowledge base first, then FAQ, then workflow. Smaller prompts answer faster and cost less.
+                </p>
+              </div>
             </CardContent>
           </Card>
         </TabsContent>
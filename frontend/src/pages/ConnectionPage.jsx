@@ -6,6 +6,7 @@ import { Button } from "../components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "../components/ui/card";
 import { Badge } from "../components/ui/badge";
 import { Separator } from "../components/ui/separator";
+import { useWaStatus } from "../components/WaStatusProvider";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -18,47 +19,27 @@ const steps = [
 ];
 
 export default function ConnectionPage() {
-  const [qrData, setQrData] = useState(null);
-  const [status, setStatus] = useState({ status: "disconnected", connected: false, jid: null });
+  const status = useWaStatus();
+  const qrData = status.qr;
   const [loading, setLoading] = useState(false);
   const navigate = useNavigate();
   // Prevent repeated navigate("/") calls while WhatsApp is connected
   const navigatedRef = useRef(false);
 
-  const fetchQR = async () => {
-    try {
-      const resp = await axios.get(`${API}/wa/qr`, { withCredentials: true });
-      setQrData(resp.data.qr);
-    } catch {}
-  };
-
-  const fetchStatus = async () => {
-    try {
-      const resp = await axios.get(`${API}/wa/status`, { withCredentials: true });
-      const newStatus = resp.data;
-      setStatus(newStatus);
-      // Reset guard when disconnected so reconnection works
-      if (!newStatus.connected) {
-        navigatedRef.current = false;
-      }
-      // Navigate to Dashboard only once when connection is first detected
-      if (newStatus.connected && !navigatedRef.current) {
-        navigatedRef.current = true;
-        setTimeout(() => navigate("/"), 1500);
-      }
-    } catch {}
-  };
-
   useEffect(() => {
-    fetchStatus();
-    fetchQR();
-    const interval = setInterval(() => { fetchStatus(); fetchQR(); }, 3000);
-    return () => clearInterval(interval);
-  }, []);
+    // Reset guard when disconnected so reconnection works
+    if (!status.connected) {
+      navigatedRef.current = false;
+    }
+    // Navigate to Dashboard only once when connection is first detected
+    if (status.connected && !navigatedRef.current) {
+      navigatedRef.current = true;
+      setTimeout(() => navigate("/"), 1500);
+    }
+  }, [status.connected]);
 
   const handleReconnect = async () => {
     setLoading(true);
-    setQrData(null);
     try { await axios.post(`${API}/wa/reconnect`, { withCredentials: true }); } catch {}
     setTimeout(() => setLoading(false), 1500);
   };
@@ -66,8 +47,6 @@ export default function ConnectionPage() {
   const handleDisconnect = async () => {
     try {
       await axios.post(`${API}/wa/disconnect`, { withCredentials: true });
-      setQrData(null);
-      setStatus({ status: "disconnected", connected: false, jid: null });
     } catch {}
   };
 
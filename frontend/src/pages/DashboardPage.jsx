@@ -7,6 +7,7 @@ import { Button } from "../components/ui/button";
 import { Badge } from "../components/ui/badge";
 import { Separator } from "../components/ui/separator";
 import { useAuth } from "../components/AuthProvider";
+import { useWaStatus } from "../components/WaStatusProvider";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -32,7 +33,7 @@ function StatCard({ icon: Icon, label, value, description, highlight }) {
 export default function DashboardPage() {
   const { user } = useAuth();
   const [stats, setStats] = useState({ total_conversations: 0, total_messages: 0, user_messages: 0, bot_messages: 0, pending_actions: 0 });
-  const [waStatus, setWaStatus] = useState({ connected: false, status: "disconnected" });
+  const waStatus = useWaStatus();
   const [recentConvs, setRecentConvs] = useState([]);
   const [pendingActions, setPendingActions] = useState([]);
   const [recentLogs, setRecentLogs] = useState([]);
@@ -40,15 +41,13 @@ export default function DashboardPage() {
   useEffect(() => {
     const load = async () => {
       try {
-        const [statsR, statusR, convsR, actionsR, logsR] = await Promise.all([
+        const [statsR, convsR, actionsR, logsR] = await Promise.all([
           axios.get(`${API}/stats`, { withCredentials: true }),
-          axios.get(`${API}/wa/status`, { withCredentials: true }),
           axios.get(`${API}/conversations`, { withCredentials: true }),
           axios.get(`${API}/actions?status=pending`, { withCredentials: true }),
           axios.get(`${API}/logs?limit=5`, { withCredentials: true }),
         ]);
         setStats(statsR.data);
-        setWaStatus(statusR.data);
         setRecentConvs(convsR.data.slice(0, 4));
         setPendingActions(actionsR.data.slice(0, 3));
         setRecentLogs(logsR.data.slice(0, 5));
@@ -9,6 +9,7 @@ import { Textarea } from "../components/ui/textarea";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../components/ui/select";
 import { Badge } from "../components/ui/badge";
 import { Separator } from "../components/ui/separator";
+import { Switch } from "../components/ui/switch";
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "../components/ui/dialog";
 import { toast } from "sonner";
 
@@ -91,6 +92,16 @@ export default function IntegrationsPage() {
     toast.success("Spreadsheet removed from list.");
   };
 
+  const handleExportActions = async (id, enabled) => {
+    try {
+      await axios.post(`${API}/integrations/sheets/${id}/export-actions`, { enabled, backfill: true }, { withCredentials: true });
+      setSheets((s) => s.map((x) => (x.spreadsheet_id === id ? { ...x, export_actions: enabled, export_error: null } : x)));
+      toast.success(enabled ? "Bot actions will be logged to this spreadsheet." : "Bot actions logging stopped.");
+    } catch (e) {
+      toast.error(e.response?.data?.detail || "Failed to update export.");
+    }
+  };
+
   const handleSendEmail = async (e) => {
     e.preventDefault();
     if (!emailForm.to || !emailForm.subject || !emailForm.body) { toast.error("Please fill all fields."); return; }
@@ -226,8 +237,22 @@ export default function IntegrationsPage() {
                       <Table size={14} className="text-muted-foreground flex-shrink-0" />
                       <div className="flex-1 min-w-0">
                         <p className="text-sm font-medium truncate">{s.title}</p>
-                        <p className="text-xs text-muted-foreground">{new Date(s.created_at).toLocaleDateString("en-GB")}</p>
+                        <p className="text-xs text-muted-foreground">
+                          {new Date(s.created_at).toLocaleDateString("en-GB")}
+                          {s.export_actions && <span className="ml-1.5">· {s.export_rows || 0} actions logged</span>}
+                          {s.export_actions && s.export_error && <span className="ml-1.5 text-destructive">· {s.export_error}</span>}
+                        </p>
                       </div>
+                      {s.mode === "edit" && (
+                        <div className="flex items-center gap-1.5">
+                          <span className="text-[10px] text-muted-foreground">Log actions</span>
+                          <Switch
+                            checked={!!s.export_actions}
+                            onCheckedChange={(v) => handleExportActions(s.spreadsheet_id, v)}
+                            data-testid={`export-actions-${s.spreadsheet_id}`}
+                          />
+                        </div>
+                      )}
                       <Badge variant="secondary" className="text-[10px] font-normal">{s.mode === "edit" ? "Edit & Read" : "Read only"}</Badge>
                       <a href={s.url} target="_blank" rel="noreferrer" className="text-muted-foreground hover:text-primary">
                         <ExternalLink size={13} />
@@ -25,7 +25,7 @@ const NODE_TYPES = [
 
 const getTypeStyle = (type) => NODE_TYPES.find((t) => t.value === type) || NODE_TYPES[1];
 
-function NodeCard({ node, index, total, onChange, onDelete, onMoveUp, onMoveDown }) {
+function NodeCard({ node, index, total, nodes, onChange, onDelete, onMoveUp, onMoveDown }) {
   const [expanded, setExpanded] = useState(index === 0);
   const style = getTypeStyle(node.type);
 
@@ -127,6 +127,17 @@ function NodeCard({ node, index, total, onChange, onDelete, onMoveUp, onMoveDown
                       placeholder="What happens next..."
                       className="text-xs h-7 flex-1"
                     />
+                    <Select value={branch.next_id || "__next__"} onValueChange={(v) => updateBranch(bi, "next_id", v === "__next__" ? null : v)}>
+                      <SelectTrigger className="text-xs h-7 w-32" data-testid={`branch-next-${bi}`}>
+                        <SelectValue />
+                      </SelectTrigger>
+                      <SelectContent>
+                        <SelectItem value="__next__" className="text-xs">Next step</SelectItem>
+                        {nodes.filter((n) => n.id !== node.id).map((n) => (
+                          <SelectItem key={n.id} value={n.id} className="text-xs">Go to: {n.title || n.id}</SelectItem>
+                        ))}
+                      </SelectContent>
+                    </Select>
                     <button onClick={() => removeBranch(bi)} className="text-muted-foreground hover:text-red-500 p-1">
                       <Trash2 size={10} />
                     </button>
@@ -153,6 +164,8 @@ const DEFAULT_WORKFLOW = [
 export default function WorkflowPage() {
   const [nodes, setNodes] = useState([]);
   const [active, setActive] = useState(true);
+  const [execution, setExecution] = useState("prompt");
+  const [report, setReport] = useState(null);
   const [saving, setSaving] = useState(false);
   const [loading, setLoading] = useState(true);
 
@@ -161,6 +174,8 @@ export default function WorkflowPage() {
       if (r.data.nodes && r.data.nodes.length > 0) {
         setNodes(r.data.nodes);
         setActive(r.data.active ?? true);
+        setExecution(r.data.execution || "prompt");
+        setReport(r.data.report || null);
       } else {
         setNodes(DEFAULT_WORKFLOW);
       }
@@ -186,9 +201,18 @@ export default function WorkflowPage() {
   const handleSave = async () => {
     setSaving(true);
     try {
-      await axios.post(`${API}/workflow`, { nodes: nodes.map((n, i) => ({ ...n, position: i })), active }, { withCredentials: true });
+      const resp = await axios.post(`${API}/workflow`, { nodes: nodes.map((n, i) => ({ ...n, position: i })), active, execution }, { withCredentials: true });
+      setReport(resp.data.report || null);
       toast.success("Workflow saved. The AI will follow this flow in all conversations.");
-    } catch { toast.error("Failed to save workflow."); }
+    } catch (err) {
+      const detail = err.response?.data?.detail;
+      if (detail?.report) {
+        setReport(detail.report);
+        toast.error("Workflow not saved — fix the errors listed above the steps.");
+      } else {
+        toast.error("Failed to save workflow.");
+      }
+    }
     setSaving(false);
   };
 
@@ -211,6 +235,15 @@ export default function WorkflowPage() {
             <Switch checked={active} onCheckedChange={setActive} data-testid="workflow-active-toggle" />
             <span className="text-xs text-muted-foreground">{active ? "Active" : "Inactive"}</span>
           </div>
+          <Select value={execution} onValueChange={setExecution}>
+            <SelectTrigger className="h-8 text-xs w-36" data-testid="workflow-execution-select">
+              <SelectValue />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value="engine" className="text-xs">Step by step</SelectItem>
+              <SelectItem value="prompt" className="text-xs">AI guided</SelectItem>
+            </SelectContent>
+          </Select>
           <Button variant="outline" size="sm" onClick={handleReset}>Reset</Button>
           <Button size="sm" onClick={handleSave} disabled={saving} data-testid="save-workflow-btn">
             {saving ? <span className="w-3 h-3 border-2 border-white border-t-transparent rounded-full animate-spin mr-1.5" /> : <Save size={13} className="mr-1.5" />}
@@ -227,6 +260,18 @@ export default function WorkflowPage() {
         </div>
       )}
 
+      {/* Validation report */}
+      {report && (report.errors.length > 0 || report.warnings.length > 0) && (
+        <div className={`p-3 rounded-md border space-y-1 ${report.errors.length ? "bg-red-50 border-red-100" : "bg-yellow-50 border-yellow-100"}`} data-testid="workflow-report">
+          {report.errors.map((e, i) => (
+            <p key={`e${i}`} className="text-xs text-red-700 flex items-start gap-1.5"><AlertTriangle size={12} className="mt-0.5 flex-shrink-0" />{e}</p>
+          ))}
+          {report.warnings.map((w, i) => (
+            <p key={`w${i}`} className="text-xs text-yellow-800 flex items-start gap-1.5"><AlertTriangle size={12} className="mt-0.5 flex-shrink-0" />{w}</p>
+          ))}
+        </div>
+      )}
+
       {/* Legend */}
       <div className="flex flex-wrap gap-2">
         {NODE_TYPES.map((t) => (
@@ -245,6 +290,7 @@ export default function WorkflowPage() {
             node={node}
             index={idx}
             total={nodes.length}
+            nodes={nodes}
             onChange={(updated) => updateNode(node.id, updated)}
             onDelete={deleteNode}
             onMoveUp={moveUp}
@@ -261,7 +307,7 @@ export default function WorkflowPage() {
         <CardContent className="p-4">
           <p className="text-xs font-medium mb-1">How the workflow integrates with the AI</p>
           <p className="text-xs text-muted-foreground leading-relaxed">
-            Each step is injected as structured context into the AI's system prompt. The AI understands the full flow and works toward completing each step naturally — even if the user skips ahead or provides information out of order. The <strong>Escalate</strong> step triggers the admin takeover notification.
+            In <strong>Step by step</strong> mode the bot tracks where each conversation is in the flow and sends scripted steps directly: messages are sent as written, question answers are matched to a branch, and collected details are stored on the conversation. The AI is only asked when a reply does not match any option. In <strong>AI guided</strong> mode each step is injected as structured context into the AI's system prompt and the AI works toward completing each step naturally. The <strong>Escalate</strong> step triggers the admin takeover notification.
           </p>
         </CardContent>
       </Card>